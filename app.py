@@ -1,6 +1,4 @@
 import streamlit as st
-import requests
-from google_auth_oauthlib.flow import Flow
 
 from utils.auth import require_login
 from utils.db import ensure_db, get_conn
@@ -48,6 +46,9 @@ def logout():
 query_params = st.query_params
 
 if "code" in query_params and "oauth_email" not in st.session_state:
+    # Imported here: only the OAuth callback needs them
+    import requests
+    from google_auth_oauthlib.flow import Flow
 
     flow = Flow.from_client_config(
         {
@@ -0,0 +1,168 @@
+"""
+Team allocation benchmark: seat 50 people for a working week.
+
+Builds an office of --zones zones, each a --rows x --cols block of desks
+laid out on the floor grid. A share of the desks (--prebooked) is
+already booked on random days, then allocate_team() seats --people
+users Monday to Friday under each constraint set. Per variant it reports
+the end-to-end time (writer queue, availability load, solve, insert,
+commit) and the solver time alone, then the time taken to book the same
+desks one confirm_booking() call per person-day for comparison.
+
+    python benchmarks/bench_allocation.py
+    python benchmarks/bench_allocation.py --people 80 --zones 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.allocation import (  # noqa: E402
+    allocate_team,
+    interval_mask,
+    load_busy,
+    plan_allocation,
+)
+from utils.bookings import DAY_END_MIN, DAY_START_MIN, confirm_booking  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+from utils.floorplan import place_desks  # noqa: E402
+
+# Team bookings are made by an admin
+ADMIN = "admin@example.com"
+
+VARIANTS = {
+    "adjacent_same_zone": {"same_zone": True, "adjacent": True},
+    "same_zone": {"same_zone": True, "adjacent": False},
+    "anywhere": {"same_zone": False, "adjacent": False},
+}
+
+
+def build_office(args) -> list[int]:
+    db.ensure_db()
+    conn = db.get_conn()
+    conn.execute("UPDATE desks SET is_active = 0")
+    for zone in range(args.zones):
+        for row in range(args.rows):
+            for col in range(args.cols):
+                conn.execute(
+                    """
+                    INSERT INTO desks (name, location, is_active, admin_only, floor, zone, pos_x, pos_y)
+                    VALUES (?, 'Office', 1, 0, 1, ?, ?, ?)
+                    """,
+                    (f"Z{zone}-{row}-{col}", f"Zone {zone}", col, zone * (args.rows + 1) + row),
+                )
+
+    users = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(args.people * (len(VARIANTS) + 2))
+    ]
+    conn.execute(
+        "INSERT INTO users (name, email, role, can_book, is_active) VALUES ('Admin', ?, 'admin', 1, 1)", (ADMIN,)
+    )
+    conn.commit()
+    conn.close()
+    return users
+
+
+def prebook(desk_ids, first_day, days, share, owner, rng) -> None:
+    conn = db.get_site_conn()
+    rows = [
+        (owner, desk_id, first_day + d, DAY_START_MIN, DAY_END_MIN)
+        for desk_id in desk_ids
+        for d in range(days)
+        if rng.random() < share
+    ]
+    conn.executemany(
+        "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+        "VALUES (?, ?, ?, ?, ?, 'booked', 0)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def solver_only(monday, days, people, variant) -> float:
+    conn = db.get_conn()
+    desks = place_desks([
+        dict(row)
+        for row in conn.execute(
+            "SELECT id, floor, zone, pos_x, pos_y FROM desks WHERE is_active = 1 AND admin_only = 0"
+        )
+    ])
+    busy, held = load_busy(conn, days[0], days[-1])
+    conn.close()
+
+    started = time.perf_counter()
+    plan_allocation(desks, busy, held, people, days, interval_mask(DAY_START_MIN, DAY_END_MIN), **variant)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--people", type=int, default=50)
+    parser.add_argument("--zones", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--prebooked", type=float, default=0.25, help="share of desk-days already booked")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    users = build_office(args)
+    conn = db.get_conn()
+    desk_ids = [row["id"] for row in conn.execute("SELECT id FROM desks WHERE is_active = 1")]
+    conn.close()
+
+    # Each variant books its own future week so they do not compete
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    print(f"{len(desk_ids)} desks in {args.zones} zones, {args.people} people, Mon-Fri, "
+          f"{args.prebooked:.0%} of desk-days pre-booked")
+
+    for i, (name, variant) in enumerate(VARIANTS.items()):
+        week = monday + timedelta(weeks=i)
+        days = [day_number(week) + d for d in range(5)]
+        prebook(desk_ids, days[0], 5, args.prebooked, users[-1], rng)
+        people = users[i * args.people:(i + 1) * args.people]
+
+        solve = solver_only(week, days, people, variant)
+        started = time.perf_counter()
+        result = allocate_team(people, week, week + timedelta(days=4), actor=ADMIN, **variant)
+        total = time.perf_counter() - started
+
+        stable = all(
+            len({result["plan"][day][p] for day in days}) == 1 for p in people
+        )
+        print(f"  {name:20s} {total * 1000:7.1f} ms end to end, {solve * 1000:6.1f} ms solving, "
+              f"{len(result['booking_ids'])} bookings, same desk all week: {stable}")
+
+    # Baseline: the same number of bookings made one request at a time
+    week = monday + timedelta(weeks=len(VARIANTS))
+    days = [day_number(week) + d for d in range(5)]
+    prebook(desk_ids, days[0], 5, args.prebooked, users[-1], rng)
+    people = users[len(VARIANTS) * args.people:(len(VARIANTS) + 1) * args.people]
+    conn = db.get_conn()
+    busy, _ = load_busy(conn, days[0], days[-1])
+    conn.close()
+
+    started = time.perf_counter()
+    for day in days:
+        free = iter(d for d in desk_ids if not busy.get(day, {}).get(d))
+        for person in people:
+            confirm_booking(person, day, {next(free): (DAY_START_MIN, DAY_END_MIN)})
+    total = time.perf_counter() - started
+    print(f"  {'per-booking requests':20s} {total * 1000:7.1f} ms end to end, {len(days) * len(people)} bookings")
+
+
+if __name__ == "__main__":
+    main()
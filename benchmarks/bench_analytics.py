@@ -0,0 +1,69 @@
+"""
+Time the utilisation engine on synthetic data: one year, 100 desks.
+
+    python benchmarks/bench_analytics.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault(
+    "DESK_BOOKING_DB_PATH", str(Path(tempfile.mkdtemp()) / "bench.db")
+)
+
+from utils.analytics import compute_utilisation  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+
+N_DESKS = 100
+N_DAYS = 365
+REPEATS = 5
+
+
+def synthetic_bookings(rng):
+    start = date(2025, 1, 1)
+    desk_id, days, starts, ends, status = [], [], [], [], []
+
+    for day in range(N_DAYS):
+        d = start + timedelta(days=day)
+        if d.weekday() >= 5:
+            continue
+        for desk in range(1, N_DESKS + 1):
+            # Up to two bookings per desk per day
+            for _ in range(rng.integers(0, 3)):
+                s = int(rng.integers(18, 34)) * 30
+                e = min(s + int(rng.integers(1, 9)) * 30, 18 * 60)
+                desk_id.append(desk)
+                days.append(day_number(d))
+                starts.append(s)
+                ends.append(e)
+                status.append("no_show" if rng.random() < 0.05 else "booked")
+
+    rows = {"desk_id": desk_id, "day": days, "start_min": starts, "end_min": ends, "status": status}
+    return rows, start, start + timedelta(days=N_DAYS - 1)
+
+
+def main():
+    rows, date_from, date_to = synthetic_bookings(np.random.default_rng(0))
+    desk_ids = list(range(1, N_DESKS + 1))
+
+    timings = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        report = compute_utilisation(rows, desk_ids, date_from, date_to, date_to)
+        timings.append(time.perf_counter() - t0)
+
+    print(f"bookings:          {len(rows['desk_id'])}")
+    print(f"peak concurrency:  {report['peak_concurrency']}")
+    print(f"mean utilisation:  {report['mean_utilisation']:.1%}")
+    print(f"compute (best):    {min(timings) * 1000:.1f} ms")
+    print(f"compute (median):  {sorted(timings)[len(timings) // 2] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Office-closure benchmark: cancel every booking on a busy day.
+
+Creates --desks desks and fills one future day with --per-desk bookings
+per desk for distinct users, plus a neighbouring day that must be left
+alone. Then close_office() cancels the whole day through the writer: one
+UPDATE ... RETURNING, one batched audit insert and one batched outbox
+insert in a single transaction. Reports the end-to-end time and checks
+the audit, outbox and neighbour-day counts.
+
+    python benchmarks/bench_bulk_cancel.py
+    python benchmarks/bench_bulk_cancel.py --desks 400 --per-desk 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.bookings import DAY_START_MIN, SLOT_MINUTES, close_office  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desks", type=int, default=200)
+    parser.add_argument("--per-desk", type=int, default=3, help="bookings per desk on the closed day")
+    args = parser.parse_args()
+
+    db.ensure_db()
+    conn = db.get_conn()
+    desk_ids = [
+        conn.execute(
+            "INSERT INTO desks (name, location, is_active, admin_only) VALUES (?, 'Office', 1, 0)",
+            (f"Bench desk {i}",),
+        ).lastrowid
+        for i in range(args.desks)
+    ]
+    users = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(args.desks * args.per_desk)
+    ]
+    conn.commit()
+    conn.close()
+
+    closed = date.today() + timedelta(days=14)
+    length = (9 * 60) // args.per_desk // SLOT_MINUTES * SLOT_MINUTES
+    rows = []
+    for offset in (0, 1):
+        for i, desk_id in enumerate(desk_ids):
+            for k in range(args.per_desk):
+                start = DAY_START_MIN + k * length
+                rows.append((users[i * args.per_desk + k], desk_id, day_number(closed) + offset, start, start + length))
+    conn = db.get_site_conn()
+    conn.executemany(
+        "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+        "VALUES (?, ?, ?, ?, ?, 'booked', 0)",
+        rows,
+    )
+    conn.commit()
+
+    started = time.perf_counter()
+    cancelled = close_office(closed, closed, [], "Bench closure", "bench@example.com")
+    elapsed = time.perf_counter() - started
+
+    audit = conn.execute("SELECT COUNT(*) FROM audit_log WHERE action = 'BOOKING_CANCELLED'").fetchone()[0]
+    outbox = conn.execute("SELECT channel, COUNT(*) FROM notification_outbox GROUP BY channel").fetchall()
+    untouched = conn.execute(
+        "SELECT COUNT(*) FROM bookings WHERE day = ? AND status = 'booked'", (day_number(closed) + 1,)
+    ).fetchone()[0]
+    conn.close()
+
+    print(f"closed {closed.isoformat()}: {cancelled} bookings cancelled in {elapsed * 1000:.1f} ms")
+    print(f"  audit events: {audit}, outbox: {dict((row[0], row[1]) for row in outbox)}")
+    print(f"  next day still booked: {untouched} of {args.desks * args.per_desk}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Dashboard landing cost: a 9am rush of users opening the Dashboard.
+
+Seeds --users people with --bookings bookings spread over the past and
+next two months. Then each user "lands" --visits times, with a booking
+confirmed between visits for a tenth of them. A landing is what the
+Dashboard page does: one data_versions lookup per site for the cache keys, then
+the cached per-user summary and the shared occupancy aggregate.
+Reports the mean landing time cold (first visit), warm (cache hits) and
+after the user's own booking invalidated their entry, with the cost of
+running the summary query uncached for comparison.
+
+    python benchmarks/bench_dashboard.py
+    python benchmarks/bench_dashboard.py --users 2000 --bookings 100000
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+from utils import db  # noqa: E402
+from utils.dashboard import dashboard_versions, today_occupancy, upcoming, user_summary  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+
+
+def land(user_id: int, today: int) -> None:
+    upcoming(user_summary(user_id, today, *dashboard_versions(user_id)), today, 600)
+    today_occupancy(today)
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=50000)
+    parser.add_argument("--visits", type=int, default=3)
+    args = parser.parse_args()
+
+    db.ensure_db()
+    conn = db.get_conn()
+    users = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(args.users)
+    ]
+    desks = [row[0] for row in conn.execute("SELECT id FROM desks")]
+    conn.commit()
+    conn.close()
+    today = day_number(date.today())
+    rng = random.Random(7)
+    rows = []
+    for _ in range(args.bookings):
+        start = 540 + 30 * rng.randrange(16)
+        day = today + rng.randrange(-60, 60)
+        status = "booked" if day >= today or rng.random() < 0.85 else "no_show"
+        rows.append((rng.choice(users), rng.choice(desks), day, start, start + 60, status, int(rng.random() < 0.7)))
+    conn = db.get_site_conn()
+    conn.executemany(
+        "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+
+    cold = [timed(land, user_id, today) for user_id in users]
+    warm = [timed(land, user_id, today) for _ in range(args.visits - 1) for user_id in users]
+
+    movers = users[::10]
+    for user_id in movers:
+        conn.execute(
+            "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status) VALUES (?, ?, ?, 540, 600, 'booked')",
+            (user_id, rng.choice(desks), today + 90),
+        )
+    conn.commit()
+    invalidated = [timed(land, user_id, today) for user_id in movers]
+    still_warm = [timed(land, user_id, today) for user_id in users if user_id not in set(movers)]
+    uncached = [timed(user_summary.__wrapped__, user_id, today, (), 0) for user_id in users[:200]]
+    conn.close()
+
+    print(f"{args.users} users, {args.bookings} bookings")
+    print(f"  cold landing:          {statistics.mean(cold):.3f} ms")
+    print(f"  warm landing:          {statistics.mean(warm):.3f} ms")
+    print(f"  after own booking:     {statistics.mean(invalidated):.3f} ms ({len(movers)} users)")
+    print(f"  others after bookings: {statistics.mean(still_warm):.3f} ms")
+    print(f"  summary query alone:   {statistics.mean(uncached):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+/*
+ * Browser-free render benchmark for the booking grid component.
+ *
+ * Drives desk_booking_component/grid.js against a recording 2D context
+ * (no DOM, no real canvas) for 50, 200 and 1000 desks x 18 slots, and
+ * reports per scenario the median time and how many cells were painted:
+ *   build        first render event (new layout)
+ *   rerun        render event with nothing changed
+ *   patch        render event where 5 cells became booked
+ *   scroll       scrolling one viewport to the right
+ *   drag         drag-select over 8 desks x 6 slots, one selection update
+ *
+ *     node benchmarks/bench_grid_render.js
+ *     node benchmarks/bench_grid_render.js --desks 50,5000 --runs 50
+ */
+"use strict";
+
+const path = require("path");
+const { performance } = require("perf_hooks");
+const { DeskGrid } = require(path.join(__dirname, "..", "desk_booking_component", "grid.js"));
+
+const VIEW_W = 1200;
+const SLOTS = 18;
+
+function option(name, fallback) {
+  const i = process.argv.indexOf("--" + name);
+  return i >= 0 ? process.argv[i + 1] : fallback;
+}
+
+// Counts draw calls; every painted cell is exactly one fill()
+function mockContext() {
+  const calls = { fill: 0, fillText: 0, clearRect: 0 };
+  const noop = () => {};
+  return {
+    calls,
+    save: noop, restore: noop, beginPath: noop, rect: noop, clip: noop,
+    roundRect: noop, stroke: noop, fillRect: noop, setTransform: noop,
+    fill: () => { calls.fill++; },
+    fillText: () => { calls.fillText++; },
+    clearRect: () => { calls.clearRect++; },
+  };
+}
+
+function makeGrid() {
+  const ctx = mockContext();
+  const selections = [];
+  const grid = new DeskGrid({
+    canvas: { getContext: () => ctx, style: {} },
+    scroller: { scrollLeft: 0 },
+    spacer: { style: {} },
+    onSelect: cells => selections.push(cells.length),
+    requestFrame: fn => fn(),
+    measure: () => VIEW_W,
+    pixelRatio: 1,
+  });
+  return { grid, ctx, selections };
+}
+
+function payload(desks, bookedEvery) {
+  const ids = Array.from({ length: desks }, (_, i) => i + 1);
+  const times = Array.from({ length: SLOTS }, (_, i) => {
+    const m = 9 * 60 + i * 30;
+    return String(Math.floor(m / 60)).padStart(2, "0") + ":" + String(m % 60).padStart(2, "0");
+  });
+  const booked = [];
+  ids.forEach(d => times.forEach((t, row) => {
+    if ((d * SLOTS + row) % bookedEvery === 0) booked.push(d + "_" + t);
+  }));
+  return {
+    version: 1,
+    desks: ids,
+    deskNames: Object.fromEntries(ids.map(d => [d, "Desk " + d])),
+    times,
+    booked,
+    pastTimes: times.slice(0, 4),
+    dateLabel: "01/06/2026",
+    focusDesk: null,
+    conflicts: [],
+  };
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.floor(sorted.length / 2)];
+}
+
+// Time `step` on a fresh grid prepared by `setup`, `runs` times
+function measure(runs, setup, step) {
+  const times = [];
+  let painted = 0;
+  let updates = 0;
+  for (let r = 0; r < runs; r++) {
+    const env = makeGrid();
+    setup(env);
+    env.ctx.calls.fill = 0;
+    env.selections.length = 0;
+
+    const started = performance.now();
+    step(env);
+    times.push(performance.now() - started);
+
+    painted = env.ctx.calls.fill;
+    updates = env.selections.length;
+  }
+  return { ms: +median(times).toFixed(3), cells_painted: painted, selection_updates: updates };
+}
+
+function bench(desks, runs) {
+  const base = payload(desks, 7);
+  const changed = { ...base, booked: [...base.booked] };
+  // Five newly booked cells spread over the first viewport
+  for (let k = 0; k < 5; k++) changed.booked.push(`${1 + k * 2}_${base.times[10 + k]}`);
+
+  const colW = (env) => env.grid.colW;
+  const cell = (env, col, row) => [90 + col * colW(env) + colW(env) / 2, 32 + row * 50 + 21];
+
+  return {
+    cells: desks * SLOTS,
+    build: measure(runs, () => {}, ({ grid }) => grid.setData(base)),
+    rerun: measure(runs, ({ grid }) => grid.setData(base), ({ grid }) => grid.setData(base)),
+    patch: measure(runs, ({ grid }) => grid.setData(base), ({ grid }) => grid.setData(changed)),
+    scroll: measure(runs, ({ grid }) => grid.setData(base), ({ grid }) => {
+      grid.scrollLeft += VIEW_W - 90;
+      grid.scrollTo(grid.scrollLeft);
+      grid.invalidate();
+    }),
+    drag: measure(runs, ({ grid }) => grid.setData(base), (env) => {
+      const { grid } = env;
+      grid.pointerDown(...cell(env, 0, 5));
+      for (let col = 0; col < 8; col++) {
+        for (let row = 5; row < 11; row++) grid.pointerMove(...cell(env, col, row));
+      }
+      grid.pointerUp();
+    }),
+  };
+}
+
+function main() {
+  const desks = option("desks", "50,200,1000").split(",").map(Number);
+  const runs = Number(option("runs", "20"));
+
+  const results = {};
+  desks.forEach(n => { results[n] = bench(n, runs); });
+  console.log(JSON.stringify(results, null, 2));
+}
+
+main();
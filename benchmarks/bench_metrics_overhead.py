@@ -0,0 +1,106 @@
+"""
+Measure what the metrics instrumentation costs on the hot path.
+
+Times the raw registry operations, then get_conn() and confirm_booking()
+with metrics switched off and on (utils.metrics.ENABLED is checked at
+call time, so one process can compare both). Off and on runs alternate
+for several rounds and the best of each is reported, to keep machine
+noise out of the comparison. Finally times a /metrics render.
+
+    python benchmarks/bench_metrics_overhead.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db, metrics  # noqa: E402
+from utils.bookings import DAY_START_MIN, SLOT_MINUTES, confirm_booking  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+
+MICRO_ITERATIONS = 200_000
+CONN_ITERATIONS = 5_000
+BOOKINGS = 500
+ROUNDS = 5
+
+
+def per_op_ns(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def time_connections() -> float:
+    def open_close():
+        db.get_conn().close()
+
+    return per_op_ns(open_close, CONN_ITERATIONS) / 1000
+
+
+def time_bookings(first_day: int) -> float:
+    """Mean confirm_booking latency in µs, one slot per call on fresh cells."""
+    desks = 15
+    slots = 18
+    started = time.perf_counter()
+    for i in range(BOOKINGS):
+        desk = i % desks + 1
+        day = first_day + i // (desks * slots)
+        start = DAY_START_MIN + (i // desks) % slots * SLOT_MINUTES
+        confirm_booking(1, day, {desk: (start, start + SLOT_MINUTES)})
+    return (time.perf_counter() - started) / BOOKINGS * 1e6
+
+
+def main():
+    db.ensure_db()
+    conn = db.get_conn()
+    conn.execute("INSERT INTO users (name, email, role, can_book, is_active) VALUES ('Bench', 'bench@example.com', 'user', 1, 1)")
+    conn.commit()
+    conn.close()
+
+    counter = metrics.Counter("bench_total", "bench")
+    labelled = metrics.Counter("bench_labelled_total", "bench", ["outcome"])
+    histogram = metrics.Histogram("bench_seconds", "bench")
+
+    check_ns = per_op_ns(lambda: metrics.ENABLED, MICRO_ITERATIONS)
+    inc_ns = per_op_ns(counter.inc, MICRO_ITERATIONS)
+    labelled_ns = per_op_ns(lambda: labelled.inc("confirmed"), MICRO_ITERATIONS)
+    observe_ns = per_op_ns(lambda: histogram.observe(0.004), MICRO_ITERATIONS)
+
+    print("registry operations")
+    print(f"  enabled check:      {check_ns:7.0f} ns")
+    print(f"  counter.inc():      {inc_ns:7.0f} ns")
+    print(f"  labelled inc():     {labelled_ns:7.0f} ns")
+    print(f"  histogram.observe:  {observe_ns:7.0f} ns")
+    # get_conn: one counter; confirm_booking: histogram, labelled counter, counter
+    print("added per call (from the figures above)")
+    print(f"  get_conn:           {(check_ns + inc_ns) / 1000:7.2f} µs")
+    print(f"  confirm_booking:    {(check_ns + inc_ns + labelled_ns + observe_ns) / 1000:7.2f} µs")
+
+    # Each bookings run covers ~2 days of fresh cells
+    next_day = day_number(date.today() + timedelta(days=30))
+    results = {False: [float("inf")] * 2, True: [float("inf")] * 2}
+    for _ in range(ROUNDS):
+        for enabled in (False, True):
+            metrics.ENABLED = enabled
+            timings = (time_connections(), time_bookings(next_day))
+            next_day += 3
+            results[enabled] = [min(best, t) for best, t in zip(results[enabled], timings)]
+
+    print(f"hot path, best of {ROUNDS} (metrics off -> on)")
+    for label, index in (("get_conn + close", 0), ("confirm_booking", 1)):
+        off, on = results[False][index], results[True][index]
+        print(f"  {label:18s}  {off:8.1f} µs -> {on:8.1f} µs  ({(on - off) / off:+.1%})")
+
+    started = time.perf_counter()
+    body = metrics.render()
+    print(f"render /metrics:      {(time.perf_counter() - started) * 1000:.2f} ms, {len(body.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
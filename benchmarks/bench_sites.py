@@ -0,0 +1,185 @@
+"""
+Per-site databases: booking throughput and cross-site report cost.
+
+Creates --sites sites (the primary plus --sites - 1 with their own
+database file), each with --desks desks. Then:
+
+  * --threads threads confirm --per-thread single-slot bookings each, first
+    all at the primary site (one writer, one file), then spread across
+    every site (one writer and file per site). Reports bookings/s and
+    the median confirm latency of each run.
+  * seeds --bookings past bookings per site and times two reports run
+    against every site one after another and through fan_out, which
+    reads the sites on parallel threads: the Analytics bookings query
+    (row-heavy: building Python rows holds the GIL) and a per-user
+    attendance aggregate (the work stays inside SQLite, which releases
+    the GIL).
+
+    python benchmarks/bench_sites.py
+    python benchmarks/bench_sites.py --sites 8 --threads 16 --bookings 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.analytics import _site_bookings  # noqa: E402
+from utils.bookings import DAY_START_MIN, SLOT_MINUTES, confirm_booking  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+from utils.sites import create_site  # noqa: E402
+
+
+def seed_desks(conn, sites: list[int], per_site: int) -> dict[int, list[int]]:
+    desks = {}
+    for site_id in sites:
+        desks[site_id] = [
+            conn.execute(
+                "INSERT INTO desks (name, location, is_active, admin_only, site_id) VALUES (?, 'Office', 1, 0, ?)",
+                (f"Site {site_id} desk {i}", site_id),
+            ).lastrowid
+            for i in range(per_site)
+        ]
+    conn.commit()
+    return desks
+
+
+def booking_run(jobs: list[list[tuple]]) -> tuple[float, list[float]]:
+    """Each thread confirms its own (user_id, day, desk_id, start) bookings."""
+    latencies = []
+    lock = threading.Lock()
+
+    def work(thread_jobs):
+        mine = []
+        for user_id, day, desk_id, start in thread_jobs:
+            t0 = time.perf_counter()
+            confirm_booking(user_id, day, {desk_id: (start, start + SLOT_MINUTES)})
+            mine.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=work, args=(thread_jobs,)) for thread_jobs in jobs]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies
+
+
+def plan(users: list[int], desks: list[int], first_day: int, threads: int, per_thread: int) -> list[list[tuple]]:
+    """Distinct user-days and desk-slots, so no booking conflicts or hits a quota."""
+    slots = 18
+    jobs = []
+    for t in range(threads):
+        thread_jobs = []
+        for k in range(per_thread):
+            n = t * per_thread + k
+            desk = desks[n % len(desks)]
+            start = DAY_START_MIN + SLOT_MINUTES * ((n // len(desks)) % slots)
+            day = first_day + n // (len(desks) * slots)
+            thread_jobs.append((users[n % len(users)], day, desk, start))
+        jobs.append(thread_jobs)
+    return jobs
+
+
+def attendance(conn, day_from: int, day_to: int) -> list:
+    return conn.execute(
+        """
+        SELECT user_id, SUM(checked_in), SUM(status = 'no_show'), SUM(end_min - start_min)
+        FROM bookings
+        WHERE day BETWEEN ? AND ?
+        GROUP BY user_id
+        """,
+        (day_from, day_to),
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--desks", type=int, default=50, help="desks per site")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=100)
+    parser.add_argument("--bookings", type=int, default=50000, help="past bookings per site for the report")
+    args = parser.parse_args()
+
+    db.ensure_db()
+    sites = [db.PRIMARY_SITE_ID] + [create_site(f"Site {i}", "bench@example.com") for i in range(2, args.sites + 1)]
+    conn = db.get_conn()
+    desks = seed_desks(conn, sites, args.desks)
+    total = args.threads * args.per_thread
+    users = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(total)
+    ]
+    conn.commit()
+    conn.close()
+
+    # Next Monday onward; a weekend day in the plan is fine for the writer
+    first_day = day_number(date.today() + timedelta(days=7 - date.today().weekday()))
+
+    one_site = plan(users, desks[db.PRIMARY_SITE_ID], first_day, args.threads, args.per_thread)
+    spread_desks = [desk for group in zip(*desks.values()) for desk in group]
+    spread = plan(users, spread_desks, first_day + 60, args.threads, args.per_thread)
+
+    print(
+        f"{args.sites} sites x {args.desks} desks, {args.threads} threads x {args.per_thread} bookings, "
+        f"{os.cpu_count()} CPUs"
+    )
+    for label, jobs in (("primary site only", one_site), ("spread over sites", spread)):
+        elapsed, latencies = booking_run(jobs)
+        print(f"  {label:18} {total / elapsed:8.0f} bookings/s, median confirm {statistics.median(latencies):.2f} ms")
+
+    # ---- Cross-site report ----
+    rng = random.Random(3)
+    today = day_number(date.today())
+    for site_id in sites:
+        site_conn = db.get_site_conn(site_id)
+        rows = []
+        for _ in range(args.bookings):
+            start = DAY_START_MIN + SLOT_MINUTES * rng.randrange(16)
+            rows.append((rng.choice(users), rng.choice(desks[site_id]), today - rng.randrange(1, 120), start, start + 60))
+        site_conn.executemany(
+            "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+            "VALUES (?, ?, ?, ?, ?, 'booked', 1)",
+            rows,
+        )
+        site_conn.commit()
+        site_conn.close()
+
+    def sequential(fn):
+        result = []
+        for site_id in sites:
+            site_conn = db.get_site_conn(site_id)
+            result.extend(fn(site_conn, today - 90, today))
+            site_conn.close()
+        return result
+
+    def parallel(fn):
+        return [row for rows in db.fan_out(fn, today - 90, today).values() for row in rows]
+
+    for report, fn in (("bookings", _site_bookings), ("attendance", attendance)):
+        for label, run in (("sites in turn", sequential), ("fan_out", parallel)):
+            times = []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                rows = run(fn)
+                times.append((time.perf_counter() - t0) * 1000)
+            print(f"  {report + ' report,':19} {label:13} {statistics.median(times):8.1f} ms ({len(rows)} rows)")
+
+
+if __name__ == "__main__":
+    main()
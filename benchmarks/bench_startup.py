@@ -0,0 +1,122 @@
+"""
+Cold start profile for the Streamlit pages.
+
+Each page is rendered in a fresh interpreter (python -X importtime)
+through streamlit.testing.v1.AppTest with a stubbed OAuth session. The
+first render includes importing everything the page needs. Per page it
+reports:
+  interpreter_ms   - process start until streamlit is imported
+  first_render_ms  - first AppTest run (cold imports, schema check)
+  warm_render_ms   - second run of the same page
+  imports_ms       - import time per top-level package, largest first
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py pages/2_Book_a_Desk.py --top 5
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PAGES = ["app.py"] + sorted(
+    str(path.relative_to(ROOT)) for path in (ROOT / "pages").glob("*.py")
+)
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def child(page: str) -> None:
+    """Render one page cold and print timings as JSON (runs in a subprocess)."""
+    started = float(os.environ["BENCH_STARTED"])
+    sys.path.insert(0, str(ROOT))
+
+    from streamlit.testing.v1 import AppTest
+
+    interpreter = time.time() - started
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=120)
+    at.secrets["oauth"] = {"client_id": "x", "client_secret": "y", "redirect_uri": "http://localhost"}
+    at.session_state["oauth_email"] = "bench@richmondchambers.com"
+    at.session_state["oauth_name"] = "Bench"
+    if page != "app.py":
+        for key, value in {
+            "user_id": 1,
+            "user_email": "bench@richmondchambers.com",
+            "user_name": "Bench",
+            "role": "admin",
+            "can_book": 1,
+        }.items():
+            at.session_state[key] = value
+
+    t0 = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    at.run()
+    warm = time.perf_counter() - t0
+
+    print(json.dumps({
+        "interpreter_ms": round(interpreter * 1000, 1),
+        "first_render_ms": round(first * 1000, 1),
+        "warm_render_ms": round(warm * 1000, 1),
+        "exceptions": len(at.exception),
+    }))
+
+
+def import_breakdown(stderr: str, top: int) -> dict:
+    """Sum -X importtime self times by top-level package."""
+    by_package = defaultdict(int)
+    for match in IMPORT_LINE.finditer(stderr):
+        self_us, _, _, module = match.groups()
+        by_package[module.split(".")[0]] += int(self_us)
+
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {name: round(us / 1000, 1) for name, us in ranked}
+
+
+def profile(page: str, db_path: str, top: int) -> dict:
+    env = {**os.environ, "DESK_BOOKING_DB_PATH": db_path, "BENCH_STARTED": repr(time.time())}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "--child", page],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=ROOT,
+    )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode or not lines:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["no output"]}
+
+    return {**json.loads(lines[-1]), "imports_ms": import_breakdown(proc.stderr, top)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", default=PAGES)
+    parser.add_argument("--top", type=int, default=8, help="packages listed per page")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    db_path = str(Path(tempfile.mkdtemp()) / "startup.db")
+    # Warm the database once so every page measures imports, not the first migration
+    profile("app.py", db_path, args.top)
+
+    results = {page: profile(page, db_path, args.top) for page in args.pages}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Load test for booking writes under contention.
+
+Runs the same booking workload twice from many threads:
+  direct       - each write opens its own connection (the old behaviour,
+                 no busy timeout) and commits itself
+  coordinator  - writes go through utils.writer.WriteCoordinator
+
+and prints a JSON summary with lock errors and latency percentiles.
+
+    python benchmarks/bench_write_contention.py --threads 32 --rate 400 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.bookings import BookingError, insert_bookings  # noqa: E402
+from utils.bookings import SLOT_MINUTES, day_slots  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+from utils.writer import WriteCoordinator, is_lock_error  # noqa: E402
+
+N_DESKS = 15
+N_USERS = 200
+
+
+def setup_database():
+    db.ensure_db()
+    conn = db.get_conn()
+    conn.executemany(
+        "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+        [(f"User {i}", f"user{i}@example.com") for i in range(N_USERS)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def random_booking(rng):
+    day = date.today() + timedelta(days=rng.randint(1, 60))
+    start = rng.choice(day_slots())
+    return (
+        rng.randint(1, N_USERS),
+        day_number(day),
+        {rng.randint(1, N_DESKS): (start, start + SLOT_MINUTES)},
+    )
+
+
+def direct_write(user_id, day, intervals):
+    conn = db.get_site_conn()
+    conn.execute("PRAGMA busy_timeout = 0")
+    try:
+        insert_bookings(conn, user_id, day, intervals)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def reset_bookings():
+    conn = db.get_site_conn()
+    conn.execute("DELETE FROM bookings")
+    conn.commit()
+    conn.close()
+
+
+def run(mode, threads, rate, seconds):
+    reset_bookings()
+    coordinator = WriteCoordinator(db.site_db_path(db.PRIMARY_SITE_ID), attach_catalogue=True) if mode == "coordinator" else None
+    results = {"ok": 0, "conflicts": 0, "lock_errors": 0, "other_errors": 0}
+    latencies = []
+    lock = threading.Lock()
+    interval = threads / rate
+    stop_at = time.monotonic() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        next_at = time.monotonic() + rng.random() * interval
+        while next_at < stop_at:
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            next_at += interval
+            args = random_booking(rng)
+
+            t0 = time.perf_counter()
+            outcome = "ok"
+            try:
+                if coordinator:
+                    coordinator.submit(insert_bookings, *args).result(timeout=30)
+                else:
+                    direct_write(*args)
+            except BookingError:
+                outcome = "conflicts"
+            except Exception as exc:
+                outcome = "lock_errors" if is_lock_error(exc) else "other_errors"
+            elapsed = time.perf_counter() - t0
+
+            with lock:
+                results[outcome] += 1
+                latencies.append(elapsed)
+
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.monotonic()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    duration = time.monotonic() - started
+
+    summary = {
+        "mode": mode,
+        "threads": threads,
+        "target_wps": rate,
+        "achieved_wps": round(len(latencies) / duration, 1),
+        **results,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+    }
+
+    if coordinator:
+        coordinator.close()
+        summary["writer"] = coordinator.stats
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=400, help="target writes per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--mode", choices=["direct", "coordinator", "both"], default="both")
+    args = parser.parse_args()
+
+    setup_database()
+    modes = ["direct", "coordinator"] if args.mode == "both" else [args.mode]
+    print(json.dumps([run(mode, args.threads, args.rate, args.seconds) for mode in modes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+"""
+Booking correctness: random and concurrent cases against a reference model.
+
+The reference model is the booking rules at their most literal: each
+(desk, day, slot) cell holds at most one booking, found by looking the
+cell up. The real path is what the Book a Desk page runs: day_grid for
+the grid, book_selection for the confirm button (selection_to_intervals,
+the stale-cell check and confirm_booking with the grid's version),
+cancel_bookings_for_user and check_in, through the per-site writers on a
+temporary database with --sites sites.
+
+  * selection: 20 x --cases random grid selections through
+    selection_to_intervals and random rows through booked_cells, against
+    the rules read directly (contiguous slots, none started yet; a slot
+    is covered if the booking overlaps it).
+  * sequences: --cases random sequences of renders, bookings (with a
+    fresh grid, a stale one, or none), cancellations and check-ins on a
+    fresh day. Every outcome must match the model, every rendered grid
+    must equal the model's, and at the end the day's rows must match and
+    no desk may hold overlapping booked intervals.
+  * quotas: --quotas random sequences of bookings and cancellations by
+    one user with a daily and weekly quota, over one week at every site.
+    Each booking must be refused exactly when the user's usage summed
+    over the sites breaks a quota, and the Dashboard's quota_usage must
+    match the model's totals.
+  * concurrent: --concurrent cases in which --threads threads book,
+    cancel and check in on the same few desks with the writers' normal
+    group commit. Outcomes depend on timing, so the checks are the
+    invariants: no overlaps, every confirmed booking stored (and only
+    those), cancellations and check-ins applied once and only by the
+    owner, the grid equal to the model rebuilt from what was confirmed,
+    and every reported conflict covered by a confirmed booking.
+
+Case i uses seed --seed + i; a failure prints the command to rerun it.
+Exits non-zero if any case fails.
+
+    python benchmarks/booking_properties.py
+    python benchmarks/booking_properties.py --cases 5000 --seed 7
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as clock
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.bookings import (  # noqa: E402
+    DAY_END_MIN,
+    DAY_START_MIN,
+    SLOT_MINUTES,
+    BookingConflict,
+    BookingError,
+    book_selection,
+    booked_cells,
+    cancel_bookings_for_user,
+    check_in,
+    day_grid,
+    day_slots,
+    selection_to_intervals,
+)
+from utils.dates import day_number, hhmm, minute_of_day  # noqa: E402
+from utils.quotas import quota_usage, set_role_quota  # noqa: E402
+from utils.sites import create_site  # noqa: E402
+from utils.writer import GROUP_COMMIT_WINDOW_SECONDS, get_writer  # noqa: E402
+
+# Far enough ahead that only an explicit `now` makes a slot past
+BASE_DATE = date(2040, 1, 2)
+DESKS_PER_SITE = 4
+USERS = 4
+SELECTIONS_PER_CASE = 20
+# Quota cases book whole weeks from here, clear of the other phases' days
+QUOTA_BASE_DATE = date(2050, 1, 3)
+QUOTA = {"minutes_per_day": 90, "days_per_week": 2, "advance_days": None}
+
+CONTIGUOUS = "Selected time slots must be continuous."
+PAST = "Cannot book time slots in the past."
+
+
+class CaseFailure(AssertionError):
+    pass
+
+
+def expect(condition, message, *details):
+    if not condition:
+        raise CaseFailure(" ".join([message, *map(repr, details)]))
+
+
+# ---------------------------------------------------
+# REFERENCE MODEL
+# ---------------------------------------------------
+def slot_started(day: date, minute: int, now: datetime) -> bool:
+    return datetime.combine(day, clock(minute // 60, minute % 60)) < now
+
+
+def covered(start_min: int, end_min: int) -> list[int]:
+    """Slots a booking from `start_min` to `end_min` overlaps."""
+    return [m for m in day_slots() if start_min < m + SLOT_MINUTES and end_min > m]
+
+
+def selection_errors(cells, day: date, now: datetime) -> set[str]:
+    """Every rule the selection breaks (the real path reports one of them)."""
+    by_desk = {}
+    for cell in cells:
+        desk_id, at = cell.split("_")
+        by_desk.setdefault(int(desk_id), []).append(minute_of_day(at))
+
+    errors = set()
+    for minutes in by_desk.values():
+        if sorted(minutes) != list(range(min(minutes), max(minutes) + 1, SLOT_MINUTES)):
+            errors.add(CONTIGUOUS)
+        if any(slot_started(day, m, now) for m in minutes):
+            errors.add(PAST)
+    return errors
+
+
+class Reference:
+    """One owner per (desk_id, day, slot) cell; bookings by model id."""
+
+    def __init__(self):
+        self.cells: dict[tuple[int, int, int], int] = {}
+        self.bookings: dict[int, dict] = {}
+        self._ids = itertools.count(1)
+
+    def grid(self, day: int) -> set[str]:
+        return {f"{desk_id}_{hhmm(m)}" for desk_id, cell_day, m in self.cells if cell_day == day}
+
+    def add(self, user_id: int, desk_id: int, day: int, start_min: int, end_min: int) -> int:
+        booking_id = next(self._ids)
+        self.bookings[booking_id] = {
+            "user_id": user_id, "desk_id": desk_id, "day": day,
+            "start_min": start_min, "end_min": end_min, "status": "booked", "checked_in": 0,
+        }
+        for m in covered(start_min, end_min):
+            self.cells[(desk_id, day, m)] = booking_id
+        return booking_id
+
+    def book(self, user_id: int, selected: date, cells, view_booked, now: datetime) -> tuple:
+        day = day_number(selected)
+        if view_booked is not None and set(cells) & view_booked:
+            return ("conflict", sorted(set(cells) & view_booked))
+
+        errors = selection_errors(cells, selected, now)
+        if errors:
+            return ("rejected", errors)
+
+        spans = {}
+        for cell in cells:
+            desk_id, at = cell.split("_")
+            spans.setdefault(int(desk_id), []).append(minute_of_day(at))
+        taken = sorted(
+            f"{desk_id}_{hhmm(m)}" for desk_id, minutes in spans.items() for m in minutes
+            if (desk_id, day, m) in self.cells
+        )
+        if taken:
+            return ("conflict", taken)
+
+        return (
+            "booked",
+            [self.add(user_id, desk_id, day, min(minutes), max(minutes) + SLOT_MINUTES)
+             for desk_id, minutes in spans.items()],
+        )
+
+    def cancel(self, user_id: int, booking_id: int) -> int:
+        booking = self.bookings[booking_id]
+        if booking["user_id"] != user_id or booking["status"] != "booked":
+            return 0
+        booking["status"] = "cancelled"
+        for m in covered(booking["start_min"], booking["end_min"]):
+            del self.cells[(booking["desk_id"], booking["day"], m)]
+        return 1
+
+    def check_in(self, user_id: int, booking_id: int) -> bool:
+        booking = self.bookings[booking_id]
+        if booking["user_id"] != user_id or booking["status"] != "booked" or booking["checked_in"]:
+            return False
+        booking["checked_in"] = 1
+        return True
+
+
+# ---------------------------------------------------
+# RANDOM INPUT
+# ---------------------------------------------------
+def random_cells(rng: random.Random, desks: list[int], view_booked) -> list[str]:
+    """A grid selection: mostly one contiguous run per desk, sometimes with a gap or a booked cell."""
+    cells = []
+    for desk_id in rng.sample(desks, rng.choice((1, 1, 1, 2))):
+        first = rng.randrange(len(day_slots()))
+        run = day_slots()[first:first + rng.randint(1, 4)]
+        if len(run) > 2 and rng.random() < 0.1:
+            run.pop(rng.randrange(1, len(run) - 1))
+        cells.extend(f"{desk_id}_{hhmm(m)}" for m in run)
+    if view_booked and rng.random() < 0.1:
+        # A stale component value: a cell the grid shows as booked
+        cells.append(rng.choice(sorted(set(view_booked) - set(cells)) or cells))
+    return list(dict.fromkeys(cells))
+
+
+def random_now(rng: random.Random, day: date) -> datetime:
+    """Usually now; sometimes during or after `day`, so some slots have started."""
+    roll = rng.random()
+    if roll < 0.85:
+        return datetime.now()
+    if roll < 0.95:
+        minute = rng.randrange(DAY_START_MIN - SLOT_MINUTES, DAY_END_MIN + SLOT_MINUTES)
+        return datetime.combine(day, clock()) + timedelta(minutes=minute, seconds=rng.randrange(60))
+    return datetime.combine(day + timedelta(days=1), clock())
+
+
+def render(site_id: int, day: int) -> dict:
+    conn = db.get_site_conn(site_id)
+    version, booked = day_grid(conn, day)
+    conn.close()
+    return {"version": version, "booked": booked}
+
+
+def day_rows(site_id: int, day: int) -> list:
+    conn = db.get_site_conn(site_id)
+    rows = conn.execute(
+        "SELECT id, user_id, desk_id, start_min, end_min, status, checked_in FROM bookings WHERE day = ?",
+        (day,),
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def overlaps(site_id: int, day: int) -> list:
+    conn = db.get_site_conn(site_id)
+    rows = conn.execute(
+        """
+        SELECT a.id, b.id
+        FROM bookings a
+        JOIN bookings b
+          ON b.desk_id = a.desk_id AND b.day = a.day AND b.id > a.id
+         AND b.start_min < a.end_min AND a.start_min < b.end_min
+        WHERE a.day = ? AND a.status = 'booked' AND b.status = 'booked'
+        """,
+        (day,),
+    ).fetchall()
+    conn.close()
+    return [tuple(row) for row in rows]
+
+
+# ---------------------------------------------------
+# SELECTION & GRID CELLS (no database)
+# ---------------------------------------------------
+def selection_case(rng: random.Random, desks: list[int]) -> int:
+    for _ in range(SELECTIONS_PER_CASE):
+        day = BASE_DATE + timedelta(days=rng.randrange(7))
+        cells = random_cells(rng, desks, None)
+        now = random_now(rng, day)
+        errors = selection_errors(cells, day, now)
+        try:
+            intervals = selection_to_intervals(cells, day, now)
+        except BookingError as exc:
+            expect(str(exc) in errors, "selection rejected for the wrong reason:", cells, now, str(exc), errors)
+        else:
+            expect(not errors, "invalid selection accepted:", cells, now, errors)
+            expect(
+                booked_cells((desk_id, *span) for desk_id, span in intervals.items()) == set(cells),
+                "intervals do not cover the selection:", cells, intervals,
+            )
+
+        rows = []
+        for _ in range(rng.randint(0, 4)):
+            start = rng.randrange(DAY_START_MIN - 90, DAY_END_MIN + 30, rng.choice((1, 15, SLOT_MINUTES)))
+            rows.append((rng.choice(desks), start, start + rng.randrange(0, 240, rng.choice((1, 15, SLOT_MINUTES)))))
+        literal = {f"{desk_id}_{hhmm(m)}" for desk_id, start, end in rows for m in covered(start, end)}
+        expect(booked_cells(rows) == literal, "booked_cells disagrees:", rows)
+    return SELECTIONS_PER_CASE
+
+
+# ---------------------------------------------------
+# SEQUENCES (one caller, outcome by outcome)
+# ---------------------------------------------------
+def sequence_case(rng: random.Random, site_id: int, desks: list[int], users: list[int], selected: date) -> int:
+    day = day_number(selected)
+    model = Reference()
+    ids = {}  # real booking id -> model id
+    view = None
+    steps = rng.randint(5, 30)
+
+    for step in range(steps):
+        roll = rng.random()
+        where = f"step {step}:"
+        if view is None or roll < 0.2:
+            view = render(site_id, day)
+            expect(view["booked"] == model.grid(day), where, "grid differs from the model:",
+                   sorted(view["booked"] ^ model.grid(day)))
+        elif roll < 0.7:
+            user_id = rng.choice(users)
+            seen = view if rng.random() < 0.7 else None
+            cells = random_cells(rng, desks, view["booked"])
+            now = random_now(rng, selected)
+            expected = model.book(user_id, selected, cells, seen["booked"] if seen else None, now)
+            try:
+                booking_ids = book_selection(user_id, selected, cells, seen, now)
+            except BookingConflict as exc:
+                expect(expected == ("conflict", exc.cells), where, "conflict", exc.cells, "expected", expected, cells)
+            except BookingError as exc:
+                expect(expected[0] == "rejected" and str(exc) in expected[1], where, str(exc), "expected", expected)
+            else:
+                expect(expected[0] == "booked" and len(booking_ids) == len(expected[1]),
+                       where, "booked", booking_ids, "expected", expected, cells)
+                ids.update(zip(booking_ids, expected[1]))
+        elif ids:
+            user_id = rng.choice(users)
+            booking_id = rng.choice(list(ids))
+            actor = f"user{user_id}@example.com"
+            if roll < 0.85:
+                got = cancel_bookings_for_user(user_id, [booking_id], actor, site_id=site_id)
+                expected = model.cancel(user_id, ids[booking_id])
+            else:
+                got = check_in(user_id, booking_id, actor, site_id=site_id)
+                expected = model.check_in(user_id, ids[booking_id])
+            expect(got == expected, where, "cancel" if roll < 0.85 else "check-in", booking_id, got, "expected", expected)
+
+    expect(render(site_id, day)["booked"] == model.grid(day), "final grid differs from the model")
+    expect(not overlaps(site_id, day), "overlapping booked intervals:", overlaps(site_id, day))
+    rows = {row["id"]: dict(row) for row in day_rows(site_id, day)}
+    expect(set(rows) == set(ids), "stored bookings differ:", sorted(rows), sorted(ids))
+    for real_id, model_id in ids.items():
+        stored = {key: rows[real_id][key] for key in model.bookings[model_id] if key != "day"}
+        expected = {key: value for key, value in model.bookings[model_id].items() if key != "day"}
+        expect(stored == expected, "booking", real_id, stored, "expected", expected)
+    return steps
+
+
+# ---------------------------------------------------
+# QUOTAS (one user booking at several sites)
+# ---------------------------------------------------
+def quota_case(rng: random.Random, desks: dict[int, list[int]], user_id: int, monday: date) -> int:
+    model = Reference()
+    held = {}  # real booking id -> (model id, site id)
+    steps = rng.randint(4, 12)
+
+    for step in range(steps):
+        live = [b for b, (model_id, _) in held.items() if model.bookings[model_id]["status"] == "booked"]
+        if live and rng.random() < 0.25:
+            booking_id = rng.choice(live)
+            model_id, site_id = held[booking_id]
+            got = cancel_bookings_for_user(user_id, [booking_id], "capped@example.com", site_id=site_id)
+            expect(got == model.cancel(user_id, model_id), f"step {step}: cancel", booking_id, got)
+            continue
+
+        site_id = rng.choice(list(desks))
+        desk_id = rng.choice(desks[site_id])
+        selected = monday + timedelta(days=rng.randrange(5))
+        day = day_number(selected)
+        start = rng.choice(day_slots()[:-1])
+        end = start + SLOT_MINUTES * rng.randint(1, 2)
+        cells = [f"{desk_id}_{hhmm(m)}" for m in range(start, end, SLOT_MINUTES)]
+
+        taken = sorted(cell for cell, m in zip(cells, range(start, end, SLOT_MINUTES)) if (desk_id, day, m) in model.cells)
+        mine = [b for b in model.bookings.values() if b["status"] == "booked"]
+        minutes = sum(b["end_min"] - b["start_min"] for b in mine if b["day"] == day) + end - start
+        if taken:
+            expected = ("conflict", taken)
+        elif minutes > QUOTA["minutes_per_day"]:
+            expected = ("rejected", f"You can book at most {QUOTA['minutes_per_day'] / 60:g} hours per day.")
+        elif len({b["day"] for b in mine} | {day}) > QUOTA["days_per_week"]:
+            expected = ("rejected", f"You can book at most {QUOTA['days_per_week']} days per week.")
+        else:
+            expected = ("booked",)
+
+        where = f"step {step}: site {site_id}, {cells}:"
+        try:
+            booking_ids = book_selection(user_id, selected, cells)
+        except BookingConflict as exc:
+            expect(expected == ("conflict", exc.cells), where, "conflict", exc.cells, "expected", expected)
+        except BookingError as exc:
+            expect(expected == ("rejected", str(exc)), where, str(exc), "expected", expected)
+        else:
+            expect(expected == ("booked",), where, "booked, expected", expected)
+            held[booking_ids[0]] = (model.add(user_id, desk_id, day, start, end), site_id)
+
+    mine = [b for b in model.bookings.values() if b["status"] == "booked"]
+    for offset in range(5):
+        day = day_number(monday + timedelta(days=offset))
+        usage = quota_usage(user_id, day)
+        expected = (
+            sum(b["end_min"] - b["start_min"] for b in mine if b["day"] == day),
+            len({b["day"] for b in mine}),
+        )
+        expect((usage["minutes"], usage["days"]) == expected, "quota_usage", usage, "expected", expected)
+    return steps
+
+
+# ---------------------------------------------------
+# CONCURRENT (invariants only: the interleaving is up to the scheduler)
+# ---------------------------------------------------
+def concurrent_case(
+    seed: int, site_id: int, desks: list[int], users: list[int], selected: date, threads: int, steps: int
+) -> int:
+    day = day_number(selected)
+    desks = desks[:2]  # few desks, so the threads collide
+    history = []
+    lock = threading.Lock()
+    errors = []  # raised in a thread
+
+    def work(n: int):
+        rng = random.Random(seed * 1000 + n)
+        user_id = users[n % len(users)]
+        mine, view, done = [], None, []
+        try:
+            for _ in range(steps):
+                roll = rng.random()
+                if view is None or roll < 0.2:
+                    view = render(site_id, day)
+                elif roll < 0.75:
+                    cells = random_cells(rng, desks, view["booked"])
+                    try:
+                        booking_ids = book_selection(user_id, selected, cells, view if rng.random() < 0.7 else None)
+                    except BookingConflict as exc:
+                        done.append(("conflict", user_id, exc.cells))
+                    except BookingError as exc:
+                        done.append(("rejected", user_id, str(exc)))
+                    else:
+                        done.append(("booked", user_id, booking_ids))
+                        mine.extend(booking_ids)
+                elif mine:
+                    # Mostly our own bookings, sometimes someone else's
+                    with lock:
+                        others = [b for event in history if event[0] == "booked" for b in event[2]]
+                    booking_id = rng.choice(others if others and rng.random() < 0.2 else mine)
+                    actor = f"user{user_id}@example.com"
+                    if roll < 0.9:
+                        done.append(("cancel", user_id, booking_id,
+                                     cancel_bookings_for_user(user_id, [booking_id], actor, site_id=site_id)))
+                    else:
+                        done.append(("check_in", user_id, booking_id, check_in(user_id, booking_id, actor, site_id=site_id)))
+                with lock:
+                    history.extend(done)
+                done = []
+        except Exception as exc:
+            errors.append(exc)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    expect(not errors, "unexpected errors:", errors)
+    rejected = {event[2] for event in history if event[0] == "rejected"}
+    expect(rejected <= {CONTIGUOUS}, "future selections rejected:", rejected)
+
+    rows = {row["id"]: row for row in day_rows(site_id, day)}
+    confirmed = {b: user_id for event, user_id, *rest in history if event == "booked" for b in rest[0]}
+    expect(set(rows) == set(confirmed), "stored bookings differ from the confirmed ones:", sorted(rows), sorted(confirmed))
+    expect(not overlaps(site_id, day), "overlapping booked intervals:", overlaps(site_id, day))
+
+    model = Reference()
+    for event, user_id, *rest in history:
+        if event in ("cancel", "check_in") and rest[1]:
+            expect(confirmed[rest[0]] == user_id, event, "applied for someone else:", rest)
+    cancelled = [b for event, _, b, n in (e for e in history if e[0] == "cancel") if n]
+    checked_in = [b for event, _, b, ok in (e for e in history if e[0] == "check_in") if ok]
+    expect(len(cancelled) == len(set(cancelled)), "a booking was cancelled twice:", cancelled)
+    expect(len(checked_in) == len(set(checked_in)), "a booking was checked in twice:", checked_in)
+    for booking_id, row in rows.items():
+        expect(row["status"] == ("cancelled" if booking_id in cancelled else "booked"), "status of", booking_id)
+        expect(row["checked_in"] == (booking_id in checked_in), "check-in of", booking_id)
+        expect(row["user_id"] == confirmed[booking_id], "owner of", booking_id)
+        if row["status"] == "booked":
+            model.add(row["user_id"], row["desk_id"], day, row["start_min"], row["end_min"])
+
+    expect(render(site_id, day)["booked"] == model.grid(day), "grid differs from the confirmed bookings")
+    ever_booked = booked_cells((row["desk_id"], row["start_min"], row["end_min"]) for row in rows.values())
+    for event, _, *rest in history:
+        if event == "conflict":
+            expect(set(rest[0]) <= ever_booked, "conflict on cells nobody booked:", rest[0])
+    return len(history)
+
+
+# ---------------------------------------------------
+# RUN
+# ---------------------------------------------------
+def setup(sites: int) -> tuple[dict[int, list[int]], list[int], int]:
+    db.ensure_db()
+    site_ids = [db.PRIMARY_SITE_ID] + [create_site(f"Site {i}", "bench@example.com") for i in range(2, sites + 1)]
+    conn = db.get_conn()
+    desks = {
+        site_id: [
+            conn.execute(
+                "INSERT INTO desks (name, location, is_active, admin_only, site_id) VALUES (?, 'Office', 1, 0, ?)",
+                (f"Site {site_id} desk {i}", site_id),
+            ).lastrowid
+            for i in range(DESKS_PER_SITE)
+        ]
+        for site_id in site_ids
+    }
+    users = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(USERS)
+    ]
+    capped = conn.execute(
+        "INSERT INTO users (name, email, role, can_book, is_active) VALUES ('Capped', 'capped@example.com', 'capped', 1, 1)"
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    set_role_quota("capped", QUOTA, "bench@example.com")
+    return desks, users, capped
+
+
+def run(label: str, cases: int, seed: int, check, rerun: str) -> int:
+    failures = 0
+    steps = 0
+    started = time.perf_counter()
+    for i in range(cases):
+        try:
+            steps += check(seed + i, i)
+        except CaseFailure as exc:
+            failures += 1
+            print(f"FAIL {label} case {i}: {exc}\n     rerun: {rerun.format(seed=seed + i)}")
+    elapsed = time.perf_counter() - started
+    status = "ok  " if not failures else "FAIL"
+    print(f"{status} {label:10} {cases} cases, {steps} steps, {failures} failed ({elapsed:.1f} s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=1000)
+    parser.add_argument("--quotas", type=int, default=200)
+    parser.add_argument("--concurrent", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=25, help="operations per thread in a concurrent case")
+    parser.add_argument("--sites", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    desks, users, capped = setup(args.sites)
+    site_ids = list(desks)
+    all_desks = [desk for site_desks in desks.values() for desk in site_desks]
+    rerun = "python benchmarks/booking_properties.py --seed {seed} --cases 1 --quotas 0 --concurrent 0"
+    # Every case books its own day; sequence and concurrent cases never share one
+    days = itertools.count()
+
+    failures = run(
+        "selection", args.cases, args.seed,
+        lambda seed, i: selection_case(random.Random(seed), all_desks), rerun,
+    )
+
+    # One caller at a time: committing each write at once is faster than
+    # waiting out the group window for writes that never come
+    for site_id in site_ids:
+        get_writer(site_id).group_window = 0
+    failures += run(
+        "sequences", args.cases, args.seed,
+        lambda seed, i: sequence_case(
+            random.Random(seed), site_ids[seed % len(site_ids)], desks[site_ids[seed % len(site_ids)]], users,
+            BASE_DATE + timedelta(days=next(days)),
+        ),
+        rerun,
+    )
+    weeks = itertools.count()
+    failures += run(
+        "quotas", args.quotas, args.seed,
+        lambda seed, i: quota_case(
+            random.Random(seed), desks, capped, QUOTA_BASE_DATE + timedelta(weeks=next(weeks)),
+        ),
+        "python benchmarks/booking_properties.py --seed {seed} --cases 0 --quotas 1 --concurrent 0",
+    )
+
+    for site_id in site_ids:
+        get_writer(site_id).group_window = GROUP_COMMIT_WINDOW_SECONDS
+    failures += run(
+        "concurrent", args.concurrent, args.seed,
+        lambda seed, i: concurrent_case(
+            seed, site_ids[seed % len(site_ids)], desks[site_ids[seed % len(site_ids)]], users,
+            BASE_DATE + timedelta(days=next(days)), args.threads, args.steps,
+        ),
+        "python benchmarks/booking_properties.py --seed {seed} --cases 0 --quotas 0 --concurrent 1",
+    )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Concurrent-session load test for the Streamlit pages.
+
+Every simulated user drives the real pages through streamlit.testing.v1
+AppTest with a stubbed OAuth session, looping over these scenarios
+against a synthetic database:
+  browse  - Book a Desk for a random day, then My Bookings
+  book    - Book a Desk, select free contiguous slots, confirm
+  cancel  - My Bookings, select an upcoming booking, cancel it
+  admin   - Admin Panel, search users, widen the bookings range
+
+Each session logs in through app.py first. AppTest swaps a global
+runtime in and out around every run, so runs cannot overlap inside one
+process: concurrency comes from worker processes sharing the database
+(one per session by default). With fewer processes than sessions each
+worker interleaves its sessions round-robin. Prints JSON with
+throughput, p50/p95/p99 rerun latency and error counts per page.
+
+    python benchmarks/load_apptest.py --sessions 16 --seconds 30
+    python benchmarks/load_apptest.py --sessions 32 --processes 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault(
+    "DESK_BOOKING_DB_PATH", str(Path(tempfile.mkdtemp()) / "load.db")
+)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from utils import db  # noqa: E402
+from utils.bookings import DAY_END_MIN, DAY_START_MIN, SLOT_MINUTES  # noqa: E402
+from utils.dates import day_number, hhmm  # noqa: E402
+
+EMAIL_DOMAIN = "richmondchambers.com"
+RERUN_TIMEOUT_SECONDS = 60
+
+APP = "app.py"
+BOOK = "pages/2_Book_a_Desk.py"
+MY_BOOKINGS = "pages/3_My_Bookings.py"
+ADMIN = "pages/6_Admin_Panel.py"
+
+USER_SCENARIOS = {"browse": 0.4, "book": 0.35, "cancel": 0.25}
+ADMIN_SCENARIOS = {"admin": 0.7, "browse": 0.3}
+
+
+# ---------------------------------------------------
+# SYNTHETIC DATABASE
+# ---------------------------------------------------
+def next_weekdays(count: int) -> list[date]:
+    days, d = [], date.today()
+    while len(days) < count:
+        d += timedelta(days=1)
+        if d.weekday() < 5:
+            days.append(d)
+    return days
+
+
+def setup_database(n_users: int, n_desks: int, n_admins: int, seed: int) -> None:
+    """Users, desks and ~40% occupied history/future on a fresh database."""
+    db.ensure_db()
+    rng = random.Random(seed)
+    conn = db.get_conn()
+
+    conn.executemany(
+        "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, ?, 1, 1)",
+        [
+            (f"Load User {i}", f"load{i}@{EMAIL_DOMAIN}", "admin" if i < n_admins else "user")
+            for i in range(n_users)
+        ],
+    )
+    existing = conn.execute("SELECT COUNT(*) FROM desks").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO desks (name, location, is_active, admin_only, floor, zone, pos_x, pos_y) "
+        "VALUES (?, 'Office', 1, 0, 1, 'Office', ?, ?)",
+        [(f"Load Desk {i}", i % 10, i // 10) for i in range(max(n_desks - existing, 0))],
+    )
+
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    desk_ids = [row[0] for row in conn.execute("SELECT id FROM desks WHERE admin_only = 0")]
+    rows = []
+    for offset in range(-60, 15):
+        d = date.today() + timedelta(days=offset)
+        if d.weekday() >= 5:
+            continue
+        for desk_id in desk_ids:
+            if rng.random() < 0.4:
+                start = rng.randrange(DAY_START_MIN, DAY_END_MIN - SLOT_MINUTES, SLOT_MINUTES)
+                end = min(start + rng.randint(1, 8) * SLOT_MINUTES, DAY_END_MIN)
+                rows.append((rng.choice(user_ids), desk_id, day_number(d), start, end))
+    conn.commit()
+    conn.close()
+
+    conn = db.get_site_conn()
+    conn.executemany(
+        "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+        "VALUES (?, ?, ?, ?, ?, 'booked', 0)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------------------------------
+# SIMULATED SESSION
+# ---------------------------------------------------
+class Recorder:
+    """Per-page samples: rerun latencies, exceptions, st.error output."""
+
+    def __init__(self):
+        self.samples = defaultdict(lambda: {"latencies": [], "exceptions": 0, "error_messages": 0})
+        self.scenarios = defaultdict(int)
+
+    def add(self, page, elapsed, exceptions, errors):
+        sample = self.samples[page]
+        sample["latencies"].append(elapsed)
+        sample["exceptions"] += exceptions
+        sample["error_messages"] += errors
+
+    def as_dict(self) -> dict:
+        return {"samples": dict(self.samples), "scenarios": dict(self.scenarios)}
+
+
+class Session:
+    """One signed-in user with an AppTest per page, reused across reruns."""
+
+    def __init__(self, index: int, recorder: Recorder, rng: random.Random):
+        self.email = f"load{index}@{EMAIL_DOMAIN}"
+        self.name = f"Load User {index}"
+        self.recorder = recorder
+        self.rng = rng
+        self.identity = {}
+        self.apps = {}
+
+    def _new_app(self, page: str) -> AppTest:
+        at = AppTest.from_file(str(ROOT / page), default_timeout=RERUN_TIMEOUT_SECONDS)
+        at.secrets["oauth"] = {
+            "client_id": "load-test",
+            "client_secret": "load-test",
+            "redirect_uri": "http://localhost:8501",
+        }
+        at.session_state["oauth_email"] = self.email
+        at.session_state["oauth_name"] = self.name
+        for key, value in self.identity.items():
+            at.session_state[key] = value
+        return at
+
+    def step(self, page: str, action=None) -> AppTest:
+        """Run (or act on) a page and record how long the rerun took."""
+        at = self.apps.get(page)
+        if at is None:
+            at = self.apps[page] = self._new_app(page)
+
+        started = time.perf_counter()
+        try:
+            at = action(at) if action else at.run()
+            exceptions, errors = len(at.exception), len(at.error)
+        except Exception:
+            exceptions, errors = 1, 0
+            self.apps.pop(page, None)
+        self.recorder.add(page, time.perf_counter() - started, exceptions, errors)
+        return at
+
+    def login(self) -> None:
+        at = self.step(APP)
+        self.identity = {
+            key: at.session_state[key]
+            for key in ("user_id", "user_email", "user_name", "role", "can_book")
+            if key in at.session_state
+        }
+
+    # ---------------------------------------------------
+    # SCENARIOS
+    # ---------------------------------------------------
+    def browse(self, desk_ids) -> None:
+        at = self.step(BOOK)
+        at.session_state["booking_date"] = self.rng.choice(next_weekdays(10))
+        self.step(BOOK, lambda a: a.run())
+        self.step(MY_BOOKINGS)
+
+    def book(self, desk_ids) -> None:
+        at = self.step(BOOK)
+        at.session_state["booking_date"] = self.rng.choice(next_weekdays(10))
+        at = self.step(BOOK, lambda a: a.run())
+
+        view = at.session_state["booking_grid_view"] if "booking_grid_view" in at.session_state else None
+        if not view:
+            return
+
+        desk_id = self.rng.choice(desk_ids)
+        start = self.rng.randrange(DAY_START_MIN, DAY_END_MIN - SLOT_MINUTES, SLOT_MINUTES)
+        length = self.rng.randint(1, 4)
+        cells = []
+        for minute in range(start, min(start + length * SLOT_MINUTES, DAY_END_MIN), SLOT_MINUTES):
+            cell = f"{desk_id}_{hhmm(minute)}"
+            if cell in view["booked"]:
+                break
+            cells.append(cell)
+        if not cells:
+            return
+
+        at.session_state["desk_grid"] = cells
+        self.step(BOOK, lambda a: _button(a, "Confirm booking").click().run())
+
+    def cancel(self, desk_ids) -> None:
+        at = self.step(MY_BOOKINGS)
+        if not any(b.label.startswith("Cancel selected") for b in at.button):
+            return
+
+        rows = len(at.dataframe[0].value)
+        at.session_state["upcoming_table"] = {
+            "selection": {"rows": [self.rng.randrange(rows)], "columns": []}
+        }
+        at = self.step(MY_BOOKINGS, lambda a: a.run())
+        self.step(MY_BOOKINGS, lambda a: _button(a, "Cancel selected").click().run())
+
+    def admin(self, desk_ids) -> None:
+        self.step(ADMIN)
+        prefix = self.rng.choice(["load1", "Load User 2", "load", ""])
+        self.step(ADMIN, lambda a: _text_input(a, "Search users").input(prefix).run())
+        today = date.today()
+        self.step(
+            ADMIN,
+            lambda a: _date_input(a, "bookings_range")
+            .set_value((today - timedelta(days=60), today + timedelta(days=14)))
+            .run(),
+        )
+
+
+def _button(at: AppTest, label_prefix: str):
+    return next(b for b in at.button if b.label.startswith(label_prefix))
+
+
+def _text_input(at: AppTest, label: str):
+    return next(w for w in at.text_input if w.label == label)
+
+
+def _date_input(at: AppTest, key: str):
+    return at.date_input(key=key)
+
+
+def pick(rng: random.Random, weights: dict) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def run_worker(indices, n_admins, seconds, desk_ids) -> dict:
+    """Interleave a group of sessions until the deadline; returns the raw samples."""
+    recorder = Recorder()
+    sessions = []
+    for index in indices:
+        session = Session(index, recorder, random.Random(index))
+        session.login()
+        sessions.append(session)
+
+    started = time.monotonic()
+    while time.monotonic() < started + seconds:
+        for index, session in zip(indices, sessions):
+            name = pick(session.rng, ADMIN_SCENARIOS if index < n_admins else USER_SCENARIOS)
+            recorder.scenarios[name] += 1
+            getattr(session, name)(desk_ids)
+
+    return {**recorder.as_dict(), "elapsed": time.monotonic() - started}
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarise(results: list[dict], args) -> dict:
+    # Throughput is over the scenario loop only (not process start-up or login)
+    duration = max(result["elapsed"] for result in results)
+    merged = defaultdict(lambda: {"latencies": [], "exceptions": 0, "error_messages": 0})
+    scenarios = defaultdict(int)
+    for result in results:
+        for page, sample in result["samples"].items():
+            merged[page]["latencies"].extend(sample["latencies"])
+            merged[page]["exceptions"] += sample["exceptions"]
+            merged[page]["error_messages"] += sample["error_messages"]
+        for name, count in result["scenarios"].items():
+            scenarios[name] += count
+
+    pages = {}
+    for page, sample in sorted(merged.items()):
+        latencies = sample["latencies"]
+        pages[page] = {
+            "reruns": len(latencies),
+            "reruns_per_second": round(len(latencies) / duration, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "p99": round(percentile(latencies, 99) * 1000, 1),
+            },
+            "exceptions": sample["exceptions"],
+            "error_messages": sample["error_messages"],
+        }
+
+    total = sum(page["reruns"] for page in pages.values())
+    return {
+        "sessions": args.sessions,
+        "processes": args.processes,
+        "seconds": round(duration, 1),
+        "reruns": total,
+        "reruns_per_second": round(total / duration, 2),
+        "scenarios": dict(scenarios),
+        "pages": pages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per session)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--users", type=int, default=200, help="users in the synthetic database")
+    parser.add_argument("--desks", type=int, default=40)
+    parser.add_argument("--admin-share", type=float, default=0.1, help="fraction of sessions that are admins")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    args.processes = min(args.processes or args.sessions, args.sessions)
+    n_admins = max(1, round(args.sessions * args.admin_share))
+    setup_database(max(args.users, args.sessions), args.desks, n_admins, args.seed)
+
+    conn = db.get_conn()
+    desk_ids = [row[0] for row in conn.execute("SELECT id FROM desks WHERE admin_only = 0")]
+    conn.close()
+
+    groups = [list(range(args.sessions))[i :: args.processes] for i in range(args.processes)]
+    if args.processes == 1:
+        results = [run_worker(groups[0], n_admins, args.seconds, desk_ids)]
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.starmap(
+                run_worker,
+                [(group, n_admins, args.seconds, desk_ids) for group in groups],
+            )
+
+    print(json.dumps(summarise(results, args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Notification digests against a local SMTP sink.
+
+Starts a minimal SMTP server on 127.0.0.1 that accepts and counts
+messages, optionally answering every Nth DATA with a 421 and hanging up
+(--fail-every) to exercise reconnect and retry. Seeds --users people with
+a booking tomorrow, marks some of today's bookings as no-shows (as
+enforce_no_shows does when enabled), closes a desk to generate
+cancellations, then runs one notification pass through the sink. Meanwhile it confirms bookings on the main thread to show the
+booking path does not wait on email.
+
+    python benchmarks/smtp_sink_digest.py
+    python benchmarks/smtp_sink_digest.py --users 1000 --rate 200 --fail-every 25
+"""
+import argparse
+import os
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.bookings import close_office, confirm_booking  # noqa: E402
+from utils.dates import day_number  # noqa: E402
+from utils.notifications import Mailer, run_notifications  # noqa: E402
+from utils.rules import enforce_no_shows  # noqa: E402
+
+
+# ---------------------------------------------------
+# SMTP SINK
+# ---------------------------------------------------
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server
+        sink.connections += 1
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with sink.lock:
+                    sink.attempts += 1
+                    refuse = sink.fail_every and sink.attempts % sink.fail_every == 0
+                    if not refuse:
+                        sink.messages += 1
+                if refuse:
+                    self.reply("421 try again later")
+                    return
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_every: int = 0):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.connections = self.attempts = self.messages = 0
+
+
+# ---------------------------------------------------
+# SCENARIO
+# ---------------------------------------------------
+def seed(conn, users: int):
+    desks = [row[0] for row in conn.execute("SELECT id FROM desks WHERE is_active = 1")]
+    while len(desks) < users:
+        desks.append(
+            conn.execute(
+                "INSERT INTO desks (name, location, is_active, admin_only) VALUES (?, 'Office', 1, 0)",
+                (f"Sink desk {len(desks)}",),
+            ).lastrowid
+        )
+    people = [
+        conn.execute(
+            "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, 'user', 1, 1)",
+            (f"Person {i}", f"person{i}@example.com"),
+        ).lastrowid
+        for i in range(users)
+    ]
+    today = day_number(date.today())
+    rows = [(user_id, desk_id, today + 1, 540, 720) for user_id, desk_id in zip(people, desks)]
+    # A fifth of them also booked this morning and never checked in
+    rows += [(user_id, desk_id, today, 540, 600) for user_id, desk_id in zip(people[::5], desks)]
+    conn.commit()
+
+    site_conn = db.get_site_conn()
+    site_conn.executemany(
+        "INSERT INTO bookings (user_id, desk_id, day, start_min, end_min, status, checked_in) "
+        "VALUES (?, ?, ?, ?, ?, 'booked', 0)",
+        rows,
+    )
+    site_conn.commit()
+    site_conn.close()
+    return people, desks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=100, help="messages per second")
+    parser.add_argument("--fail-every", type=int, default=0, help="refuse every Nth message with a 421")
+    args = parser.parse_args()
+
+    db.ensure_db()
+    conn = db.get_conn()
+    people, desks = seed(conn, args.users)
+    conn.close()
+
+    # Closing the first ten desks tomorrow cancels ten of the reminders
+    tomorrow = date.today() + timedelta(days=1)
+    close_office(tomorrow, tomorrow, desks[:10], "Maintenance", "admin@example.com")
+
+    sink = SmtpSink(args.fail_every)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    mailer = Mailer("127.0.0.1", sink.server_address[1], rate=args.rate, retry_delay=0.05)
+
+    result = {}
+    evening = datetime.combine(date.today(), datetime.min.time()).replace(hour=18)
+    enforce_no_shows(evening)
+    started = time.perf_counter()
+    run = threading.Thread(target=lambda: result.update(run_notifications(evening, mailer)))
+    run.start()
+
+    # Book on the main thread while digests are going out
+    latencies = []
+    later = day_number(date.today() + timedelta(days=3))
+    for user_id, desk_id in zip(people[:20], desks):
+        time.sleep(0.02)
+        t0 = time.perf_counter()
+        confirm_booking(user_id, later, {desk_id: (540, 600)})
+        latencies.append((time.perf_counter() - t0) * 1000)
+    run.join()
+    elapsed = time.perf_counter() - started
+
+    conn = db.get_site_conn()
+    statuses = dict(
+        (row[0], row[1])
+        for row in conn.execute(
+            "SELECT status, COUNT(*) FROM notification_outbox WHERE channel = 'email' GROUP BY status"
+        )
+    )
+    conn.close()
+    sink.shutdown()
+
+    print(f"run: {result}")
+    print(f"  {elapsed:.2f} s, sink: {sink.messages} messages over {sink.connections} connection(s), "
+          f"{sink.attempts - sink.messages} refused; mailer retries: {mailer.stats['retries']}")
+    print(f"  email outbox by status: {statuses}")
+    print(f"  confirm_booking during the run: median {statistics.median(latencies):.1f} ms, "
+          f"max {max(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Storage conformance: the SQLite and in-memory engines behave the same.
+
+Runs every check below against a fresh SqliteStorage (a temporary
+database, through the real writer and write jobs) and a fresh
+MemoryStorage. Then it replays one random sequence of bookings,
+cancellations and check-ins on both engines, comparing every outcome and
+the final day and user views. Ids differ between the engines, so desks
+and bookings are compared by creation order. Finally it times the same
+workload on each engine, separating storage overhead from the cost of
+the booking rules themselves.
+
+Exits non-zero if any check or comparison fails.
+
+    python benchmarks/storage_conformance.py
+    python benchmarks/storage_conformance.py --ops 5000 --seed 7
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DESK_BOOKING_DB_PATH"] = str(Path(tempfile.mkdtemp()) / "bench.db")
+
+from utils import db  # noqa: E402
+from utils.bookings import DAY_START_MIN, SLOT_MINUTES, BookingConflict  # noqa: E402
+from utils.storage import MemoryStorage, SqliteStorage  # noqa: E402
+
+# Far enough ahead that no booking is in the past, and clear of other runs
+BASE_DAY = 30000
+
+
+_days = itertools.count(BASE_DAY)
+_names = itertools.count(1)
+
+
+def fresh_day() -> int:
+    """A day no earlier check has booked."""
+    return next(_days)
+
+
+def unique(label: str) -> str:
+    return f"{label}{next(_names)}"
+
+
+# ---------------------------------------------------
+# CHECKS (names and days are unique, so they can share an engine)
+# ---------------------------------------------------
+def check_users(store):
+    email = unique("user") + "@example.com"
+    user_id = store.add_user("Ada", email, role="admin", can_book=False)
+    user = store.user(user_id)
+    assert (user["name"], user["email"], user["role"], user["can_book"], user["is_active"]) == (
+        "Ada", email, "admin", 0, 1
+    ), user
+    assert store.user(10 ** 9) is None
+    try:
+        store.add_user("Ada again", email)
+    except sqlite3.IntegrityError:
+        pass
+    else:
+        raise AssertionError("duplicate email accepted")
+
+
+def check_desks(store):
+    name = unique("Desk")
+    desk_id = store.add_desk(name, "North", admin_only=True)
+    desk = next(desk for desk in store.desks() if desk["id"] == desk_id)
+    assert (desk["name"], desk["location"], desk["is_active"], desk["admin_only"]) == (name, "North", 1, 1), desk
+    try:
+        store.add_desk(name)
+    except sqlite3.IntegrityError:
+        pass
+    else:
+        raise AssertionError("duplicate desk name accepted")
+
+
+def check_conflicts(store):
+    day = fresh_day()
+    user = store.add_user("Bo", unique("bo") + "@example.com")
+    desk = store.add_desk(unique("Desk"))
+    (first,) = store.book(user, day, {desk: (540, 600)})
+
+    try:
+        store.book(user, day, {desk: (570, 630)})
+    except BookingConflict as exc:
+        assert exc.cells == [f"{desk}_09:30"], exc.cells
+    else:
+        raise AssertionError("overlapping booking accepted")
+
+    store.book(user, day, {desk: (600, 660)})  # touching is not overlapping
+    assert store.cancel(user, [first], "bo@example.com") == 1
+    store.book(user, day, {desk: (510, 570)})
+    assert store.day_bookings(day) == [(desk, 510, 570), (desk, 600, 660)], store.day_bookings(day)
+
+
+def check_all_or_nothing(store):
+    day = fresh_day()
+    user = store.add_user("Cy", unique("cy") + "@example.com")
+    free, taken = store.add_desk(unique("Desk")), store.add_desk(unique("Desk"))
+    store.book(user, day, {taken: (540, 660)})
+    try:
+        store.book(user, day, {free: (540, 600), taken: (600, 630)})
+    except BookingConflict as exc:
+        assert exc.cells == [f"{taken}_10:00"], exc.cells
+    else:
+        raise AssertionError("conflicting multi-desk booking accepted")
+    assert store.day_bookings(day) == [(taken, 540, 660)], "partial booking left behind"
+
+
+def check_cancel_and_check_in(store):
+    day = fresh_day()
+    owner = store.add_user("Di", unique("di") + "@example.com")
+    other = store.add_user("Ed", unique("ed") + "@example.com")
+    desk = store.add_desk(unique("Desk"))
+    first, second = (store.book(owner, day, {desk: (start, start + 60)})[0] for start in (540, 660))
+
+    assert store.cancel(other, [first], "ed") == 0, "cancelled someone else's booking"
+    assert store.check_in(other, first, "ed") is False
+    assert store.check_in(owner, first, "di") is True
+    assert store.check_in(owner, first, "di") is False, "checked in twice"
+    assert store.cancel(owner, [second], "di") == 1
+    assert store.cancel(owner, [second], "di") == 0, "cancelled twice"
+    assert store.check_in(owner, second, "di") is False, "checked in to a cancelled booking"
+
+    rows = [(b["start_min"], b["status"], b["checked_in"]) for b in store.user_bookings(owner, day)]
+    assert rows == [(540, "booked", 1), (660, "cancelled", 0)], rows
+    assert store.user_bookings(owner, day + 1) == []
+
+
+def check_audit(store):
+    day = fresh_day()
+    user = store.add_user("Fi", unique("fi") + "@example.com")
+    desk = store.add_desk(unique("Desk"))
+    (booking,) = store.book(user, day, {desk: (540, 600)})
+    store.check_in(user, booking, "fi@example.com")
+    store.cancel(user, [booking], "admin@example.com")
+    store.log("NOTE", "kept for the record", "admin@example.com", "booking", booking, ticket=7)
+
+    events = store.audit("booking", booking)
+    assert sorted((e["action"], e["email"]) for e in events) == [
+        ("BOOKING_CANCELLED", "admin@example.com"),
+        ("CHECKED_IN", "fi@example.com"),
+        ("NOTE", "admin@example.com"),
+    ], events
+    note = next(e for e in events if e["action"] == "NOTE")
+    assert (note["details"], note["payload"]) == ("kept for the record", '{"ticket": 7}'), note
+
+
+CHECKS = [check_users, check_desks, check_conflicts, check_all_or_nothing, check_cancel_and_check_in, check_audit]
+
+
+# ---------------------------------------------------
+# DIFFERENTIAL RUN
+# ---------------------------------------------------
+def random_ops(rng: random.Random, ops: int, users: int, desks: int, days: int) -> list[tuple]:
+    """Operations on users, desks and bookings by creation index."""
+    sequence = []
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.6:
+            chosen = rng.sample(range(desks), rng.choice((1, 1, 1, 2)))
+            intervals = {}
+            for desk in chosen:
+                start = DAY_START_MIN + SLOT_MINUTES * rng.randrange(16)
+                intervals[desk] = (start, start + SLOT_MINUTES * rng.randint(1, 4))
+            sequence.append(("book", rng.randrange(users), rng.randrange(days), intervals))
+        elif roll < 0.85:
+            sequence.append(("cancel", rng.randrange(users), rng.random()))
+        else:
+            sequence.append(("check_in", rng.randrange(users), rng.random()))
+    return sequence
+
+
+def replay(store, sequence, users: int, desks: int, days: int, base_day: int, tag: str) -> list:
+    """Apply `sequence`; returns each outcome with engine ids replaced by creation indexes."""
+    user_ids = [store.add_user(f"P{i}", f"{tag}{i}@example.com") for i in range(users)]
+    desk_ids = [store.add_desk(f"{tag} desk {i}") for i in range(desks)]
+    desk_index = {desk_id: i for i, desk_id in enumerate(desk_ids)}
+    booking_index = {}
+    held = {i: [] for i in range(users)}
+
+    def cell(label):
+        desk_id, at = label.split("_")
+        return f"{desk_index[int(desk_id)]}_{at}"
+
+    outcomes = []
+    for op in sequence:
+        if op[0] == "book":
+            _, user, day, intervals = op
+            try:
+                ids = store.book(user_ids[user], base_day + day, {desk_ids[d]: span for d, span in intervals.items()})
+            except BookingConflict as exc:
+                outcomes.append(("conflict", sorted(cell(c) for c in exc.cells)))
+                continue
+            for booking_id in ids:
+                booking_index[booking_id] = len(booking_index)
+                held[user].append(booking_id)
+            outcomes.append(("booked", [booking_index[b] for b in ids]))
+        else:
+            kind, user, pick = op
+            if not held[user]:
+                outcomes.append((kind, None))
+                continue
+            booking_id = held[user][int(pick * len(held[user]))]
+            if kind == "cancel":
+                outcomes.append((kind, booking_index[booking_id], store.cancel(user_ids[user], [booking_id], tag)))
+            else:
+                outcomes.append((kind, booking_index[booking_id], store.check_in(user_ids[user], booking_id, tag)))
+
+    for day in range(days):
+        outcomes.append(
+            ("day", day, [(desk_index[d], s, e) for d, s, e in store.day_bookings(base_day + day) if d in desk_index])
+        )
+    for user in range(users):
+        outcomes.append(
+            (
+                "user",
+                user,
+                [
+                    (booking_index[b["id"]], desk_index[b["desk_id"]], b["day"] - base_day,
+                     b["start_min"], b["end_min"], b["status"], b["checked_in"])
+                    for b in store.user_bookings(user_ids[user], base_day)
+                ],
+            )
+        )
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--desks", type=int, default=12)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    db.ensure_db()
+    engines = {"sqlite": SqliteStorage, "memory": MemoryStorage}
+    failures = 0
+
+    for name, make in engines.items():
+        store = make()
+        for check in CHECKS:
+            try:
+                check(store)
+            except AssertionError as exc:
+                failures += 1
+                print(f"FAIL {name:6} {check.__name__}: {exc}")
+            else:
+                print(f"ok   {name:6} {check.__name__}")
+
+    sequence = random_ops(random.Random(args.seed), args.ops, args.users, args.desks, args.days)
+    outcomes, timings = {}, {}
+    for name, make in engines.items():
+        store = make()
+        started = time.perf_counter()
+        outcomes[name] = replay(store, sequence, args.users, args.desks, args.days, BASE_DAY + 1000, f"diff-{name}")
+        timings[name] = time.perf_counter() - started
+
+    mismatches = [
+        (i, a, b) for i, (a, b) in enumerate(zip(outcomes["sqlite"], outcomes["memory"])) if a != b
+    ]
+    if len(outcomes["sqlite"]) != len(outcomes["memory"]):
+        mismatches.append((None, len(outcomes["sqlite"]), len(outcomes["memory"])))
+    if mismatches:
+        failures += 1
+        print(f"FAIL differential: {len(mismatches)} mismatches, first: {mismatches[0]}")
+    else:
+        booked = sum(1 for outcome in outcomes["memory"] if outcome[0] == "booked")
+        conflicts = sum(1 for outcome in outcomes["memory"] if outcome[0] == "conflict")
+        print(f"ok   differential: {args.ops} ops ({booked} booked, {conflicts} conflicts) agree")
+
+    for name, elapsed in timings.items():
+        print(f"  {name:6} {args.ops / elapsed:10.0f} ops/s ({elapsed * 1000:.0f} ms)")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
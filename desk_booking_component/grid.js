@@ -0,0 +1,415 @@
+// Canvas booking grid: one column per desk, one row per time slot.
+//
+// Cell state lives in typed arrays indexed col * times + row, so a render
+// event only diffs arrays and repaints the cells that changed. Painting
+// covers the desk columns inside the scrolled viewport; off-screen columns
+// are drawn when they scroll into view. Drag selection paints a rectangle
+// from the anchor cell and reports the selection once, on mouse up.
+//
+// Loaded by index.html and by benchmarks/bench_grid_render.js (node).
+
+(function (root) {
+"use strict";
+
+const AVAILABLE = 0;
+const BOOKED = 1;
+const PAST = 2;
+
+const TIME_W = 90;
+const HEADER_H = 32;
+const MIN_COL_W = 72;
+const ROW_H = 42;
+const GAP = 8;
+const RADIUS = 10;
+
+const COLORS = {
+  available: "#fff",
+  border: "#ccc",
+  booked: "#c0392b",
+  past: "#2c2c2c",
+  selected: "#009fdf",
+  conflict: "#f39c12",
+  text: "#31333f",
+  focus: "#009fdf",
+};
+
+class DeskGrid {
+  // canvas:   the drawing surface (viewport sized, does not scroll)
+  // scroller: element whose scrollLeft drives the visible desk columns
+  // spacer:   child of scroller sized to the full grid width
+  // onSelect: called with ["<desk>_<HH:MM>", ...] when the selection changes
+  constructor({ canvas, scroller, spacer, onSelect, requestFrame, measure, pixelRatio }) {
+    this.canvas = canvas;
+    this.ctx = canvas.getContext("2d");
+    this.scroller = scroller;
+    this.spacer = spacer;
+    this.onSelect = onSelect || (() => {});
+    this.requestFrame = requestFrame || (fn => root.requestAnimationFrame(fn));
+    this.measure = measure || (() => scroller.clientWidth);
+    this.pixelRatio = pixelRatio || root.devicePixelRatio || 1;
+
+    this.layout = null;
+    this.desks = [];
+    this.times = [];
+    this.index = new Map();   // "<desk>_<HH:MM>" -> cell index
+    this.state = new Uint8Array(0);
+    this.selected = new Uint8Array(0);
+    this.flagged = new Uint8Array(0);  // server-reported conflicts, kept until rebuild
+
+    this.scrollLeft = 0;
+    this.colW = MIN_COL_W;
+    this.dirty = [];
+    this.full = false;
+    this.pending = false;
+    this.drag = null;
+    this.hover = -1;
+  }
+
+  // ---------------------------------------------------
+  // DATA
+  // ---------------------------------------------------
+  setData(data) {
+    const layout = JSON.stringify([data.desks, data.times, data.dateLabel]);
+    if (layout === this.layout) {
+      this.patch(data);
+    } else {
+      this.layout = layout;
+      this.build(data);
+    }
+  }
+
+  build(data) {
+    const hadSelection = this.selected.some(v => v);
+
+    this.desks = data.desks;
+    this.times = data.times;
+    this.names = data.deskNames;
+    this.focusDesk = data.focusDesk;
+
+    const size = this.desks.length * this.times.length;
+    this.index = new Map();
+    this.desks.forEach((d, col) => this.times.forEach((t, row) => {
+      this.index.set(d + "_" + t, col * this.times.length + row);
+    }));
+    this.state = this.computeState(data);
+    this.selected = new Uint8Array(size);
+    this.flagged = new Uint8Array(size);
+    this.drag = null;
+    this.hover = -1;
+
+    this.resize();
+    const focus = this.desks.indexOf(this.focusDesk);
+    if (focus >= 0) {
+      const cellsW = this.viewW - TIME_W;
+      this.scrollTo(focus * this.colW - (cellsW - this.colW) / 2);
+    }
+    this.invalidate();
+
+    if (hadSelection) this.onSelect([]);
+  }
+
+  // Same desks, times and date: repaint only cells whose state changed and
+  // drop any selected cell that is no longer available (e.g. a conflict).
+  patch(data) {
+    const next = this.computeState(data);
+    let dropped = false;
+
+    (data.conflicts || []).forEach(key => {
+      const i = this.index.get(key);
+      if (i !== undefined && !this.flagged[i]) {
+        this.flagged[i] = 1;
+        this.dirty.push(i);
+      }
+    });
+
+    for (let i = 0; i < next.length; i++) {
+      if (next[i] !== this.state[i]) this.dirty.push(i);
+      if (this.selected[i] && (next[i] !== AVAILABLE || this.flagged[i])) {
+        this.selected[i] = 0;
+        this.dirty.push(i);
+        dropped = true;
+      }
+    }
+    this.state = next;
+    this.schedule();
+
+    if (dropped) this.emit();
+  }
+
+  computeState(data) {
+    const state = new Uint8Array(this.desks.length * this.times.length);
+    const rows = this.times.length;
+
+    (data.pastTimes || []).forEach(t => {
+      const row = this.times.indexOf(t);
+      if (row < 0) return;
+      for (let i = row; i < state.length; i += rows) state[i] = PAST;
+    });
+    // Booked wins over past, as in the old DOM grid
+    data.booked.forEach(key => {
+      const i = this.index.get(key);
+      if (i !== undefined) state[i] = BOOKED;
+    });
+    return state;
+  }
+
+  selection() {
+    const rows = this.times.length;
+    const keys = [];
+    for (let i = 0; i < this.selected.length; i++) {
+      if (this.selected[i]) keys.push(this.desks[(i / rows) | 0] + "_" + this.times[i % rows]);
+    }
+    return keys;
+  }
+
+  emit() {
+    this.onSelect(this.selection());
+  }
+
+  selectable(i) {
+    return this.state[i] === AVAILABLE && !this.flagged[i];
+  }
+
+  // ---------------------------------------------------
+  // GEOMETRY
+  // ---------------------------------------------------
+  resize() {
+    this.viewW = Math.max(TIME_W + MIN_COL_W, this.measure());
+    // Small offices stretch to the frame width; large ones scroll
+    this.colW = Math.max(MIN_COL_W, (this.viewW - TIME_W) / Math.max(1, this.desks.length));
+    this.viewH = HEADER_H + this.times.length * (ROW_H + GAP);
+
+    const ratio = this.pixelRatio;
+    this.canvas.width = Math.round(this.viewW * ratio);
+    this.canvas.height = Math.round(this.viewH * ratio);
+    this.canvas.style.width = this.viewW + "px";
+    this.canvas.style.height = this.viewH + "px";
+    this.ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+
+    this.spacer.style.width = TIME_W + this.desks.length * this.colW + "px";
+    this.scrollTo(this.scrollLeft);
+  }
+
+  scrollTo(left) {
+    const max = Math.max(0, this.desks.length * this.colW - (this.viewW - TIME_W));
+    this.scrollLeft = Math.min(max, Math.max(0, left));
+    if (this.scroller.scrollLeft !== this.scrollLeft) this.scroller.scrollLeft = this.scrollLeft;
+  }
+
+  visibleColumns() {
+    const first = Math.floor(this.scrollLeft / this.colW);
+    const last = Math.ceil((this.scrollLeft + this.viewW - TIME_W) / this.colW);
+    return [Math.max(0, first), Math.min(this.desks.length, last)];
+  }
+
+  // Canvas-relative point -> cell index, or -1 outside the cells
+  cellAt(x, y) {
+    if (x < TIME_W || y < HEADER_H) return -1;
+    const col = Math.floor((x - TIME_W + this.scrollLeft) / this.colW);
+    const row = Math.floor((y - HEADER_H) / (ROW_H + GAP));
+    if (col >= this.desks.length || row >= this.times.length) return -1;
+    return col * this.times.length + row;
+  }
+
+  // ---------------------------------------------------
+  // PAINTING
+  // ---------------------------------------------------
+  invalidate() {
+    this.full = true;
+    this.schedule();
+  }
+
+  schedule() {
+    if (this.pending || (!this.full && !this.dirty.length)) return;
+    this.pending = true;
+    this.requestFrame(() => {
+      this.pending = false;
+      this.paint();
+    });
+  }
+
+  paint() {
+    const ctx = this.ctx;
+    const [first, last] = this.visibleColumns();
+    const rows = this.times.length;
+
+    ctx.save();
+    ctx.beginPath();
+    ctx.rect(TIME_W, 0, this.viewW - TIME_W, this.viewH);
+    ctx.clip();
+
+    if (this.full) {
+      ctx.clearRect(TIME_W, 0, this.viewW - TIME_W, this.viewH);
+      for (let col = first; col < last; col++) {
+        this.paintHeader(col);
+        for (let row = 0; row < rows; row++) this.paintCell(col * rows + row);
+      }
+    } else {
+      for (const i of this.dirty) {
+        const col = (i / rows) | 0;
+        if (col >= first && col < last) this.paintCell(i);
+      }
+    }
+    ctx.restore();
+
+    if (this.full) this.paintTimes();
+    this.full = false;
+    this.dirty = [];
+  }
+
+  paintHeader(col) {
+    const ctx = this.ctx;
+    const x = TIME_W + col * this.colW - this.scrollLeft;
+    const desk = this.desks[col];
+    const focus = desk === this.focusDesk;
+
+    ctx.fillStyle = focus ? COLORS.focus : COLORS.text;
+    ctx.font = "600 14px sans-serif";
+    ctx.textAlign = "center";
+    ctx.textBaseline = "middle";
+    ctx.fillText(this.names[desk], x + this.colW / 2, HEADER_H / 2, this.colW - GAP);
+    if (focus) ctx.fillRect(x + GAP, HEADER_H - 6, this.colW - 2 * GAP, 2);
+  }
+
+  paintTimes() {
+    const ctx = this.ctx;
+    ctx.clearRect(0, 0, TIME_W, this.viewH);
+    ctx.fillStyle = COLORS.text;
+    ctx.font = "14px sans-serif";
+    ctx.textAlign = "center";
+    ctx.textBaseline = "middle";
+    this.times.forEach((t, row) => {
+      ctx.fillText(t, TIME_W / 2, HEADER_H + row * (ROW_H + GAP) + ROW_H / 2);
+    });
+  }
+
+  paintCell(i) {
+    const ctx = this.ctx;
+    const rows = this.times.length;
+    const col = (i / rows) | 0;
+    const row = i % rows;
+    const x = TIME_W + col * this.colW - this.scrollLeft + GAP / 2;
+    const y = HEADER_H + row * (ROW_H + GAP);
+    const w = this.colW - GAP;
+
+    ctx.clearRect(x - GAP / 2, y - GAP / 2, this.colW, ROW_H + GAP);
+
+    let fill = COLORS.available;
+    if (this.selected[i]) fill = COLORS.selected;
+    else if (this.flagged[i] || this.state[i] === BOOKED) fill = COLORS.booked;
+    else if (this.state[i] === PAST) fill = COLORS.past;
+
+    ctx.beginPath();
+    if (ctx.roundRect) ctx.roundRect(x, y, w, ROW_H, RADIUS);
+    else ctx.rect(x, y, w, ROW_H);
+    ctx.fillStyle = fill;
+    ctx.fill();
+
+    if (this.flagged[i]) {
+      ctx.lineWidth = 3;
+      ctx.strokeStyle = COLORS.conflict;
+    } else if (i === this.hover && this.selectable(i)) {
+      ctx.lineWidth = 2;
+      ctx.strokeStyle = COLORS.selected;
+    } else {
+      ctx.lineWidth = 1;
+      ctx.strokeStyle = COLORS.border;
+    }
+    ctx.stroke();
+  }
+
+  // ---------------------------------------------------
+  // POINTER
+  // ---------------------------------------------------
+  pointerDown(x, y) {
+    const i = this.cellAt(x, y);
+    if (i < 0 || !this.selectable(i)) return;
+
+    // The anchor decides whether this drag selects or clears cells
+    this.drag = { anchor: i, last: -1, mode: this.selected[i] ? 0 : 1, before: this.selected.slice() };
+    this.dragTo(i);
+  }
+
+  pointerMove(x, y) {
+    const i = this.cellAt(x, y);
+    if (this.drag) {
+      if (i >= 0) this.dragTo(i);
+    } else if (i !== this.hover) {
+      if (this.hover >= 0) this.dirty.push(this.hover);
+      if (i >= 0) this.dirty.push(i);
+      this.hover = i;
+      this.schedule();
+    }
+  }
+
+  pointerUp() {
+    if (!this.drag) return;
+    this.drag = null;
+    this.emit();
+  }
+
+  // Apply the drag rectangle anchor..i in one pass over the union of the
+  // previous and new rectangles, restoring cells the rectangle has left.
+  dragTo(i) {
+    const drag = this.drag;
+    if (i === drag.last) return;
+    const rows = this.times.length;
+    const rect = (a, b) => [
+      Math.min((a / rows) | 0, (b / rows) | 0), Math.max((a / rows) | 0, (b / rows) | 0),
+      Math.min(a % rows, b % rows), Math.max(a % rows, b % rows),
+    ];
+
+    const [c0, c1, r0, r1] = rect(drag.anchor, i);
+    const [p0, p1, q0, q1] = drag.last < 0 ? [c0, c1, r0, r1] : rect(drag.anchor, drag.last);
+
+    for (let col = Math.min(c0, p0); col <= Math.max(c1, p1); col++) {
+      for (let row = Math.min(r0, q0); row <= Math.max(r1, q1); row++) {
+        const j = col * rows + row;
+        const inside = col >= c0 && col <= c1 && row >= r0 && row <= r1;
+        const want = inside && this.selectable(j) ? drag.mode : drag.before[j];
+        if (this.selected[j] !== want) {
+          this.selected[j] = want;
+          this.dirty.push(j);
+        }
+      }
+    }
+    drag.last = i;
+    this.schedule();
+  }
+
+  // Browser wiring; the benchmark drives the methods above directly
+  attach(doc) {
+    const point = e => {
+      const box = this.canvas.getBoundingClientRect();
+      return [e.clientX - box.left, e.clientY - box.top];
+    };
+
+    this.canvas.addEventListener("mousedown", e => this.pointerDown(...point(e)));
+    this.canvas.addEventListener("mousemove", e => this.pointerMove(...point(e)));
+    this.canvas.addEventListener("mouseleave", () => this.pointerMove(-1, -1));
+    doc.addEventListener("mouseup", () => this.pointerUp());
+
+    this.canvas.addEventListener("wheel", e => {
+      const delta = e.deltaX || (e.shiftKey ? e.deltaY : 0);
+      if (!delta) return;
+      e.preventDefault();
+      this.scroller.scrollLeft += delta;
+    }, { passive: false });
+
+    this.scroller.addEventListener("scroll", () => {
+      if (this.scroller.scrollLeft === this.scrollLeft) return;
+      this.scrollLeft = this.scroller.scrollLeft;
+      this.invalidate();
+    });
+
+    root.addEventListener("resize", () => {
+      if (!this.layout) return;
+      this.resize();
+      this.invalidate();
+    });
+  }
+}
+
+if (typeof module !== "undefined" && module.exports) module.exports = { DeskGrid };
+else root.DeskGrid = DeskGrid;
+})(typeof window !== "undefined" ? window : globalThis);
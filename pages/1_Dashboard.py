@@ -1,5 +1,10 @@
 import streamlit as st
+from datetime import datetime
 
+from utils.dashboard import dashboard_versions, today_occupancy, upcoming, user_summary
+from utils.dates import day_number, from_day_number, hhmm, minute_of_day, uk_date
+from utils.db import ensure_db
+from utils.quotas import quota_usage
 from utils.styles import apply_lato_font
 
 
@@ -31,3 +36,70 @@ if not st.session_state.can_book:
     st.warning("You do not currently have permission to book desks.")
 else:
     st.success("You are permitted to book desks.")
+
+
+# ---------------------------------------------------
+# YOUR BOOKINGS (cached per user, keyed on their booking counters)
+# ---------------------------------------------------
+ensure_db()
+user_id = st.session_state.get("user_id")
+now = datetime.now()
+today = day_number(now.date())
+
+if user_id:
+    versions = dashboard_versions(user_id)
+    summary = user_summary(user_id, today, *versions)
+    count, following = upcoming(summary, today, minute_of_day(now))
+
+    st.subheader("Your Bookings")
+    next_col, count_col, attendance_col = st.columns(3)
+    if following:
+        day, start_min, end_min, desk = following
+        when = "Today" if day == today else uk_date(from_day_number(day))
+        next_col.metric("Next booking", f"{when} {hhmm(start_min)}", desk, delta_color="off")
+    else:
+        next_col.metric("Next booking", "None")
+    count_col.metric("Upcoming bookings", count)
+    attendance_col.metric(
+        "Attendance (30 days)",
+        f"{summary['attended'] / summary['past']:.0%}" if summary["past"] else "n/a",
+        f"{summary['attended']} of {summary['past']} checked in" if summary["past"] else None,
+        delta_color="off",
+    )
+
+
+# ---------------------------------------------------
+# OFFICE TODAY (one shared aggregate over all sites, refreshed each minute)
+# ---------------------------------------------------
+occupancy = today_occupancy(today)
+
+st.subheader("Office Today")
+booked_col, now_col, people_col = st.columns(3)
+booked_col.metric("Desks booked today", f"{occupancy['booked']} of {occupancy['desks']}")
+now_col.metric("In use right now", occupancy["in_use"])
+people_col.metric("People booked in", occupancy["people"])
+
+
+# ---------------------------------------------------
+# BOOKING QUOTA USAGE (from the maintained counters at every site)
+# ---------------------------------------------------
+if user_id and st.session_state.can_book:
+    usage = quota_usage(user_id, today)
+
+    if usage:
+        st.subheader("Your Booking Allowance")
+        week_col, day_col, ahead_col = st.columns(3)
+        week_col.metric(
+            "Days booked this week",
+            f"{usage['days']} of {usage['days_per_week']}" if usage["days_per_week"] is not None else usage["days"],
+        )
+        day_col.metric(
+            "Hours booked today",
+            f"{usage['minutes'] / 60:g} of {usage['minutes_per_day'] / 60:g}"
+            if usage["minutes_per_day"] is not None
+            else f"{usage['minutes'] / 60:g}",
+        )
+        ahead_col.metric(
+            "Book up to",
+            f"{usage['advance_days']} days ahead" if usage["advance_days"] is not None else "No limit",
+        )
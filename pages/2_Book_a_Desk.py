@@ -1,9 +1,24 @@
+import json
 import streamlit as st
-from datetime import datetime, date, time, timedelta
+from datetime import date
+from utils.bookings import (
+    SLOT_MINUTES,
+    BookingConflict,
+    BookingError,
+    book_selection,
+    day_grid,
+    day_slots,
+    is_past,
+    join_waitlist,
+)
+from utils.allocation import allocate_team
 from utils.components import get_desk_booking_component
+from utils.dates import day_number, hhmm
 
-from utils.db import ensure_db, get_conn
+from utils.db import ensure_db, get_conn, get_site_conn
 from utils.auth import require_login
+from utils.perf import timed_fragment, timing_toggle
+from utils.sites import site_of_desk, site_picker
 from utils.styles import apply_lato_font
 
 # --------------------------------------------------
@@ -12,7 +27,9 @@ from utils.styles import apply_lato_font
 desk_booking_component = get_desk_booking_component()
 
 def desk_booking_grid(payload, height=520):
-    return desk_booking_component(data=payload, height=height)
+    # Sent as a JSON string: Streamlit probes dict/list component args for
+    # dataframes, which imports pandas, numpy and pyarrow on first use.
+    return desk_booking_component(data=json.dumps(payload), height=height, key="desk_grid")
 
 # --------------------------------------------------
 # PAGE SETUP
@@ -26,6 +43,7 @@ st.title("Book a Desk")
 # --------------------------------------------------
 require_login()
 ensure_db()
+timing_toggle()
 
 user_id = st.session_state.get("user_id")
 can_book = st.session_state.get("can_book", 0)
@@ -34,178 +52,267 @@ if not user_id or not can_book:
     st.error("You do not have permission to book desks.")
     st.stop()
 
-# --------------------------------------------------
-# DATE PICKER
-# --------------------------------------------------
-selected_date = st.date_input("Select date", format="DD/MM/YYYY")
+# Deep links from the Office Map carry ?date=YYYY-MM-DD&desk=<id>
+try:
+    linked_date = date.fromisoformat(st.query_params.get("date", ""))
+except ValueError:
+    linked_date = date.today()
 
-if selected_date.weekday() >= 5:
-    st.warning("Desk booking is not available at weekends.")
-    st.stop()
+focus_desk = st.query_params.get("desk")
+focus_desk = int(focus_desk) if focus_desk and focus_desk.isdigit() else None
 
-date_iso = selected_date.strftime("%Y-%m-%d")
+# One site at a time; a deep link opens the linked desk's site
+site_id = site_picker(key="booking_site", default=site_of_desk(focus_desk) if focus_desk else None)
 
-# --------------------------------------------------
-# LOAD DESKS
-# --------------------------------------------------
-conn = get_conn()
-
-desks = conn.execute(
-    """
-    SELECT id, name
-    FROM desks
-    WHERE is_active = 1
-    ORDER BY id
-    """
-).fetchall()
-
-if not desks:
-    conn.close()
-    st.error("No desks available.")
-    st.stop()
+# What the grid was last rendered from: {"day", "site", "version", "booked"}
+GRID_VIEW_KEY = "booking_grid_view"
+# Cells found taken at confirm time: {"day", "cells"}
+CONFLICTS_KEY = "booking_conflicts"
 
-DESK_IDS = [row["id"] for row in desks]
-DESK_NAMES = {row["id"]: row["name"] for row in desks}
 
 # --------------------------------------------------
-# TIME SLOTS (09:00 → 18:00)
+# DATE PICKER + GRID
+# Picking a date or cells reruns only this fragment.
 # --------------------------------------------------
-START = time(9, 0)
-END = time(18, 0)
-STEP = 30
-
-slots = []
-cur = datetime.combine(selected_date, START)
-end_dt = datetime.combine(selected_date, END)
-
-while cur < end_dt:
-    slots.append(cur.time())
-    cur += timedelta(minutes=STEP)
-
-def is_past(t: time) -> bool:
-    return (
-        selected_date == date.today()
-        and datetime.combine(selected_date, t) < datetime.now()
+@timed_fragment("Booking grid")
+def booking_grid():
+    selected_date = st.date_input(
+        "Select date",
+        value=linked_date,
+        format="DD/MM/YYYY",
+        key="booking_date",
     )
 
-# --------------------------------------------------
-# LOAD BOOKINGS
-# --------------------------------------------------
-rows = conn.execute(
-    """
-    SELECT desk_id, start_time, end_time
-    FROM bookings
-    WHERE date = ?
-      AND status = 'booked'
-    """,
-    (date_iso,),
-).fetchall()
-
-booked = set()
-
-for row in rows:
-    s = time.fromisoformat(row["start_time"])
-    e = time.fromisoformat(row["end_time"])
-    for t in slots:
-        if s <= t < e:
-            booked.add(f"{row['desk_id']}_{t.strftime('%H:%M')}")
-
-conn.close()
+    if selected_date.weekday() >= 5:
+        st.warning("Desk booking is not available at weekends.")
+        return
+
+    day = day_number(selected_date)
+
+    # LOAD DESKS
+    conn = get_site_conn(site_id)
+
+    desks = conn.execute(
+        """
+        SELECT id, name
+        FROM desks
+        WHERE is_active = 1 AND site_id = ?
+        ORDER BY id
+        """,
+        (site_id,),
+    ).fetchall()
+
+    if not desks:
+        conn.close()
+        st.error("No desks available.")
+        return
+
+    desk_ids = [row["id"] for row in desks]
+    desk_names = {row["id"]: row["name"] for row in desks}
+
+    # TIME SLOTS (09:00 → 18:00)
+    slots = day_slots()
+    slot_labels = [hhmm(m) for m in slots]
+
+    # LOAD BOOKINGS
+    version, booked = day_grid(conn, day)
+    conn.close()
+
+    st.session_state[GRID_VIEW_KEY] = {"day": day, "site": site_id, "version": version, "booked": booked}
+
+    conflicts = st.session_state.pop(CONFLICTS_KEY, None)
+    conflicts = conflicts["cells"] if conflicts and conflicts["day"] == day else []
+
+    # GRID PAYLOAD
+    payload = {
+        "version": version,
+        "desks": desk_ids,
+        "deskNames": desk_names,
+        "times": slot_labels,
+        "booked": list(booked),
+        "pastTimes": [
+            label
+            for m, label in zip(slots, slot_labels)
+            if is_past(selected_date, m)
+        ],
+        "dateLabel": selected_date.strftime("%d/%m/%Y"),
+        "focusDesk": focus_desk if focus_desk in desk_names else None,
+        "conflicts": conflicts,
+    }
+
+    desk_booking_grid(payload)
+
 
 # --------------------------------------------------
-# GRID PAYLOAD
+# CONFIRM BOOKING
+# Reads the grid selection from session state, so pressing the button
+# does not rebuild the grid unless a booking was made.
 # --------------------------------------------------
-payload = {
-    "desks": DESK_IDS,
-    "deskNames": DESK_NAMES,
-    "times": [t.strftime("%H:%M") for t in slots],
-    "booked": list(booked),
-    "past": [
-        f"{d}_{t.strftime('%H:%M')}"
-        for d in DESK_IDS
-        for t in slots
-        if is_past(t)
-    ],
-    "dateLabel": selected_date.strftime("%d/%m/%Y"),
-}
+@timed_fragment("Confirm panel")
+def confirm_panel():
+    st.divider()
+    st.subheader("Confirm booking")
+
+    conflict_message = st.session_state.pop("booking_conflict_message", None)
+    if conflict_message:
+        st.error(conflict_message)
+
+    if st.button("Confirm booking", type="primary", use_container_width=True):
+        selected_date = st.session_state.get("booking_date", linked_date)
+        selected_cells = st.session_state.get("desk_grid") or []
+
+        if not selected_cells:
+            st.warning("Please select one or more time slots.")
+            return
+
+        day = day_number(selected_date)
+        view = st.session_state.get(GRID_VIEW_KEY) or {}
+        if (view.get("day"), view.get("site")) != (day, site_id):
+            view = None
+
+        try:
+            book_selection(user_id, selected_date, selected_cells, view)
+        except BookingConflict as exc:
+            # Rerun the page so the grid marks just the taken cells
+            st.session_state[CONFLICTS_KEY] = {"day": day, "cells": exc.cells}
+            st.session_state["booking_conflict_message"] = str(exc)
+            st.rerun()
+        except BookingError as exc:
+            st.error(str(exc))
+            return
+
+        st.success("Booking confirmed.")
+        st.rerun()
+
 
 # --------------------------------------------------
-# RENDER GRID
+# WAITLIST
+# Queue for a fully booked time; a cancellation that frees a matching
+# desk books it automatically and it shows up under My Bookings.
 # --------------------------------------------------
-selected_cells = desk_booking_grid(payload) or []
+@timed_fragment("Waitlist panel")
+def waitlist_panel():
+    with st.expander("Nothing free? Join the waitlist"):
+        slots = day_slots()
+        conn = get_conn()
+        desks = conn.execute(
+            "SELECT id, name FROM desks WHERE is_active = 1 AND site_id = ? ORDER BY id", (site_id,)
+        ).fetchall()
+        conn.close()
+        desk_names = {row["id"]: row["name"] for row in desks}
+
+        st.caption("For the date selected above.")
+        start_col, end_col, desk_col = st.columns(3)
+        start_min = start_col.selectbox("From", slots, format_func=hhmm, key="waitlist_start")
+        end_min = end_col.selectbox(
+            "Until",
+            [m + SLOT_MINUTES for m in slots],
+            index=len(slots) - 1,
+            format_func=hhmm,
+            key="waitlist_end",
+        )
+        desk_id = desk_col.selectbox(
+            "Desk",
+            [None, *desk_names],
+            format_func=lambda d: "Any desk" if d is None else desk_names[d],
+            key="waitlist_desk",
+        )
+
+        if st.button("Join waitlist"):
+            selected_date = st.session_state.get("booking_date", linked_date)
+            if selected_date.weekday() >= 5:
+                st.error("Desk booking is not available at weekends.")
+                return
+            if is_past(selected_date, start_min):
+                st.error("Cannot join the waitlist for a time in the past.")
+                return
+
+            try:
+                join_waitlist(
+                    user_id,
+                    day_number(selected_date),
+                    start_min,
+                    end_min,
+                    desk_id,
+                    st.session_state.get("user_email"),
+                    site_id=site_id,
+                )
+            except BookingError as exc:
+                st.error(str(exc))
+                return
+
+            st.success("You are on the waitlist. A matching desk is booked for you as soon as one frees up.")
+
 
 # --------------------------------------------------
-# CONFIRM BOOKING
+# TEAM BOOKING (admins only)
+# Seats a group over a date range in one transaction: either every
+# booking is made or none is.
 # --------------------------------------------------
-st.divider()
-st.subheader("Confirm booking")
-
-if st.button("Confirm booking", type="primary", use_container_width=True):
-
-    if not selected_cells:
-        st.warning("Please select one or more time slots.")
-        st.stop()
-
-    by_desk = {}
-    for cell in selected_cells:
-        desk_id, t = cell.split("_")
-        by_desk.setdefault(int(desk_id), []).append(time.fromisoformat(t))
-
-    conn = get_conn()
-
-    for desk_id, times in by_desk.items():
-        times.sort()
-
-        # Ensure contiguous time slots
-        for a, b in zip(times, times[1:]):
-            if (
-                datetime.combine(selected_date, b)
-                - datetime.combine(selected_date, a)
-            ) != timedelta(minutes=STEP):
-                conn.close()
-                st.error("Selected time slots must be continuous.")
-                st.stop()
-
-        if any(is_past(t) for t in times):
-            conn.close()
-            st.error("Cannot book time slots in the past.")
-            st.stop()
-
-        start = times[0]
-        end = (
-            datetime.combine(selected_date, times[-1])
-            + timedelta(minutes=STEP)
-        ).time()
-
-        conflict = conn.execute(
+@timed_fragment("Team booking")
+def team_panel():
+    with st.expander("Book for a team"):
+        slots = day_slots()
+        conn = get_conn()
+        people = conn.execute(
             """
-            SELECT 1
-            FROM bookings
-            WHERE desk_id = ?
-              AND date = ?
-              AND status = 'booked'
-              AND start_time < ?
-              AND end_time > ?
-            """,
-            (desk_id, date_iso, end.isoformat(), start.isoformat()),
-        ).fetchone()
-
-        if conflict:
-            conn.close()
-            st.error("One or more selected slots are already booked.")
-            st.stop()
-
-        conn.execute(
+            SELECT id, name, email
+            FROM users
+            WHERE is_active = 1 AND can_book = 1
+            ORDER BY lower(name)
             """
-            INSERT INTO bookings
-            (user_id, desk_id, date, start_time, end_time, status, checked_in)
-            VALUES (?, ?, ?, ?, ?, 'booked', 0)
-            """,
-            (user_id, desk_id, date_iso, start.isoformat(), end.isoformat()),
+        ).fetchall()
+        conn.close()
+        labels = {row["id"]: f"{row['name']} ({row['email']})" for row in people}
+
+        team = st.multiselect("People", list(labels), format_func=labels.get, key="team_people")
+        first_col, last_col = st.columns(2)
+        first = first_col.date_input("From", value=date.today(), min_value=date.today(), format="DD/MM/YYYY", key="team_first")
+        last = last_col.date_input("Until", value=first, min_value=first, format="DD/MM/YYYY", key="team_last")
+
+        start_col, end_col = st.columns(2)
+        start_min = start_col.selectbox("Start", slots, format_func=hhmm, key="team_start")
+        end_min = end_col.selectbox(
+            "End",
+            [m + SLOT_MINUTES for m in slots],
+            index=len(slots) - 1,
+            format_func=hhmm,
+            key="team_end",
         )
 
-    conn.commit()
-    conn.close()
-
-    st.success("Booking confirmed.")
-    st.rerun()
+        zone_col, adjacent_col, admin_col = st.columns(3)
+        same_zone = zone_col.checkbox("Same zone", value=True, key="team_same_zone")
+        adjacent = adjacent_col.checkbox("Desks next to each other", value=True, key="team_adjacent")
+        include_admin_only = admin_col.checkbox("Include admin-only desks", key="team_admin_only")
+
+        if st.button("Allocate desks", disabled=not team):
+            try:
+                result = allocate_team(
+                    team,
+                    first,
+                    last,
+                    start_min,
+                    end_min,
+                    same_zone=same_zone,
+                    adjacent=adjacent,
+                    include_admin_only=include_admin_only,
+                    actor=st.session_state.get("user_email"),
+                    site_id=site_id,
+                )
+            except BookingError as exc:
+                st.error(str(exc))
+                return
+
+            st.success(f"Booked {len(result['booking_ids'])} desks.")
+            if result["skipped"]:
+                st.info(
+                    f"{len(result['skipped'])} person-days were skipped: "
+                    "those people already hold a desk at that time."
+                )
+
+
+booking_grid()
+confirm_panel()
+waitlist_panel()
+if st.session_state.get("role") == "admin":
+    team_panel()
@@ -1,10 +1,19 @@
 import streamlit as st
-from datetime import date
-from utils.db import ensure_db, get_conn
-from utils.audit import log_action
-from utils.dates import uk_date
+from datetime import date, timedelta
+from utils.archive import bookings_source
+from utils.db import ensure_db, fan_out, list_sites
+from utils.bookings import (
+    cancel_bookings_between,
+    cancel_bookings_for_user,
+    count_bookings_in_range,
+    leave_waitlist,
+    waitlist_for_user,
+)
+from utils.dates import day_number, from_day_number, hhmm, uk_date
 from utils.styles import apply_lato_font
 
+PAST_PAGE_SIZE = 25
+
 # ---------------------------------------------------
 # PAGE SETUP
 # ---------------------------------------------------
@@ -26,47 +35,102 @@ if st.session_state.user_id is None:
     st.stop()
 
 user_id = st.session_state.user_id
-today_str = date.today().strftime("%Y-%m-%d")
+today = day_number(date.today())
 
-# ---------------------------------------------------
-# DB HELPER
-# ---------------------------------------------------
-def run_db(query, params=()):
-    conn = get_conn()
-    conn.execute(query, params)
-    conn.commit()
-    conn.close()
+# Bookings are read from every site; the site is shown once there are several
+site_names = {site["id"]: site["name"] for site in list_sites()}
 
 # ---------------------------------------------------
-# FETCH BOOKINGS
+# DB HELPERS
 # ---------------------------------------------------
-conn = get_conn()
+def tagged(by_site):
+    """Flatten {site_id: rows} from fan_out into dicts carrying their site_id."""
+    return [{**dict(row), "site_id": site_id} for site_id, rows in by_site.items() for row in rows]
+
+
+def booking_rows(rows):
+    return [
+        {
+            **({"Site": site_names[row["site_id"]]} if len(site_names) > 1 else {}),
+            "Desk": row["desk_name"],
+            "Date": uk_date(from_day_number(row["day"])),
+            "Start": hhmm(row["start_min"]),
+            "End": hhmm(row["end_min"]),
+            "Status": row["status"],
+            "Checked in": "Yes" if row["checked_in"] else "No",
+        }
+        for row in rows
+    ]
+
+
+def past_key(row):
+    return row["day"], row["start_min"], row["site_id"], row["id"]
+
+
+def _past_page(conn, site_id, cursor, day_from, day_to):
+    conditions = [
+        "b.user_id = ?",
+        "b.day < ?",
+        "b.day >= ?",
+        "b.status IN ('booked', 'cancelled', 'no_show')",
+    ]
+    params = [user_id, day_to, day_from]
 
-upcoming = conn.execute(
+    if cursor:
+        conditions.append("(b.day, b.start_min, ?, b.id) < (?, ?, ?, ?)")
+        params.extend((site_id, *cursor))
+
+    return conn.execute(
+        f"""
+        SELECT b.id, d.name AS desk_name, b.day, b.start_min, b.end_min,
+               b.status, b.checked_in
+        FROM {bookings_source(conn, day_from)} b
+        JOIN desks d ON d.id = b.desk_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY b.day DESC, b.start_min DESC, b.id DESC
+        LIMIT ?
+        """,
+        (*params, PAST_PAGE_SIZE + 1),
+    ).fetchall()
+
+
+def fetch_past_page(cursor, day_from, day_to):
     """
-    SELECT id, desk_id, date, start_time, end_time, status, checked_in
-    FROM bookings
-    WHERE user_id = ?
-      AND date >= ?
-      AND status = 'booked'
-    ORDER BY date, start_time
-    """,
-    (user_id, today_str),
-).fetchall()
-
-past = conn.execute(
+    One keyset page of past bookings in [day_from, day_to), newest first,
+    across every site: each site returns its own next page and the pages
+    are merged. `cursor` is the past_key() of the last row already shown.
     """
-    SELECT id, desk_id, date, start_time, end_time, status, checked_in
-    FROM bookings
-    WHERE user_id = ?
-      AND date < ?
-      AND status IN ('booked', 'cancelled')
-    ORDER BY date DESC, start_time DESC
-    """,
-    (user_id, today_str),
-).fetchall()
+    rows = sorted(
+        tagged(fan_out(_past_page, cursor, day_from, day_to, with_site_id=True)),
+        key=past_key,
+        reverse=True,
+    )
+    return rows[:PAST_PAGE_SIZE], len(rows) > PAST_PAGE_SIZE
 
-conn.close()
+
+# ---------------------------------------------------
+# FETCH UPCOMING BOOKINGS (desk names joined in one query per site)
+# ---------------------------------------------------
+def _upcoming(conn):
+    return conn.execute(
+        """
+        SELECT b.id, b.desk_id, d.name AS desk_name, b.day, b.start_min,
+               b.end_min, b.status, b.checked_in
+        FROM bookings b
+        JOIN desks d ON d.id = b.desk_id
+        WHERE b.user_id = ?
+          AND b.day >= ?
+          AND b.status = 'booked'
+        ORDER BY b.day, b.start_min
+        """,
+        (user_id, today),
+    ).fetchall()
+
+
+upcoming = sorted(tagged(fan_out(_upcoming)), key=lambda row: (row["day"], row["start_min"]))
+waitlist = sorted(
+    tagged(fan_out(waitlist_for_user, user_id, today)), key=lambda row: (row["day"], row["start_min"])
+)
 
 # ---------------------------------------------------
 # SHOW UPCOMING BOOKINGS
@@ -76,54 +140,139 @@ st.subheader("Upcoming Bookings")
 if not upcoming:
     st.info("You have no upcoming bookings.")
 else:
-    for booking_id, desk_id, b_date, start, end, status, checked_in in upcoming:
-        with st.container():
-            st.markdown(
-                f"""
-                **Desk {desk_id}**  
-                • Date: **{uk_date(b_date)}**  
-                • Time: **{start}–{end}**  
-                • Status: **{status}**  
-                • Checked in: **{'Yes' if checked_in else 'No'}**
-                """
-            )
+    selection = st.dataframe(
+        booking_rows(upcoming),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="upcoming_table",
+    )
+    selected_rows = selection.selection.rows
 
-            if st.button("Cancel Booking", key=f"cancel_{booking_id}"):
-                run_db(
-                    """
-                    UPDATE bookings
-                    SET status='cancelled'
-                    WHERE id=? AND user_id=? AND status='booked'
-                    """,
-                    (booking_id, user_id),
-                )
+    if st.button(
+        f"Cancel selected ({len(selected_rows)})",
+        disabled=not selected_rows,
+    ):
+        by_site = {}
+        for i in selected_rows:
+            by_site.setdefault(upcoming[i]["site_id"], []).append(upcoming[i]["id"])
+        for site_id, booking_ids in by_site.items():
+            cancel_bookings_for_user(user_id, booking_ids, st.session_state.user_email, site_id)
 
-                log_action(
-                    "BOOKING_CANCELLED",
-                    f"booking_id={booking_id}, desk_id={desk_id}",
-                )
+        st.success("Booking cancelled.")
+        st.rerun()
+
+    with st.expander("Cancel everything in a date range"):
+        cancel_range = st.date_input(
+            "Dates",
+            value=(date.today(), date.today()),
+            min_value=date.today(),
+            format="DD/MM/YYYY",
+            key="cancel_range",
+        )
+        if len(cancel_range) == 2:
+            in_range = sum(
+                fan_out(
+                    count_bookings_in_range, day_number(cancel_range[0]), day_number(cancel_range[1]), None, user_id
+                ).values()
+            )
 
-                st.success("Booking cancelled.")
+            if st.button(f"Cancel {in_range} bookings", disabled=not in_range):
+                cancel_bookings_between(user_id, cancel_range[0], cancel_range[1], st.session_state.user_email)
+                st.success("Bookings cancelled.")
                 st.rerun()
 
-            st.divider()
+# ---------------------------------------------------
+# WAITLIST (allocated requests already appear above)
+# ---------------------------------------------------
+if waitlist:
+    st.subheader("Waitlist")
+
+    waiting = [row for row in waitlist if row["status"] == "waiting"]
+    st.dataframe(
+        [
+            {
+                **({"Site": site_names[row["site_id"]]} if len(site_names) > 1 else {}),
+                "Desk": row["desk_name"],
+                "Date": uk_date(from_day_number(row["day"])),
+                "Start": hhmm(row["start_min"]),
+                "End": hhmm(row["end_min"]),
+                "Status": (
+                    f"Booked: {row['allocated_desk']}"
+                    if row["status"] == "allocated"
+                    else "Waiting"
+                ),
+            }
+            for row in waitlist
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    if waiting:
+        leave = st.multiselect(
+            "Leave the waitlist for",
+            [(row["site_id"], row["id"]) for row in waiting],
+            format_func=lambda entry: next(
+                f"{row['desk_name']}, {uk_date(from_day_number(row['day']))} "
+                f"{hhmm(row['start_min'])}-{hhmm(row['end_min'])}"
+                for row in waiting
+                if (row["site_id"], row["id"]) == entry
+            ),
+        )
+        if st.button("Leave waitlist", disabled=not leave):
+            for site_id in {site_id for site_id, _ in leave}:
+                leave_waitlist(
+                    user_id, [waitlist_id for s, waitlist_id in leave if s == site_id], st.session_state.user_email, site_id
+                )
+            st.success("Removed from the waitlist.")
+            st.rerun()
 
 # ---------------------------------------------------
-# SHOW PAST BOOKINGS
+# SHOW PAST BOOKINGS (keyset paginated, loaded on demand)
 # ---------------------------------------------------
 st.subheader("Past Bookings")
 
-if not past:
-    st.info("You have no past bookings.")
+yesterday = date.today() - timedelta(days=1)
+past_range = st.date_input(
+    "Date range",
+    value=(yesterday - timedelta(days=90), yesterday),
+    max_value=yesterday,
+    format="DD/MM/YYYY",
+)
+
+if len(past_range) != 2:
+    st.stop()
+
+day_from = day_number(past_range[0])
+day_to = day_number(past_range[1]) + 1
+range_key = (user_id, day_from, day_to)
+
+if st.session_state.get("past_bookings_key") != range_key:
+    rows, has_more = fetch_past_page(None, day_from, day_to)
+    st.session_state.past_bookings_key = range_key
+    st.session_state.past_bookings = booking_rows(rows)
+    st.session_state.past_bookings_cursor = past_key(rows[-1]) if rows else None
+    st.session_state.past_bookings_more = has_more
+
+if not st.session_state.past_bookings:
+    st.info("You have no past bookings in this date range.")
 else:
-    for booking_id, desk_id, b_date, start, end, status, checked_in in past:
-        st.markdown(
-            f"""
-            **Desk {desk_id}**  
-            • Date: **{uk_date(b_date)}**  
-            • Time: **{start}–{end}**  
-            • Status: **{status}**  
-            • Checked in: **{'Yes' if checked_in else 'No'}**
-            """
+    st.dataframe(
+        st.session_state.past_bookings,
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    if st.session_state.past_bookings_more and st.button("Load more"):
+        rows, has_more = fetch_past_page(
+            st.session_state.past_bookings_cursor,
+            day_from,
+            day_to,
         )
-        st.divider()
+        st.session_state.past_bookings.extend(booking_rows(rows))
+        if rows:
+            st.session_state.past_bookings_cursor = past_key(rows[-1])
+        st.session_state.past_bookings_more = has_more
+        st.rerun()
@@ -1,19 +1,82 @@
 import streamlit as st
+from datetime import date, datetime, time
 
+from utils.dates import day_number, minute_of_day
+from utils.db import ensure_db, get_version
+from utils.floorplan import load_floor_plans, load_occupancy, overlay_css
+from utils.sites import site_picker
 from utils.styles import apply_lato_font
 
+# ---------------------------------------------------
+# PAGE SETUP
+# ---------------------------------------------------
+st.set_page_config(page_title="Office Map", layout="wide")
 apply_lato_font()
 st.title("Office Map")
+ensure_db()
 
-st.write("Visual representation of the 15-desk layout.")
+# ---------------------------------------------------
+# FLOOR PLAN (cached until the desk catalogue changes)
+# ---------------------------------------------------
+site_id = site_picker(key="map_site")
+floors = load_floor_plans(get_version("desks"), site_id)
 
-# SIMPLE MAP GRID (placeholder)
-cols = st.columns(5)
+if not floors:
+    st.info("No desks have been set up yet.")
+    st.stop()
 
-desk_no = 1
-for i in range(3):  # 3 rows of 5 desks
-    for j in range(5):
-        cols[j].button(f"Desk {desk_no}", key=f"desk_{desk_no}")
-        desk_no += 1
+# ---------------------------------------------------
+# DATE / TIME / FLOOR PICKERS
+# ---------------------------------------------------
+now = datetime.now()
+default_time = time(min(max(now.hour, 9), 17), 30 if now.minute >= 30 else 0)
 
-st.info("Click desks to view booking availability on the 'Book a Desk' page.")
+col1, col2, col3 = st.columns([2, 2, 3])
+selected_date = col1.date_input("Date", value=date.today(), format="DD/MM/YYYY")
+selected_time = col2.time_input("Time", value=default_time, step=1800)
+
+floor_numbers = list(floors)
+if len(floor_numbers) > 1:
+    selected_floor = col3.radio(
+        "Floor",
+        floor_numbers,
+        format_func=lambda f: f"Floor {f}",
+        horizontal=True,
+    )
+else:
+    selected_floor = floor_numbers[0]
+
+# ---------------------------------------------------
+# OCCUPANCY OVERLAY (one aggregated query)
+# ---------------------------------------------------
+occupied = load_occupancy(day_number(selected_date), minute_of_day(selected_time), site_id)
+
+floor = floors[selected_floor]
+floor_occupied = occupied.intersection(floor["desk_ids"])
+
+st.caption(
+    f"{len(floor_occupied)} of {len(floor['desk_ids'])} desks booked at "
+    f"{selected_time.strftime('%H:%M')} on {selected_date.strftime('%d/%m/%Y')}."
+)
+
+st.markdown(overlay_css(floor_occupied) + floor["svg"], unsafe_allow_html=True)
+
+# ---------------------------------------------------
+# OPEN A DESK ON THE BOOKING PAGE
+# switch_page stays within the session, so the login survives and Book a
+# Desk reads the date and desk from its query params
+# ---------------------------------------------------
+desk_col, link_col = st.columns([3, 2], vertical_alignment="bottom")
+desk_id = desk_col.selectbox(
+    "Desk",
+    floor["desk_ids"],
+    format_func=floor["desk_names"].get,
+    key=f"map_desk_{site_id}_{selected_floor}",
+)
+if desk_id is not None and link_col.button(
+    f"Book {floor['desk_names'][desk_id]} on {selected_date.strftime('%d/%m/%Y')}", key="map_open_desk"
+):
+    st.switch_page(
+        "pages/2_Book_a_Desk.py",
+        query_params={"date": selected_date.isoformat(), "desk": str(desk_id)},
+    )
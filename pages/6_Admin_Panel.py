@@ -1,10 +1,30 @@
+import sqlite3
+from datetime import date, timedelta
+
 import streamlit as st
 import pandas as pd
 
-from utils.db import ensure_db, get_conn, write_desks_backup
+from utils.dates import day_number
+from utils.db import ensure_db, fan_out, get_conn, get_site_conn, list_sites, write_desks_backup
+from utils.archive import ARCHIVE_HORIZON_DAYS, archive_all_sites, bookings_source
 from utils.auth import require_admin
-from utils.audit import log_action
+from utils.audit import actor_history, audit_logs, entity_history, log_action
+from utils.bookings import cancel_bookings_between, close_office, count_bookings_in_range
+from utils.csv_io import (
+    import_desks_csv,
+    import_users_csv,
+    iter_audit_csv,
+    iter_bookings_csv,
+    spool_csv,
+)
+from utils.users import BULK_OPERATIONS, bulk_update_users, search_users
+from utils.notifications import ENABLED as NOTIFICATIONS_ENABLED, outbox_summary, send_pending_digests
+from utils.quotas import role_quotas, set_role_quota
+from utils.perf import rerun_fragment, timed_fragment, timing_toggle
+from utils.sites import create_site, move_desks, site_picker
+from utils.snapshot import get_report_conn, get_site_report_conn, show_snapshot_status
 from utils.styles import apply_lato_font
+from utils.writer import run_site_write, run_write
 
 st.set_page_config(page_title="Admin Panel", layout="wide")
 apply_lato_font()
@@ -16,19 +36,21 @@ require_admin()
 ensure_db()
 
 st.title("Admin Panel")
+timing_toggle()
 
 # ---------------------------------------------------
 # DB HELPERS
 # ---------------------------------------------------
 def run_db(query: str, params=()):
-    conn = get_conn()
-    conn.execute(query, params)
-    conn.commit()
-    conn.close()
+    run_write(lambda conn: conn.execute(query, params).rowcount)
+
+
+def site_names() -> dict[int, str]:
+    return {site["id"]: site["name"] for site in list_sites()}
 
 
 def table_exists(table_name: str) -> bool:
-    conn = get_conn()
+    conn = get_site_conn()
     row = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
         (table_name,),
@@ -38,272 +60,726 @@ def table_exists(table_name: str) -> bool:
 
 
 # ---------------------------------------------------
-# LOAD USERS
+# USER MANAGEMENT
 # ---------------------------------------------------
-conn = get_conn()
-users = conn.execute(
-    """
-    SELECT id, name, email, role, can_book, is_active
-    FROM users
-    ORDER BY email
-    """
-).fetchall()
-conn.close()
+@timed_fragment("User management")
+def user_management():
+    st.subheader("User Management")
+
+    current_user_email = st.session_state.user_email
+
+    search_col, page_col = st.columns([4, 1])
+    user_search = search_col.text_input(
+        "Search users",
+        placeholder="Start of name or email",
+    )
+
+    if st.session_state.get("user_search_term") != user_search:
+        st.session_state.user_search_term = user_search
+        st.session_state.user_cursors = [None]
+
+    # Where each page visited so far starts; the last is the current page
+    user_cursors = st.session_state.setdefault("user_cursors", [None])
+    users, next_cursor = search_users(user_search, user_cursors[-1])
+
+    with page_col:
+        prev_col, next_col = st.columns(2)
+        if prev_col.button("◀", disabled=len(user_cursors) == 1, key="user_page_prev"):
+            user_cursors.pop()
+            rerun_fragment()
+        if next_col.button("▶", disabled=next_cursor is None, key="user_page_next"):
+            user_cursors.append(next_cursor)
+            rerun_fragment()
+
+    if not users:
+        st.info("No users match this search.")
+    else:
+        user_selection = st.dataframe(
+            [
+                {
+                    "Name": row["name"],
+                    "Email": row["email"],
+                    "Role": row["role"],
+                    "Can book": "Yes" if row["can_book"] else "No",
+                    "Active": "Yes" if row["is_active"] else "No",
+                }
+                for row in users
+            ],
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="multi-row",
+            key=f"user_table_{len(user_cursors)}_{user_search}",
+        )
+        st.caption(f"Page {len(user_cursors)}")
+
+        # Admins cannot change their own account
+        selected_users = [
+            (users[i]["id"], users[i]["email"])
+            for i in user_selection.selection.rows
+            if users[i]["email"] != current_user_email
+        ]
+
+        action_col, apply_col = st.columns([3, 1])
+        bulk_operation = action_col.selectbox(
+            "Bulk action",
+            list(BULK_OPERATIONS),
+            format_func=lambda op: op.replace("_", " ").capitalize(),
+        )
+
+        if apply_col.button(
+            f"Apply to {len(selected_users)} selected",
+            disabled=not selected_users,
+            use_container_width=True,
+        ):
+            updated = bulk_update_users(selected_users, bulk_operation)
+            st.success(f"Updated {updated} users.")
+            rerun_fragment()
+
 
 # ---------------------------------------------------
-# USER MANAGEMENT
+# BOOKING QUOTAS (per role; empty means unlimited)
 # ---------------------------------------------------
-st.subheader("User Management")
+@timed_fragment("Booking quotas")
+def booking_quotas():
+    st.divider()
+    st.subheader("Booking Quotas")
+    st.caption("Leave a field empty for no limit. Checked on every booking, including team and waitlist bookings.")
 
-current_user_email = st.session_state.user_email
+    conn = get_conn()
+    quotas = role_quotas(conn)
+    conn.close()
+
+    for role, limits in quotas.items():
+        with st.form(f"quota_{role}"):
+            st.markdown(f"**{role.title()}**")
+            days_col, hours_col, advance_col = st.columns(3)
+            days_per_week = days_col.number_input(
+                "Days per week", min_value=1, max_value=7, step=1, value=limits["days_per_week"]
+            )
+            hours_per_day = hours_col.number_input(
+                "Hours per day",
+                min_value=0.5,
+                max_value=24.0,
+                step=0.5,
+                value=limits["minutes_per_day"] / 60 if limits["minutes_per_day"] is not None else None,
+            )
+            advance_days = advance_col.number_input(
+                "Days ahead", min_value=0, step=1, value=limits["advance_days"]
+            )
+
+            if st.form_submit_button("Save"):
+                set_role_quota(
+                    role,
+                    {
+                        "days_per_week": days_per_week,
+                        "minutes_per_day": round(hours_per_day * 60) if hours_per_day is not None else None,
+                        "advance_days": advance_days,
+                    },
+                    st.session_state.user_email,
+                )
+                st.success(f"Quotas for {role} saved.")
 
-for user_id, name, email, role, can_book, is_active in users:
-    is_self = email == current_user_email
 
-    with st.container(border=True):
-        col1, col2, col3, col4, col5, col6 = st.columns([3, 4, 2, 2, 2, 3])
+# ---------------------------------------------------
+# SITES (each keeps its bookings in its own database)
+# ---------------------------------------------------
+@timed_fragment("Sites")
+def sites_section():
+    st.divider()
+    st.subheader("Sites")
 
-        col1.markdown(f"**{name}**")
-        col2.markdown(email)
-        col3.markdown(f"Role: **{role}**")
-        col4.markdown(f"Can book: **{'Yes' if can_book else 'No'}**")
-        col5.markdown(f"Active: **{'Yes' if is_active else 'No'}**")
+    conn = get_conn()
+    sites = conn.execute(
+        """
+        SELECT s.id, s.name, s.db_file, COUNT(d.id) AS desks
+        FROM sites s
+        LEFT JOIN desks d ON d.site_id = s.id
+        GROUP BY s.id
+        ORDER BY s.id
+        """
+    ).fetchall()
+    desks = conn.execute("SELECT id, name, site_id FROM desks ORDER BY name").fetchall()
+    conn.close()
+
+    st.dataframe(
+        pd.DataFrame([tuple(row) for row in sites], columns=["ID", "Site", "Database", "Desks"]),
+        hide_index=True,
+        use_container_width=True,
+    )
 
-        with col6:
-            # ROLE TOGGLE
-            if role == "admin":
+    with st.expander("Add a site"):
+        site_name = st.text_input("Site name", key="new_site_name")
+        if st.button("Create site", disabled=not site_name.strip()):
+            try:
+                create_site(site_name, st.session_state.user_email)
+            except sqlite3.IntegrityError:
+                st.error(f"A site named '{site_name.strip()}' already exists.")
+            else:
+                st.success("Site created.")
+                rerun_fragment()
+
+    with st.expander("Move desks to another site"):
+        st.caption(
+            "Desks can only move once their upcoming bookings and waitlist entries are cancelled. "
+            "Past bookings stay with the site they were made at."
+        )
+        names = {row["id"]: row["name"] for row in sites}
+        desk_labels = {row["id"]: f"{row['name']} ({names[row['site_id']]})" for row in desks}
+        moving = st.multiselect("Desks", list(desk_labels), format_func=desk_labels.get, key="move_desks")
+        target = st.selectbox("To site", list(names), format_func=names.get, key="move_desks_site")
+
+        if st.button("Move desks", disabled=not moving):
+            by_site = {}
+            for row in desks:
+                if row["id"] in moving:
+                    by_site.setdefault(row["site_id"], []).append(row["id"])
+            try:
+                moved = sum(move_desks(desk_ids, target, st.session_state.user_email) for desk_ids in by_site.values())
+            except ValueError as exc:
+                st.error(str(exc))
+            else:
+                write_desks_backup()
+                st.success(f"Moved {moved} desks to {names[target]}.")
+                rerun_fragment()
+
+
+# ===================================================
+# DESK MANAGEMENT
+# ===================================================
+@timed_fragment("Desk management")
+def desk_management():
+    st.divider()
+    st.subheader("Desk Management")
+
+    conn = get_conn()
+    desks = conn.execute(
+        """
+        SELECT id, name, location, is_active, admin_only, site_id
+        FROM desks
+        ORDER BY name
+        """
+    ).fetchall()
+    conn.close()
+
+    # ---- CREATE DESK ----
+    with st.expander("Add new desk"):
+        desk_name = st.text_input("Desk name")
+        desk_location = st.text_input("Location (optional)")
+        desk_admin_only = st.checkbox("Admin-only desk")
+
+        pos1, pos2, pos3, pos4 = st.columns(4)
+        desk_floor = pos1.number_input("Floor", min_value=0, value=1, step=1)
+        desk_zone = pos2.text_input("Zone (optional)")
+        desk_pos_x = pos3.number_input("Map column", min_value=0, value=None, step=1)
+        desk_pos_y = pos4.number_input("Map row", min_value=0, value=None, step=1)
+        desk_site = site_picker(key="new_desk_site")
+
+        if st.button("Create desk"):
+            if not desk_name.strip():
+                st.error("Desk name is required.")
+            else:
+                try:
+                    new_desk_id = run_write(
+                        lambda conn: conn.execute(
+                            """
+                            INSERT INTO desks
+                            (name, location, admin_only, floor, zone, pos_x, pos_y, site_id)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                            RETURNING id
+                            """,
+                            (
+                                desk_name,
+                                desk_location,
+                                int(desk_admin_only),
+                                int(desk_floor),
+                                desk_zone or None,
+                                desk_pos_x,
+                                desk_pos_y,
+                                desk_site,
+                            ),
+                        ).fetchone()[0]
+                    )
+                except sqlite3.IntegrityError:
+                    st.error(f"A desk named '{desk_name}' already exists.")
+                else:
+                    log_action("CREATE_DESK", f"Created desk '{desk_name}'", "desk", new_desk_id, name=desk_name)
+                    write_desks_backup()
+                    st.success("Desk created.")
+                    rerun_fragment()
+
+    # ---- FLOOR PLAN LAYOUT ----
+    with st.expander("Edit floor plan layout"):
+        st.caption("Map column and row are grid positions on the Office Map.")
+
+        conn = get_conn()
+        layout_rows = conn.execute(
+            """
+            SELECT id, name, floor, zone, pos_x, pos_y
+            FROM desks
+            ORDER BY floor, name
+            """
+        ).fetchall()
+        conn.close()
+
+        edited_layout = st.data_editor(
+            [dict(row) for row in layout_rows],
+            column_config={
+                "id": st.column_config.NumberColumn("ID", disabled=True),
+                "name": st.column_config.TextColumn("Desk", disabled=True),
+                "floor": st.column_config.NumberColumn("Floor", min_value=0, step=1),
+                "zone": st.column_config.TextColumn("Zone"),
+                "pos_x": st.column_config.NumberColumn("Map column", min_value=0, step=1),
+                "pos_y": st.column_config.NumberColumn("Map row", min_value=0, step=1),
+            },
+            hide_index=True,
+            use_container_width=True,
+            key="desk_layout_editor",
+        )
+
+        if st.button("Save layout"):
+            run_write(
+                lambda conn: conn.executemany(
+                    """
+                    UPDATE desks
+                    SET floor = ?, zone = ?, pos_x = ?, pos_y = ?
+                    WHERE id = ?
+                    """,
+                    [
+                        (row["floor"], row["zone"] or None, row["pos_x"], row["pos_y"], row["id"])
+                        for row in edited_layout
+                    ],
+                ).rowcount
+            )
+            log_action("UPDATE_DESK_LAYOUT", f"Updated floor plan layout for {len(edited_layout)} desks")
+            write_desks_backup()
+            st.success("Layout saved.")
+            rerun_fragment()
+
+    # ---- EXISTING DESKS ----
+    for desk_id, name, location, is_active, admin_only, site_id in desks:
+        with st.container(border=True):
+            col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 2, 3])
+
+            col1.markdown(f"**{name}**")
+            col2.markdown(location or "—")
+            col3.markdown(f"Active: **{'Yes' if is_active else 'No'}**")
+            col4.markdown(f"Admin only: **{'Yes' if admin_only else 'No'}**")
+
+            with col5:
+                # Enable / Disable desk
                 if st.button(
-                    "Remove admin",
-                    key=f"remove_admin_{user_id}",
-                    disabled=is_self,
+                    "Disable" if is_active else "Enable",
+                    key=f"toggle_desk_active_{desk_id}",
                 ):
-                    if not is_self:
-                        log_action("REMOVE_ADMIN", f"Removed admin role from {email}")
-                        run_db("UPDATE users SET role='user' WHERE id=?", (user_id,))
-                        st.rerun()
-            else:
+                    log_action(
+                        "TOGGLE_DESK_ACTIVE",
+                        f"{'Disabled' if is_active else 'Enabled'} desk '{name}'",
+                        "desk",
+                        desk_id,
+                        is_active=0 if is_active else 1,
+                    )
+                    run_db(
+                        "UPDATE desks SET is_active=? WHERE id=?",
+                        (0 if is_active else 1, desk_id),
+                    )
+                    write_desks_backup()
+                    rerun_fragment()
+
+                # Admin-only toggle
                 if st.button(
-                    "Make admin",
-                    key=f"make_admin_{user_id}",
-                    disabled=is_self,
+                    "Remove admin-only" if admin_only else "Make admin-only",
+                    key=f"toggle_desk_admin_{desk_id}",
                 ):
-                    log_action("PROMOTE_TO_ADMIN", f"Promoted {email} to admin")
-                    run_db("UPDATE users SET role='admin' WHERE id=?", (user_id,))
-                    st.rerun()
-
-            # BOOKING PERMISSION
-            toggle_label = "Disable booking" if can_book else "Enable booking"
-            if st.button(
-                toggle_label,
-                key=f"toggle_booking_{user_id}",
-                disabled=is_self or not is_active,
-            ):
-                if not is_self:
                     log_action(
-                        "TOGGLE_CAN_BOOK",
-                        f"{'Disabled' if can_book else 'Enabled'} booking for {email}",
+                        "TOGGLE_DESK_ADMIN_ONLY",
+                        f"{'Unrestricted' if admin_only else 'Restricted'} desk '{name}'",
+                        "desk",
+                        desk_id,
+                        admin_only=0 if admin_only else 1,
                     )
                     run_db(
-                        "UPDATE users SET can_book=? WHERE id=?",
-                        (0 if can_book else 1, user_id),
+                        "UPDATE desks SET admin_only=? WHERE id=?",
+                        (0 if admin_only else 1, desk_id),
                     )
-                    st.rerun()
-
-            # ACTIVE STATUS
-            status_label = "Deactivate user" if is_active else "Activate user"
-            if st.button(
-                status_label,
-                key=f"toggle_active_{user_id}",
-                disabled=is_self,
-            ):
-                if not is_self:
+                    write_desks_backup()
+                    rerun_fragment()
+
+                # ---- DELETE DESK COMPLETELY ----
+                confirm = st.checkbox(
+                    "Confirm delete",
+                    key=f"confirm_delete_{desk_id}",
+                )
+
+                if confirm and st.button(
+                    "Delete permanently",
+                    key=f"delete_desk_{desk_id}",
+                ):
                     log_action(
-                        "TOGGLE_ACTIVE",
-                        f"{'Deactivated' if is_active else 'Activated'} user {email}",
+                        "DELETE_DESK",
+                        f"Deleted desk '{name}' and associated bookings",
+                        "desk",
+                        desk_id,
+                        name=name,
                     )
-                    if is_active:
-                        run_db(
-                            "UPDATE users SET is_active=0, can_book=0 WHERE id=?",
-                            (user_id,),
-                        )
-                    else:
-                        run_db(
-                            "UPDATE users SET is_active=1 WHERE id=?",
-                            (user_id,),
+
+                    # The desk's bookings live in its site's database
+                    if table_exists("bookings"):
+                        run_site_write(
+                            site_id,
+                            lambda conn: sum(
+                                conn.execute(f"DELETE FROM {table} WHERE desk_id = ?", (desk_id,)).rowcount
+                                for table in ("bookings", "bookings_archive", "waitlist")
+                            ),
                         )
-                    st.rerun()
+
+                    run_db("DELETE FROM desks WHERE id = ?", (desk_id,))
+                    write_desks_backup()
+
+                    st.success(f"Desk '{name}' deleted.")
+                    rerun_fragment()
+
 
 # ===================================================
-# DESK MANAGEMENT
+# BULK IMPORT / EXPORT
 # ===================================================
-st.divider()
-st.subheader("Desk Management")
-
-conn = get_conn()
-desks = conn.execute(
-    """
-    SELECT id, name, location, is_active, admin_only
-    FROM desks
-    ORDER BY name
-    """
-).fetchall()
-conn.close()
-
-# ---- CREATE DESK ----
-with st.expander("Add new desk"):
-    desk_name = st.text_input("Desk name")
-    desk_location = st.text_input("Location (optional)")
-    desk_admin_only = st.checkbox("Admin-only desk")
-
-    if st.button("Create desk"):
-        if not desk_name.strip():
-            st.error("Desk name is required.")
-        else:
-            log_action("CREATE_DESK", f"Created desk '{desk_name}'")
-            run_db(
-                """
-                INSERT INTO desks (name, location, admin_only)
-                VALUES (?, ?, ?)
-                """,
-                (desk_name, desk_location, int(desk_admin_only)),
-            )
-            write_desks_backup()
-            st.success("Desk created.")
-            st.rerun()
-
-# ---- EXISTING DESKS ----
-for desk_id, name, location, is_active, admin_only in desks:
-    with st.container(border=True):
-        col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 2, 3])
-
-        col1.markdown(f"**{name}**")
-        col2.markdown(location or "—")
-        col3.markdown(f"Active: **{'Yes' if is_active else 'No'}**")
-        col4.markdown(f"Admin only: **{'Yes' if admin_only else 'No'}**")
-
-        with col5:
-            # Enable / Disable desk
-            if st.button(
-                "Disable" if is_active else "Enable",
-                key=f"toggle_desk_active_{desk_id}",
-            ):
-                log_action(
-                    "TOGGLE_DESK_ACTIVE",
-                    f"{'Disabled' if is_active else 'Enabled'} desk '{name}'",
-                )
-                run_db(
-                    "UPDATE desks SET is_active=? WHERE id=?",
-                    (0 if is_active else 1, desk_id),
-                )
-                write_desks_backup()
-                st.rerun()
-
-            # Admin-only toggle
-            if st.button(
-                "Remove admin-only" if admin_only else "Make admin-only",
-                key=f"toggle_desk_admin_{desk_id}",
-            ):
-                log_action(
-                    "TOGGLE_DESK_ADMIN_ONLY",
-                    f"{'Unrestricted' if admin_only else 'Restricted'} desk '{name}'",
-                )
-                run_db(
-                    "UPDATE desks SET admin_only=? WHERE id=?",
-                    (0 if admin_only else 1, desk_id),
-                )
+@timed_fragment("Import / export")
+def import_export():
+    st.divider()
+    st.subheader("Import / Export")
+
+    with st.expander("Import users or desks from CSV"):
+        st.caption(
+            "Users: email (required), name, role, can_book, is_active. "
+            "Desks: name (required), location, is_active, admin_only, floor, zone, pos_x, pos_y. "
+            "Existing rows are updated; blank cells keep their current value."
+        )
+        import_kind = st.radio("Import", ["Users", "Desks"], horizontal=True)
+        import_file = st.file_uploader("CSV file", type=["csv"], key="csv_import_file")
+
+        if import_file is not None and st.button("Run import"):
+            if import_kind == "Users":
+                result = import_users_csv(import_file)
+            else:
+                result = import_desks_csv(import_file)
                 write_desks_backup()
-                st.rerun()
 
-            # ---- DELETE DESK COMPLETELY ----
-            confirm = st.checkbox(
-                "Confirm delete",
-                key=f"confirm_delete_{desk_id}",
+            log_action(
+                f"IMPORT_{import_kind.upper()}",
+                f"Imported {result['imported']} {import_kind.lower()} "
+                f"from {import_file.name} ({result['failed']} rows rejected)",
             )
 
-            if confirm and st.button(
-                "Delete permanently",
-                key=f"delete_desk_{desk_id}",
-            ):
-                log_action(
-                    "DELETE_DESK",
-                    f"Deleted desk '{name}' and associated bookings",
+            st.success(f"Imported {result['imported']} rows.")
+            if result["failed"]:
+                st.warning(f"{result['failed']} rows were rejected.")
+                st.dataframe(
+                    [{"Line": line, "Error": message} for line, message in result["errors"]],
+                    hide_index=True,
+                    use_container_width=True,
                 )
 
-                if table_exists("bookings"):
-                    run_db(
-                        "DELETE FROM bookings WHERE desk_id = ?",
-                        (desk_id,),
-                    )
-
-                run_db("DELETE FROM desks WHERE id = ?", (desk_id,))
-                write_desks_backup()
+    export_col1, export_col2 = st.columns(2)
+    export_col1.download_button(
+        "Export bookings (CSV)",
+        data=lambda: spool_csv(iter_bookings_csv()),
+        file_name="bookings.csv",
+        mime="text/csv",
+        use_container_width=True,
+    )
+    export_col2.download_button(
+        "Export audit log (CSV)",
+        data=lambda: spool_csv(iter_audit_csv()),
+        file_name="audit_log.csv",
+        mime="text/csv",
+        use_container_width=True,
+    )
 
-                st.success(f"Desk '{name}' deleted.")
-                st.rerun()
 
 # ---------------------------------------------------
 # BOOKINGS OVERVIEW
 # ---------------------------------------------------
-st.divider()
-st.subheader("All Bookings")
+@timed_fragment("Bookings table")
+def bookings_overview():
+    st.divider()
+    st.subheader("All Bookings")
+
+    if table_exists("bookings"):
+        bookings_range = st.date_input(
+            "Booking dates",
+            value=(date.today() - timedelta(days=30), date.today() + timedelta(days=30)),
+            format="DD/MM/YYYY",
+            key="bookings_range",
+        )
+        if len(bookings_range) != 2:
+            return
+
+        range_from = day_number(bookings_range[0])
+        range_to = day_number(bookings_range[1])
+
+        conn = get_report_conn()
+        show_snapshot_status(conn, key="refresh_snapshot_bookings")
+        conn.close()
+
+        def site_bookings(conn):
+            return conn.execute(
+                f"""
+                SELECT
+                    b.id,
+                    u.email,
+                    d.name AS desk,
+                    b.date,
+                    b.start_time,
+                    b.end_time,
+                    b.status,
+                    b.checked_in
+                FROM {bookings_source(conn, range_from)} b
+                JOIN users u ON b.user_id = u.id
+                JOIN desks d ON b.desk_id = d.id
+                WHERE b.day BETWEEN ? AND ?
+                ORDER BY b.day DESC, b.start_min DESC
+                """,
+                (range_from, range_to),
+            ).fetchall()
+
+        names = site_names()
+        bookings = fan_out(site_bookings, connect=get_site_report_conn)
+
+        df_bookings = pd.DataFrame(
+            [(names[site_id], *row) for site_id, rows in bookings.items() for row in rows],
+            columns=[
+                "Site",
+                "ID",
+                "User",
+                "Desk",
+                "Date",
+                "Start",
+                "End",
+                "Status",
+                "Checked In",
+            ],
+        )
+        df_bookings = df_bookings.sort_values(["Date", "Start"], ascending=False, kind="stable")
+        if len(names) == 1:
+            df_bookings = df_bookings.drop(columns="Site")
+        st.dataframe(df_bookings, use_container_width=True)
+
+        with st.expander("Archive old bookings"):
+            st.caption(
+                "Moves bookings older than the horizon out of the live table at every site. "
+                "Reports above still include them when the date range needs it."
+            )
+            horizon = st.number_input(
+                "Archive bookings older than (days)",
+                min_value=30,
+                value=ARCHIVE_HORIZON_DAYS,
+                step=30,
+            )
+            if st.button("Run archive"):
+                moved = archive_all_sites(int(horizon))
+                log_action("ARCHIVE_BOOKINGS", f"Archived {moved} bookings older than {horizon} days")
+                st.success(f"Archived {moved} bookings.")
+    else:
+        st.info("No bookings table present.")
+
+
+# ---------------------------------------------------
+# BULK CANCELLATION (office closure or one user's range)
+# ---------------------------------------------------
+@timed_fragment("Bulk cancellation")
+def bulk_cancellation():
+    st.divider()
+    st.subheader("Bulk Cancellation")
+
+    mode = st.radio(
+        "Cancel",
+        ["Office or desk closure", "One user's bookings"],
+        horizontal=True,
+        key="bulk_cancel_mode",
+    )
+    cancel_range = st.date_input(
+        "Dates",
+        value=(date.today(), date.today()),
+        min_value=date.today(),
+        format="DD/MM/YYYY",
+        key="bulk_cancel_range",
+    )
+    if len(cancel_range) != 2:
+        return
+    day_from, day_to = (day_number(d) for d in cancel_range)
 
-if table_exists("bookings"):
     conn = get_conn()
-    bookings = conn.execute(
-        """
-        SELECT
-            b.id,
-            u.email,
-            d.name AS desk,
-            b.date,
-            b.start_time,
-            b.end_time,
-            b.status,
-            b.checked_in
-        FROM bookings b
-        JOIN users u ON b.user_id = u.id
-        JOIN desks d ON b.desk_id = d.id
-        ORDER BY b.date DESC
-        """
-    ).fetchall()
+    desk_ids, target_user, site_id = [], None, None
+    if mode == "Office or desk closure":
+        site_id = site_picker(key="bulk_cancel_site")
+        desks = {
+            row["id"]: row["name"]
+            for row in conn.execute("SELECT id, name FROM desks WHERE site_id = ? ORDER BY name", (site_id,))
+        }
+        desk_ids = st.multiselect(
+            "Desks (leave empty for the whole site)",
+            list(desks),
+            format_func=desks.get,
+            key="bulk_cancel_desks",
+        )
+    else:
+        email = st.text_input("User email", key="bulk_cancel_email").strip().lower()
+        user = conn.execute("SELECT id FROM users WHERE email = ?", (email,)).fetchone() if email else None
+        if email and not user:
+            st.warning("No user with that email.")
+        target_user = user["id"] if user else None
+
     conn.close()
 
-    df_bookings = pd.DataFrame(
-        bookings,
-        columns=[
-            "ID",
-            "User",
-            "Desk",
-            "Date",
-            "Start",
-            "End",
-            "Status",
-            "Checked In",
-        ],
-    )
-    st.dataframe(df_bookings, use_container_width=True)
-else:
-    st.info("No bookings table present.")
+    if mode == "Office or desk closure":
+        affected = fan_out(count_bookings_in_range, day_from, day_to, desk_ids, site_ids=[site_id])[site_id]
+    elif target_user:
+        affected = sum(fan_out(count_bookings_in_range, day_from, day_to, None, target_user).values())
+    else:
+        affected = 0
+
+    reason = st.text_input("Reason (sent to the people affected)", key="bulk_cancel_reason")
+    st.caption(f"{affected} bookings will be cancelled and their owners notified.")
+
+    confirm = st.checkbox("I understand this cannot be undone", key="bulk_cancel_confirm")
+    if st.button("Cancel bookings", type="primary", disabled=not (confirm and affected and reason.strip())):
+        actor = st.session_state.user_email
+        if mode == "Office or desk closure":
+            cancelled = close_office(cancel_range[0], cancel_range[1], desk_ids, reason.strip(), actor, site_id)
+        else:
+            cancelled = cancel_bookings_between(
+                target_user, cancel_range[0], cancel_range[1], actor, reason.strip(), notify=True
+            )
+        st.success(f"Cancelled {cancelled} bookings.")
+
+
+# ---------------------------------------------------
+# NOTIFICATIONS (outbox delivery state)
+# ---------------------------------------------------
+@timed_fragment("Notifications")
+def notifications_section():
+    st.divider()
+    st.subheader("Notifications")
+
+    if NOTIFICATIONS_ENABLED:
+        st.caption("Email digests are sent in the background. Sending now delivers whatever is pending.")
+    else:
+        st.caption("Email is off (set DESK_BOOKING_SMTP_HOST). Notifications are queued but not sent.")
+
+    summary = [dict(row) for rows in fan_out(outbox_summary).values() for row in rows]
+
+    if summary:
+        st.dataframe(
+            pd.DataFrame(summary)
+            .groupby(["channel", "kind", "status"], as_index=False)
+            .agg(count=("n", "sum"), last_error=("last_error", "max")),
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info("Nothing queued yet.")
+
+    if NOTIFICATIONS_ENABLED and st.button("Send pending digests now"):
+        result = send_pending_digests()
+        if result.get("busy"):
+            st.info("A send is already in progress.")
+        else:
+            st.success(f"Sent {result['sent']} digests, {result['failed']} failed.")
+
 
 # ---------------------------------------------------
 # AUDIT LOG
 # ---------------------------------------------------
-st.divider()
-st.subheader("Audit Log")
-
-conn = get_conn()
-logs = conn.execute(
-    """
-    SELECT timestamp, email, action, details
-    FROM audit_log
-    ORDER BY timestamp DESC
-    LIMIT 200
-    """
-).fetchall()
-conn.close()
-
-df_logs = pd.DataFrame(
-    logs,
-    columns=["Timestamp", "Actor", "Action", "Details"],
-)
-st.dataframe(df_logs, use_container_width=True)
+@timed_fragment("Audit log")
+def audit_log_section():
+    st.divider()
+    st.subheader("Audit Log")
+
+    def site_audit_log(conn):
+        return conn.execute(
+            """
+            SELECT timestamp, email, action, entity_type, entity_id, details
+            FROM audit_log
+            ORDER BY timestamp DESC
+            LIMIT 200
+            """
+        ).fetchall()
+
+    # Admin actions are logged in the catalogue, booking events at the
+    # booking's site: newest 200 of each, merged
+    logs = sorted(
+        audit_logs(site_audit_log, connect=get_site_report_conn, catalogue=get_report_conn),
+        key=lambda row: row["timestamp"],
+        reverse=True,
+    )[:200]
+
+    df_logs = pd.DataFrame(
+        [
+            (
+                row["timestamp"],
+                row["email"],
+                row["action"],
+                f"{row['entity_type']} {row['entity_id']}" if row["entity_type"] else "",
+                row["details"],
+            )
+            for row in logs
+        ],
+        columns=["Timestamp", "Actor", "Action", "Entity", "Details"],
+    )
+    st.dataframe(df_logs, use_container_width=True)
+
+    # ---- ENTITY HISTORY (one indexed lookup on the live log) ----
+    with st.expander("Entity history"):
+        type_col, id_col = st.columns([1, 2])
+        entity_type = type_col.selectbox("Entity", ["booking", "user", "desk", "waitlist"], key="history_entity_type")
+        entity_id = id_col.number_input("ID", min_value=1, value=None, step=1, key="history_entity_id")
+
+        if entity_id is not None:
+            # Booking and waitlist ids are per site, so one id may match at several
+            events = sorted(
+                audit_logs(entity_history, entity_type, int(entity_id)),
+                key=lambda row: row["timestamp"],
+                reverse=True,
+            )
+            actions = (
+                sorted(
+                    audit_logs(actor_history, int(entity_id)),
+                    key=lambda row: row["timestamp"],
+                    reverse=True,
+                )
+                if entity_type == "user"
+                else []
+            )
+
+            if not events:
+                st.info(f"No audit events for {entity_type} {int(entity_id)}.")
+            else:
+                st.dataframe(
+                    pd.DataFrame(
+                        [tuple(row) for row in events],
+                        columns=["Timestamp", "Actor", "Action", "Details", "Payload"],
+                    ),
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+            if actions:
+                st.caption("Actions performed by this user")
+                st.dataframe(
+                    pd.DataFrame(
+                        [tuple(row) for row in actions],
+                        columns=["Timestamp", "Action", "Entity", "Entity ID", "Details"],
+                    ),
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+user_management()
+booking_quotas()
+sites_section()
+desk_management()
+import_export()
+bookings_overview()
+bulk_cancellation()
+notifications_section()
+audit_log_section()
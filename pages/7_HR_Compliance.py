@@ -1,7 +1,11 @@
 import streamlit as st
 import pandas as pd
+from datetime import date, timedelta
+from utils.archive import bookings_source
 from utils.auth import require_admin
-from utils.db import ensure_db, get_conn
+from utils.dates import day_number
+from utils.db import ensure_db, fan_out, list_sites
+from utils.snapshot import get_report_conn, get_site_report_conn, show_snapshot_status
 from utils.styles import apply_lato_font
 
 apply_lato_font()
@@ -9,40 +13,73 @@ st.title("HR Compliance Reporting")
 ensure_db()
 require_admin()
 
-conn = get_conn()
-c = conn.cursor()
+# Reporting period (older ranges transparently include archived bookings)
+report_range = st.date_input(
+    "Reporting period",
+    value=(date.today() - timedelta(days=90), date.today()),
+    format="DD/MM/YYYY",
+)
+if len(report_range) != 2:
+    st.stop()
+
+day_from = day_number(report_range[0])
+day_to = day_number(report_range[1])
+
+conn = get_report_conn()
+show_snapshot_status(conn)
+conn.close()
+
+site_names = {site["id"]: site["name"] for site in list_sites()}
+
+
+# Each report runs at every site in parallel and is merged here
+def site_no_shows(conn):
+    return conn.execute(f"""
+        SELECT b.id, u.name, u.email, b.date, b.start_time, b.end_time
+        FROM {bookings_source(conn, day_from)} b
+        JOIN users u ON u.id = b.user_id
+        WHERE b.status='no_show'
+          AND b.day BETWEEN ? AND ?
+        ORDER BY b.day DESC
+    """, (day_from, day_to)).fetchall()
+
+
+def site_attendance(conn):
+    return conn.execute(f"""
+        SELECT u.id, u.name, u.email,
+            COALESCE(SUM(CASE WHEN b.checked_in=1 THEN 1 ELSE 0 END), 0) AS attended,
+            COALESCE(SUM(CASE WHEN b.status='no_show' THEN 1 ELSE 0 END), 0) AS no_shows
+        FROM users u
+        LEFT JOIN {bookings_source(conn, day_from)} b
+          ON b.user_id = u.id
+         AND b.day BETWEEN ? AND ?
+        GROUP BY u.id
+    """, (day_from, day_to)).fetchall()
+
 
 # No-show report
 st.subheader("No-show Records")
-nos = c.execute("""
-    SELECT b.id, u.name, u.email, b.date, b.start_time, b.end_time
-    FROM bookings b
-    JOIN users u ON u.id = b.user_id
-    WHERE b.status='no_show'
-    ORDER BY date DESC
-""").fetchall()
+nos = fan_out(site_no_shows, connect=get_site_report_conn)
 
 df_nos = pd.DataFrame(
-    nos,
-    columns=["Booking ID", "User", "Email", "Date", "Start", "End"],
-)
+    [(site_names[site_id], *row) for site_id, rows in nos.items() for row in rows],
+    columns=["Site", "Booking ID", "User", "Email", "Date", "Start", "End"],
+).sort_values("Date", ascending=False, kind="stable")
+if len(site_names) == 1:
+    df_nos = df_nos.drop(columns="Site")
 st.dataframe(df_nos)
 
 # Attendance summary
 st.subheader("Attendance Summary")
-attendance = c.execute("""
-    SELECT u.name, u.email,
-        SUM(CASE WHEN b.checked_in=1 THEN 1 ELSE 0 END) AS attended,
-        SUM(CASE WHEN b.status='no_show' THEN 1 ELSE 0 END) AS no_shows
-    FROM users u
-    LEFT JOIN bookings b ON b.user_id = u.id
-    GROUP BY u.id
-""").fetchall()
-
-df_att = pd.DataFrame(
-    attendance,
-    columns=["User", "Email", "Attended", "No Shows"],
+attendance = fan_out(site_attendance, connect=get_site_report_conn)
+
+df_att = (
+    pd.DataFrame(
+        [tuple(row) for rows in attendance.values() for row in rows],
+        columns=["ID", "User", "Email", "Attended", "No Shows"],
+    )
+    .groupby(["ID", "User", "Email"], as_index=False, sort=False)
+    .sum()
+    .drop(columns="ID")
 )
 st.dataframe(df_att)
-
-conn.close()
@@ -0,0 +1,106 @@
+import streamlit as st
+import pandas as pd
+
+from utils.analytics import (
+    WEEKDAYS,
+    default_period,
+    report_versions,
+    slot_labels,
+    utilisation_report,
+)
+from utils.auth import require_admin
+from utils.db import ensure_db
+from utils.snapshot import get_report_conn, show_snapshot_status
+from utils.styles import apply_lato_font
+
+st.set_page_config(page_title="Desk Analytics", layout="wide")
+apply_lato_font()
+st.title("Desk Utilisation Analytics")
+ensure_db()
+require_admin()
+
+# ---------------------------------------------------
+# PERIOD
+# ---------------------------------------------------
+period = st.date_input(
+    "Period",
+    value=default_period(),
+    format="DD/MM/YYYY",
+)
+if len(period) != 2:
+    st.stop()
+
+snapshot_conn = get_report_conn()
+show_snapshot_status(snapshot_conn)
+snapshot_conn.close()
+
+report = utilisation_report(period[0], period[1], *report_versions())
+
+# ---------------------------------------------------
+# HEADLINE FIGURES
+# ---------------------------------------------------
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Bookings", report["bookings"])
+col2.metric("Average utilisation", f"{report['mean_utilisation']:.0%}")
+col3.metric("Peak concurrent desks", f"{report['peak_concurrency']} / {len(report['desk_names'])}")
+col4.metric("No-show rate", f"{report['no_show_rate']:.0%}")
+
+# ---------------------------------------------------
+# WEEKDAY × HALF-HOUR OCCUPANCY
+# ---------------------------------------------------
+st.subheader("Occupancy by weekday and time")
+
+df_heat = pd.DataFrame(
+    (report["weekday_slot"] * 100).round(1),
+    index=WEEKDAYS,
+    columns=slot_labels(),
+)
+st.dataframe(
+    df_heat,
+    use_container_width=True,
+    column_config={
+        label: st.column_config.NumberColumn(label, format="%.0f%%")
+        for label in df_heat.columns
+    },
+)
+st.line_chart(df_heat.T, y_label="% of desks occupied")
+
+# ---------------------------------------------------
+# DAILY PEAK CONCURRENCY
+# ---------------------------------------------------
+st.subheader("Daily peak concurrency")
+
+if len(report["daily_peak"]):
+    st.bar_chart(
+        pd.DataFrame(
+            {"Peak desks in use": report["daily_peak"]},
+            index=pd.to_datetime(report["working_days"]),
+        )
+    )
+else:
+    st.info("No working days in this period.")
+
+# ---------------------------------------------------
+# PER-DESK UTILISATION
+# ---------------------------------------------------
+st.subheader("Utilisation by desk")
+
+df_desks = pd.DataFrame(
+    {
+        "Desk": report["desk_names"],
+        "Utilisation": (report["desk_utilisation"] * 100).round(1),
+    }
+).sort_values("Utilisation", ascending=False)
+st.dataframe(
+    df_desks,
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "Utilisation": st.column_config.ProgressColumn(
+            "Utilisation",
+            format="%.0f%%",
+            min_value=0,
+            max_value=100,
+        )
+    },
+)
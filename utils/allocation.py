@@ -0,0 +1,368 @@
+import heapq
+from datetime import date, datetime, timedelta
+
+from utils.audit import audit_event, log_actions
+from utils.bookings import (
+    DAY_END_MIN,
+    DAY_START_MIN,
+    SLOT_MINUTES,
+    BookingError,
+    day_slots,
+    is_past,
+)
+from utils.dates import day_number, from_day_number, hhmm, uk_date
+from utils.floorplan import place_desks
+from utils.quotas import add_minutes, day_minutes, quota_violation, weeks_spanning
+from utils.db import PRIMARY_SITE_ID, fan_out, other_site_ids
+from utils.writer import claim_users, run_site_write
+
+# Desks touching horizontally, vertically or diagonally on the floor grid
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+# ---------------------------------------------------
+# AVAILABILITY BITMASKS (bit i = slot i of the day)
+# ---------------------------------------------------
+def interval_mask(start_min: int, end_min: int) -> int:
+    first = max(0, (start_min - DAY_START_MIN) // SLOT_MINUTES)
+    last = min(len(day_slots()), -((DAY_START_MIN - end_min) // SLOT_MINUTES))
+    return ((1 << max(0, last - first)) - 1) << first
+
+
+def load_busy(conn, day_from: int, day_to: int) -> tuple[dict, dict]:
+    """
+    Booked slots for days in [day_from, day_to], in one query:
+    ({day: {desk_id: mask}}, {(user_id, day): mask}).
+    """
+    by_desk, by_user = {}, {}
+    for row in conn.execute(
+        """
+        SELECT user_id, desk_id, day, start_min, end_min
+        FROM bookings
+        WHERE day BETWEEN ? AND ?
+          AND status = 'booked'
+        """,
+        (day_from, day_to),
+    ):
+        mask = interval_mask(row["start_min"], row["end_min"])
+        desks = by_desk.setdefault(row["day"], {})
+        desks[row["desk_id"]] = desks.get(row["desk_id"], 0) | mask
+        key = (row["user_id"], row["day"])
+        by_user[key] = by_user.get(key, 0) | mask
+    return by_desk, by_user
+
+
+def load_held(conn, user_ids: list[int], day_from: int, day_to: int) -> dict:
+    """{(user_id, day): booked mask} for `user_ids` over [day_from, day_to] at one site."""
+    held = {}
+    for row in conn.execute(
+        f"""
+        SELECT user_id, day, start_min, end_min
+        FROM bookings
+        WHERE user_id IN ({','.join('?' * len(user_ids))})
+          AND day BETWEEN ? AND ?
+          AND status = 'booked'
+        """,
+        (*user_ids, day_from, day_to),
+    ):
+        key = (row["user_id"], row["day"])
+        held[key] = held.get(key, 0) | interval_mask(row["start_min"], row["end_min"])
+    return held
+
+
+def load_elsewhere(conn, user_ids: list[int], day_from: int, day_to: int) -> tuple[dict, dict]:
+    """
+    What the team job needs from another site, in one visit: load_held()
+    over [day_from, day_to] and day_minutes() over its whole weeks.
+    """
+    return (
+        load_held(conn, user_ids, day_from, day_to),
+        day_minutes(conn, user_ids, *weeks_spanning(day_from, day_to)),
+    )
+
+
+# ---------------------------------------------------
+# SOLVER (pure; no database access)
+# ---------------------------------------------------
+def _grow_cluster(seed: dict, free_at: dict, n: int, bound: float) -> tuple[int, list[dict]] | None:
+    """
+    Best-first flood fill from `seed` over touching free desks, nearest
+    first. Returns (spread, desks) for n connected desks, or None if there
+    are not enough or the spread reaches `bound` (a better block is known).
+    """
+    sx, sy = seed["pos_x"], seed["pos_y"]
+    heap = [(0, seed["id"], seed)]
+    seen = {(sx, sy)}
+    cluster, spread = [], 0
+
+    while heap and len(cluster) < n:
+        distance, _, desk = heapq.heappop(heap)
+        cluster.append(desk)
+        spread += distance
+        if spread >= bound:
+            return None
+        for dx, dy in NEIGHBOURS:
+            pos = (desk["pos_x"] + dx, desk["pos_y"] + dy)
+            if pos in seen or pos not in free_at:
+                continue
+            seen.add(pos)
+            near = free_at[pos]
+            heapq.heappush(heap, (abs(pos[0] - sx) + abs(pos[1] - sy), near["id"], near))
+
+    return (spread, cluster) if len(cluster) == n else None
+
+
+def choose_desks(free: list[dict], n: int, same_zone: bool, adjacent: bool) -> list[dict] | None:
+    """
+    n desks out of `free`, or None. same_zone keeps them within one zone
+    of one floor; adjacent also requires a connected block on the floor
+    grid, choosing the most compact block over every seed desk.
+    """
+    if n == 0:
+        return []
+
+    groups = {}
+    for desk in free:
+        key = (desk["floor"], desk["zone"]) if same_zone else desk["floor"] if adjacent else None
+        groups.setdefault(key, []).append(desk)
+
+    best = None
+    for desks in groups.values():
+        if len(desks) < n:
+            continue
+        if not adjacent:
+            return sorted(desks, key=lambda d: (d["floor"], d["pos_y"], d["pos_x"], d["id"]))[:n]
+
+        free_at = {(d["pos_x"], d["pos_y"]): d for d in desks}
+        for seed in desks:
+            found = _grow_cluster(seed, free_at, n, best[0] if best else float("inf"))
+            if found:
+                best = found
+    return best[1] if best else None
+
+
+def plan_allocation(
+    desks: list[dict],
+    busy: dict,
+    held: dict,
+    people: list[int],
+    days: list[int],
+    want: int,
+    same_zone: bool = True,
+    adjacent: bool = True,
+) -> tuple[dict, list]:
+    """
+    Seat `people` on each of `days` for the slots in `want`.
+
+    desks: candidate desks (id, floor, zone, pos_x, pos_y)
+    busy:  {day: {desk_id: booked mask}}; held: {(user_id, day): mask}
+
+    People who already hold a desk at that time keep it and are skipped.
+    First tries one block free on every day, so everyone keeps the same
+    desk all week; otherwise picks a block per day, keeping yesterday's
+    desk where it is still in the block. Returns
+    ({day: {user_id: desk_id}}, [(user_id, day) skipped]) or raises
+    BookingError naming the first day that cannot be seated.
+    """
+    need = {day: [p for p in people if not held.get((p, day), 0) & want] for day in days}
+    skipped = [(p, day) for day in days for p in people if held.get((p, day), 0) & want]
+
+    def free_on(day):
+        day_busy = busy.get(day, {})
+        return [d for d in desks if not day_busy.get(d["id"], 0) & want]
+
+    # One block free on every day (AND of availability) gives stable seats
+    seated = [p for p in people if any(p in need[day] for day in days)]
+    week_free = [d for d in desks if not any(busy.get(day, {}).get(d["id"], 0) & want for day in days)]
+    block = choose_desks(week_free, len(seated), same_zone, adjacent)
+    if block is not None:
+        seat = {person: desk["id"] for person, desk in zip(seated, block)}
+        return {day: {p: seat[p] for p in need[day]} for day in days}, skipped
+
+    plan, previous = {}, {}
+    for day in days:
+        block = choose_desks(free_on(day), len(need[day]), same_zone, adjacent)
+        if block is None:
+            raise BookingError(
+                f"Could not seat {len(need[day])} people"
+                f"{' together' if adjacent or same_zone else ''} on {uk_date(from_day_number(day))}."
+            )
+
+        block_ids = [desk["id"] for desk in block]
+        assigned = {p: previous[p] for p in need[day] if previous.get(p) in block_ids}
+        rest = iter(d for d in block_ids if d not in assigned.values())
+        for person in need[day]:
+            if person not in assigned:
+                assigned[person] = next(rest)
+
+        plan[day] = assigned
+        previous.update(assigned)
+    return plan, skipped
+
+
+# ---------------------------------------------------
+# WRITE JOB (runs on the writer thread; must not commit)
+# ---------------------------------------------------
+def allocate_team_job(
+    conn,
+    user_ids: list[int],
+    days: list[int],
+    start_min: int,
+    end_min: int,
+    same_zone: bool,
+    adjacent: bool,
+    include_admin_only: bool,
+    actor: str | None,
+    site_id: int = PRIMARY_SITE_ID,
+) -> dict:
+    """
+    Load availability, solve and insert every booking in the caller's
+    transaction: the batch commits whole or not at all, and nothing can
+    be booked between reading availability and inserting. One person
+    over quota fails the whole batch. Only an active admin may book for
+    a team: `actor` is checked here, not just by the page.
+    """
+    admin = conn.execute(
+        "SELECT 1 FROM users WHERE email = ? AND role = 'admin' AND is_active = 1", (actor,)
+    ).fetchone()
+    if admin is None:
+        raise BookingError("Only admins can book desks for a team.")
+
+    placeholders = ",".join("?" * len(user_ids))
+    eligible = {
+        row["id"]: row["name"]
+        for row in conn.execute(
+            f"SELECT id, name FROM users WHERE id IN ({placeholders}) AND is_active = 1 AND can_book = 1",
+            user_ids,
+        )
+    }
+    if missing := [u for u in user_ids if u not in eligible]:
+        raise BookingError(f"{len(missing)} of the selected people cannot book desks.")
+
+    desks = place_desks(
+        [
+            dict(row)
+            for row in conn.execute(
+                """
+                SELECT id, name, floor, zone, pos_x, pos_y
+                FROM desks
+                WHERE is_active = 1 AND site_id = ?
+                  AND (admin_only = 0 OR ?)
+                ORDER BY floor, id
+                """,
+                (site_id, 1 if include_admin_only else 0),
+            )
+        ]
+    )
+
+    busy, held = load_busy(conn, min(days), max(days))
+    # People booked in at another site at these times are skipped too, and
+    # their minutes there count towards quotas. Each other site is read
+    # once for the whole batch, after claiming the team, so no other site
+    # can book for any of them until this commits
+    claim_users(user_ids)
+    elsewhere = {}
+    others = other_site_ids(conn)
+    if others:
+        for site_held, site_minutes in fan_out(
+            load_elsewhere, user_ids, min(days), max(days), site_ids=others
+        ).values():
+            for key, mask in site_held.items():
+                held[key] = held.get(key, 0) | mask
+            add_minutes(elsewhere, site_minutes)
+    plan, skipped = plan_allocation(
+        desks, busy, held, user_ids, days, interval_mask(start_min, end_min), same_zone, adjacent
+    )
+
+    booking_ids = []
+    for day, seats in plan.items():
+        for user_id, desk_id in seats.items():
+            booking_ids.append(
+                conn.execute(
+                    """
+                    INSERT INTO bookings
+                    (user_id, desk_id, day, start_min, end_min, status, checked_in)
+                    VALUES (?, ?, ?, ?, ?, 'booked', 0)
+                    """,
+                    (user_id, desk_id, day, start_min, end_min),
+                ).lastrowid
+            )
+
+    # Quotas hold per person and day, checked on the updated counters
+    for day, seats in plan.items():
+        for user_id in seats:
+            if reason := quota_violation(conn, user_id, day, elsewhere=elsewhere):
+                raise BookingError(f"{eligible[user_id]}, {uk_date(from_day_number(day))}: {reason}")
+
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "TEAM_ALLOCATED",
+                f"{len(booking_ids)} bookings for {len(user_ids)} people over {len(days)} days, "
+                f"{hhmm(start_min)}-{hhmm(end_min)}",
+                booking_ids=booking_ids,
+                user_ids=user_ids,
+                days=days,
+            )
+        ],
+        actor=actor,
+    )
+    return {"plan": plan, "skipped": skipped, "booking_ids": booking_ids}
+
+
+# ---------------------------------------------------
+# ENTRY POINT
+# ---------------------------------------------------
+def booking_days(first: date, last: date, now: datetime | None = None) -> list[int]:
+    """Weekdays in [first, last] as day numbers."""
+    if last < first:
+        raise BookingError("The end date must not be before the start date.")
+    if first < (now or datetime.now()).date():
+        raise BookingError("Cannot book days in the past.")
+
+    days = []
+    current = first
+    while current <= last:
+        if current.weekday() < 5:
+            days.append(day_number(current))
+        current += timedelta(days=1)
+    return days
+
+
+def allocate_team(
+    user_ids: list[int],
+    first: date,
+    last: date,
+    start_min: int = DAY_START_MIN,
+    end_min: int = DAY_END_MIN,
+    same_zone: bool = True,
+    adjacent: bool = True,
+    include_admin_only: bool = False,
+    actor: str | None = None,
+    site_id: int = PRIMARY_SITE_ID,
+) -> dict:
+    if not user_ids:
+        raise BookingError("Select at least one person.")
+    if end_min <= start_min:
+        raise BookingError("The end time must be after the start time.")
+    if is_past(first, start_min):
+        raise BookingError(f"Cannot book {uk_date(first)} from {hhmm(start_min)}: that time has passed.")
+
+    days = booking_days(first, last)
+    if not days:
+        raise BookingError("The selected dates contain no weekdays.")
+
+    return run_site_write(
+        site_id,
+        allocate_team_job,
+        list(dict.fromkeys(user_ids)),
+        days,
+        start_min,
+        end_min,
+        same_zone,
+        adjacent,
+        include_admin_only,
+        actor,
+        site_id,
+    )
@@ -0,0 +1,177 @@
+from datetime import date, timedelta
+
+import numpy as np
+import streamlit as st
+
+from utils import metrics
+from utils.archive import bookings_source
+from utils.bookings import DAY_START_MIN, SLOT_MINUTES, day_slots
+from utils.dates import day_number, hhmm
+from utils.db import fan_out, get_version
+from utils.snapshot import get_report_conn, get_site_report_conn
+
+# The booking grid's slots, so the cube always lines up with it
+N_SLOTS = len(day_slots())
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+
+def slot_labels() -> list[str]:
+    return [hhmm(m) for m in day_slots()]
+
+
+# ---------------------------------------------------
+# OCCUPANCY CUBE
+# ---------------------------------------------------
+def build_occupancy_cube(
+    desk_idx: np.ndarray,
+    day_idx: np.ndarray,
+    start_min: np.ndarray,
+    end_min: np.ndarray,
+    n_desks: int,
+    n_days: int,
+) -> np.ndarray:
+    """
+    desk × day × slot occupancy (0/1) from booking intervals in one pass:
+    +1 at each start slot, -1 at each end slot, then a cumulative sum.
+    """
+    start_slot = np.clip((start_min - DAY_START_MIN) // SLOT_MINUTES, 0, N_SLOTS)
+    end_slot = np.clip(-((DAY_START_MIN - end_min) // SLOT_MINUTES), 0, N_SLOTS)
+
+    diff = np.zeros((n_desks, n_days, N_SLOTS + 1), dtype=np.int16)
+    np.add.at(diff, (desk_idx, day_idx, start_slot), 1)
+    np.add.at(diff, (desk_idx, day_idx, end_slot), -1)
+
+    return np.cumsum(diff[:, :, :N_SLOTS], axis=2) > 0
+
+
+def compute_utilisation(rows: dict, desk_ids: list[int], date_from: date, date_to: date, today: date) -> dict:
+    """
+    Aggregate booking columns (arrays keyed desk_id, day, start_min,
+    end_min, status) into utilisation figures. Pure function, so it can
+    be benchmarked without a database.
+    """
+    n_days = (date_to - date_from).days + 1
+    n_desks = len(desk_ids)
+    days = np.arange(np.datetime64(date_from), np.datetime64(date_to) + 1)
+    # numpy weekday: 1970-01-01 was a Thursday
+    weekday = (days.astype(np.int64) + 3) % 7
+    working = weekday < 5
+
+    desk_lookup = np.full(max(desk_ids, default=0) + 1, -1, dtype=np.int64)
+    desk_lookup[desk_ids] = np.arange(n_desks)
+
+    desk_col = np.asarray(rows["desk_id"], dtype=np.int64)
+    known = desk_col < len(desk_lookup)
+    desk_idx = np.where(known, desk_lookup[np.where(known, desk_col, 0)], -1)
+    day_idx = np.asarray(rows["day"], dtype=np.int64) - day_number(date_from)
+    status = np.asarray(rows["status"], dtype=str)
+    keep = (desk_idx >= 0) & (day_idx >= 0) & (day_idx < n_days)
+
+    occupied = keep & (status == "booked")
+    cube = build_occupancy_cube(
+        desk_idx[occupied],
+        day_idx[occupied],
+        np.asarray(rows["start_min"], dtype=np.int64)[occupied],
+        np.asarray(rows["end_min"], dtype=np.int64)[occupied],
+        n_desks,
+        n_days,
+    )
+
+    # desks in use per day × slot
+    concurrency = cube.sum(axis=0, dtype=np.int32)
+    working_concurrency = concurrency[working]
+
+    weekday_slot = np.zeros((5, N_SLOTS))
+    weekday_days = np.bincount(weekday[working], minlength=5)[:5]
+    np.add.at(weekday_slot, weekday[working], working_concurrency)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weekday_slot = weekday_slot / (weekday_days[:, None] * max(n_desks, 1))
+    weekday_slot = np.nan_to_num(weekday_slot)
+
+    working_slots = max(int(working.sum()) * N_SLOTS, 1)
+    desk_utilisation = cube[:, working, :].sum(axis=(1, 2)) / working_slots
+
+    # no-show rate over bookings that have already happened
+    past = keep & (day_idx < (today - date_from).days)
+    past_status = status[past]
+    no_shows = int((past_status == "no_show").sum())
+    attended_or_missed = int(np.isin(past_status, ["booked", "no_show"]).sum())
+
+    daily_peak = working_concurrency.max(axis=1) if working_concurrency.size else np.zeros(0)
+
+    return {
+        "weekday_slot": weekday_slot,
+        "desk_utilisation": desk_utilisation,
+        "daily_peak": daily_peak,
+        "working_days": days[working],
+        "peak_concurrency": int(daily_peak.max()) if daily_peak.size else 0,
+        "mean_utilisation": float(cube[:, working, :].mean()) if working.any() and n_desks else 0.0,
+        "no_show_rate": no_shows / attended_or_missed if attended_or_missed else 0.0,
+        "bookings": int(keep.sum()),
+    }
+
+
+# ---------------------------------------------------
+# CACHED LOADER
+# ---------------------------------------------------
+def _site_bookings(conn, day_from: int, day_to: int) -> list:
+    return conn.execute(
+        f"""
+        SELECT desk_id, day, start_min, end_min, status
+        FROM {bookings_source(conn, day_from)}
+        WHERE day BETWEEN ? AND ?
+          AND status IN ('booked', 'no_show')
+        """,
+        (day_from, day_to),
+    ).fetchall()
+
+
+@metrics.cache_data("utilisation_report", show_spinner=False, max_entries=16)
+def utilisation_report(date_from: date, date_to: date, bookings_versions: tuple, desks_version: int) -> dict:
+    """
+    Load the period's bookings from every site's report connection and
+    aggregate them. The version arguments are cache keys only and should
+    be read from the same connections (see report_versions).
+    """
+    conn = get_report_conn()
+    desks = conn.execute(
+        "SELECT id, name FROM desks WHERE is_active = 1 ORDER BY id"
+    ).fetchall()
+    conn.close()
+
+    by_site = fan_out(
+        _site_bookings, day_number(date_from), day_number(date_to), connect=get_site_report_conn
+    )
+    rows = [row for site_rows in by_site.values() for row in site_rows]
+
+    columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    report = compute_utilisation(
+        {
+            "desk_id": columns[0],
+            "day": columns[1],
+            "start_min": columns[2],
+            "end_min": columns[3],
+            "status": columns[4],
+        },
+        [row["id"] for row in desks],
+        date_from,
+        date_to,
+        date.today(),
+    )
+    report["desk_names"] = [row["name"] for row in desks]
+    return report
+
+
+def report_versions() -> tuple[tuple, int]:
+    """(bookings version of each site, desks version) as the reports see them."""
+    bookings = fan_out(lambda conn: get_version("bookings", conn), connect=get_site_report_conn)
+    conn = get_report_conn()
+    desks = get_version("desks", conn)
+    conn.close()
+    return tuple(bookings.values()), desks
+
+
+def default_period() -> tuple[date, date]:
+    today = date.today()
+    return today - timedelta(days=90), today
@@ -0,0 +1,123 @@
+import os
+from datetime import date, timedelta
+
+from utils.dates import day_number
+from utils.db import PRIMARY_SITE_ID, all_site_ids
+from utils.writer import run_site_write
+
+ARCHIVE_HORIZON_DAYS = int(os.getenv("DESK_BOOKING_ARCHIVE_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = 5000
+
+BOOKING_COLUMNS = "id, user_id, desk_id, day, start_min, end_min, status, checked_in"
+
+
+# ---------------------------------------------------
+# ARCHIVAL JOB
+# ---------------------------------------------------
+def archive_batch(conn, cutoff: int, batch_size: int) -> int:
+    """Write job: move up to `batch_size` bookings dated before `cutoff` into the archive."""
+    ids = [
+        row["id"]
+        for row in conn.execute(
+            "SELECT id FROM bookings WHERE day < ? ORDER BY id LIMIT ?",
+            (cutoff, batch_size),
+        )
+    ]
+    if not ids:
+        return 0
+
+    placeholders = ",".join("?" * len(ids))
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO bookings_archive ({BOOKING_COLUMNS})
+        SELECT {BOOKING_COLUMNS}
+        FROM bookings
+        WHERE id IN ({placeholders})
+        """,
+        ids,
+    )
+    conn.execute(f"DELETE FROM bookings WHERE id IN ({placeholders})", ids)
+    return len(ids)
+
+
+def forget_versions(conn, cutoff: int) -> int:
+    """
+    Write job: drop the data_versions rows nothing will read again. A day
+    before `cutoff` has no live bookings left and can take no more, and a
+    deleted user books nothing; rows for live days and users stay, so a
+    counter never restarts under a cached view. Returns the rows dropped.
+    """
+    days = conn.execute(
+        """
+        DELETE FROM data_versions
+        WHERE scope >= 'bookings_day:' AND scope < 'bookings_day;'
+          AND CAST(substr(scope, 14) AS INTEGER) < ?
+        """,
+        (cutoff,),
+    ).rowcount
+    users = conn.execute(
+        """
+        DELETE FROM data_versions
+        WHERE scope >= 'bookings_user:' AND scope < 'bookings_user;'
+          AND CAST(substr(scope, 15) AS INTEGER) NOT IN (SELECT id FROM users)
+        """
+    ).rowcount
+    return days + users
+
+
+def archive_bookings(
+    horizon_days: int | None = None, batch_size: int = ARCHIVE_BATCH_SIZE, site_id: int = PRIMARY_SITE_ID
+) -> int:
+    """
+    Move a site's bookings dated before today - horizon_days into its
+    bookings_archive. Each batch is a separate job on the site's writer,
+    so the live table is never locked for long and booking writes queue
+    in between; the archived days' version counters go last. Returns the
+    number of rows moved.
+    """
+    if horizon_days is None:
+        horizon_days = ARCHIVE_HORIZON_DAYS
+
+    cutoff = day_number(date.today() - timedelta(days=horizon_days))
+    moved = 0
+    while batch := run_site_write(site_id, archive_batch, cutoff, batch_size):
+        moved += batch
+    run_site_write(site_id, forget_versions, cutoff)
+    return moved
+
+
+def archive_all_sites(horizon_days: int | None = None) -> int:
+    return sum(archive_bookings(horizon_days, site_id=site_id) for site_id in all_site_ids())
+
+
+# ---------------------------------------------------
+# REPORTING SOURCE
+# ---------------------------------------------------
+def archived_through(conn) -> int | None:
+    """Latest booking day number held in the archive (an index lookup)."""
+    row = conn.execute("SELECT MAX(day) AS latest FROM bookings_archive").fetchone()
+    return row["latest"]
+
+
+def bookings_source(conn, day_from: int | None) -> str:
+    """
+    Table expression for reporting over bookings from `day_from` onward.
+    Only unions in the archive when the range reaches archived days;
+    `None` means all history. Generated text columns (date, start_time,
+    end_time) are included so report queries can use either encoding.
+    """
+    latest = archived_through(conn)
+
+    if latest is None or (day_from is not None and day_from > latest):
+        return "bookings"
+
+    columns = f"{BOOKING_COLUMNS}, date, start_time, end_time"
+
+    return (
+        f"(SELECT {columns} FROM bookings "
+        f"UNION ALL SELECT {columns} FROM bookings_archive)"
+    )
+
+
+if __name__ == "__main__":
+    print(f"Archived {archive_all_sites()} bookings.")
@@ -1,20 +1,103 @@
-from utils.db import get_conn
+import json
+
+from utils import metrics
+from utils.db import fan_out, get_conn, get_site_conn
+from utils.writer import run_write
 import streamlit as st
 from datetime import datetime
 
-def log_action(action, details):
-    conn = get_conn()
-    conn.execute(
+
+def audit_event(action, details, entity_type=None, entity_id=None, **payload):
+    """
+    One structured audit entry for log_actions: the human-readable details
+    plus the entity it concerns ("booking", "user" or "desk") and any
+    extra fields, stored as a JSON payload.
+    """
+    return (action, details, entity_type, entity_id, json.dumps(payload) if payload else None)
+
+
+def log_action(action, details, entity_type=None, entity_id=None, **payload):
+    log_actions_now([audit_event(action, details, entity_type, entity_id, **payload)])
+
+
+_SESSION_ACTOR = object()
+
+
+def log_actions(conn, entries, actor=_SESSION_ACTOR):
+    """
+    Write several audit entries with one executemany. Entries are
+    audit_event() tuples or plain (action, details) pairs.
+    Runs inside the caller's transaction; the caller commits.
+    Pass `actor` when running off the script thread (e.g. writer jobs);
+    system actions pass actor=None explicitly.
+    """
+    if actor is _SESSION_ACTOR:
+        actor = st.session_state.get("user_email")
+    timestamp = datetime.utcnow().isoformat()
+    entries = list(entries)
+
+    conn.executemany(
         """
-        INSERT INTO audit_log (email, action, details, timestamp)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO audit_log
+        (email, actor_id, action, details, entity_type, entity_id, payload, timestamp)
+        VALUES (?, (SELECT id FROM users WHERE email = ?), ?, ?, ?, ?, ?, ?)
         """,
-        (
-            st.session_state.user_email,
-            action,
-            details,
-            datetime.utcnow().isoformat(),
-        ),
+        [
+            (actor, actor, *entry, *(None,) * (5 - len(entry)), timestamp)
+            for entry in entries
+        ],
     )
-    conn.commit()
-    conn.close()
+
+    # A writer group retried after a lock error counts its entries again;
+    # retries are rare enough for that to be noise.
+    if metrics.ENABLED:
+        for entry in entries:
+            metrics.AUDIT_EVENTS.inc(entry[0])
+
+
+def log_actions_now(entries):
+    """Commit audit entries through the shared writer."""
+    run_write(log_actions, entries, actor=st.session_state.get("user_email"))
+
+
+def entity_history(conn, entity_type, entity_id, limit=200):
+    """Audit events about one booking, user or desk (idx_audit_entity)."""
+    return conn.execute(
+        """
+        SELECT timestamp, email, action, details, payload
+        FROM audit_log
+        WHERE entity_type = ? AND entity_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+        """,
+        (entity_type, entity_id, limit),
+    ).fetchall()
+
+
+def actor_history(conn, actor_id, limit=200):
+    """Audit events performed by one user (idx_audit_actor)."""
+    return conn.execute(
+        """
+        SELECT timestamp, action, entity_type, entity_id, details
+        FROM audit_log
+        WHERE actor_id = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+        """,
+        (actor_id, limit),
+    ).fetchall()
+
+
+def audit_logs(fn, *args, connect=get_site_conn, catalogue=get_conn) -> list:
+    """
+    `fn(conn, *args)` over every audit log, results concatenated: the
+    catalogue's (admin actions) and each site's (booking events).
+    """
+    conn = catalogue()
+    try:
+        rows = list(fn(conn, *args))
+    finally:
+        conn.close()
+    for site_rows in fan_out(fn, *args, connect=connect).values():
+        rows.extend(site_rows)
+    return rows
@@ -1,5 +1,4 @@
 import streamlit as st
-from google_auth_oauthlib.flow import Flow
 
 
 def require_login():
@@ -7,6 +6,9 @@ def require_login():
     if "oauth_email" in st.session_state:
         return
 
+    # Only signed-out visitors need the OAuth client
+    from google_auth_oauthlib.flow import Flow
+
     flow = Flow.from_client_config(
         {
             "web": {
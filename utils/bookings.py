@@ -0,0 +1,718 @@
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+
+from utils import metrics
+from utils.audit import audit_event, log_actions
+from utils.dates import day_number, hhmm, minute_of_day
+from utils.db import PRIMARY_SITE_ID, all_site_ids, get_conn, get_version, site_of_conn, site_of_desks
+from utils.outbox import EMAIL, enqueue, outbox_entry
+from utils.quotas import quota_violation
+from utils.writer import claim_users, run_site_write
+
+# Bookable day: 09:00 → 18:00 in 30 minute slots (minutes since midnight)
+DAY_START_MIN = 9 * 60
+DAY_END_MIN = 18 * 60
+SLOT_MINUTES = 30
+
+
+class BookingError(Exception):
+    """A booking request that cannot be honoured; the message is user-facing."""
+
+
+class BookingConflict(BookingError):
+    """Selected cells were booked by someone else since the grid was loaded."""
+
+    def __init__(self, cells: list[str]):
+        self.cells = cells
+        super().__init__(
+            f"{len(cells)} of the selected slots were just booked by someone else "
+            "and are now marked on the grid. Please review your selection."
+        )
+
+
+# ---------------------------------------------------
+# SLOTS & SELECTION
+# ---------------------------------------------------
+def day_slots() -> list[int]:
+    """Slot start times, as minutes since midnight."""
+    return list(range(DAY_START_MIN, DAY_END_MIN, SLOT_MINUTES))
+
+
+def is_past(day: date, minute: int, now: datetime | None = None) -> bool:
+    """Whether `minute` on `day` has started: every slot of an earlier day has."""
+    now = now or datetime.now()
+    return datetime.combine(day, time()) + timedelta(minutes=minute) < now
+
+
+def selection_to_intervals(cells, day: date, now: datetime | None = None) -> dict:
+    """
+    Turn grid cells ("<desk_id>_<HH:MM>") into one (start_min, end_min)
+    interval per desk, rejecting gaps and slots in the past.
+    """
+    by_desk = {}
+    for cell in cells:
+        desk_id, t = cell.split("_")
+        by_desk.setdefault(int(desk_id), []).append(minute_of_day(t))
+
+    intervals = {}
+    for desk_id, minutes in by_desk.items():
+        minutes.sort()
+
+        # Ensure contiguous time slots
+        for a, b in zip(minutes, minutes[1:]):
+            if b - a != SLOT_MINUTES:
+                raise BookingError("Selected time slots must be continuous.")
+
+        if any(is_past(day, m, now) for m in minutes):
+            raise BookingError("Cannot book time slots in the past.")
+
+        intervals[desk_id] = (minutes[0], minutes[-1] + SLOT_MINUTES)
+
+    return intervals
+
+
+def booked_cells(rows) -> set[str]:
+    """Grid cells covered by (desk_id, start_min, end_min) rows, clipped to the bookable day."""
+    labels = [hhmm(m) for m in day_slots()]
+    cells = set()
+    for desk_id, start_min, end_min in rows:
+        first = max(0, (start_min - DAY_START_MIN) // SLOT_MINUTES)
+        last = min(len(labels), -((DAY_START_MIN - end_min) // SLOT_MINUTES))
+        for i in range(first, last):
+            cells.add(f"{desk_id}_{labels[i]}")
+    return cells
+
+
+# ---------------------------------------------------
+# DAY VERSIONS & CONFLICTS
+# ---------------------------------------------------
+def day_version(conn, day: int) -> int:
+    """Change counter for one day's bookings (bumped by triggers)."""
+    return get_version(f"bookings_day:{day}", conn)
+
+
+def day_grid(conn, day: int) -> tuple[int, set[str]]:
+    """
+    (day version, booked cells) for the Book a Desk grid. The version is
+    read first: a booking landing in between only makes the view look
+    stale, never fresher than it is.
+    """
+    version = day_version(conn, day)
+    rows = conn.execute(
+        """
+        SELECT desk_id, start_min, end_min
+        FROM bookings
+        WHERE day = ?
+          AND status = 'booked'
+        """,
+        (day,),
+    ).fetchall()
+    return version, booked_cells(rows)
+
+
+def taken_cells(conn, day: int, intervals: dict) -> list[str]:
+    """Grid cells inside `intervals` that already hold a booking, in one query."""
+    desk_ids = list(intervals)
+    placeholders = ",".join("?" * len(desk_ids))
+    rows = conn.execute(
+        f"""
+        SELECT desk_id, start_min, end_min
+        FROM bookings
+        WHERE day = ?
+          AND status = 'booked'
+          AND desk_id IN ({placeholders})
+        """,
+        (day, *desk_ids),
+    ).fetchall()
+
+    taken = set()
+    for desk_id, start_min, end_min in rows:
+        want_start, want_end = intervals[desk_id]
+        for minute in range(want_start, want_end, SLOT_MINUTES):
+            if start_min < minute + SLOT_MINUTES and end_min > minute:
+                taken.add(f"{desk_id}_{hhmm(minute)}")
+
+    return sorted(taken)
+
+
+# ---------------------------------------------------
+# WRITE JOBS (run on the writer thread; must not commit)
+# ---------------------------------------------------
+def insert_bookings(
+    conn, user_id: int, day: int, intervals: dict, seen_version: int | None = None
+) -> list[int]:
+    """
+    Insert one booking per desk interval. `seen_version` is the day version
+    the grid was rendered from: if it is still current nothing has been
+    booked since, so the conflict query is skipped. Quotas are checked
+    against the trigger-maintained counters once the rows are in; a
+    violation raises and the writer rolls the inserts back. The user is
+    claimed first, so their bookings at other sites cannot change until
+    this commits.
+    """
+    claim_users([user_id])
+
+    # The desks may have moved site since the caller routed the request here
+    desk_ids = list(intervals)
+    here = conn.execute(
+        f"SELECT COUNT(*) FROM desks WHERE id IN ({','.join('?' * len(desk_ids))}) AND site_id = ?",
+        (*desk_ids, site_of_conn(conn)),
+    ).fetchone()[0]
+    if here != len(desk_ids):
+        raise BookingError("Those desks have moved to another site. Please reload the page.")
+
+    if seen_version is None or day_version(conn, day) != seen_version:
+        taken = taken_cells(conn, day, intervals)
+        if taken:
+            raise BookingConflict(taken)
+
+    booking_ids = []
+
+    for desk_id, (start_min, end_min) in intervals.items():
+        cur = conn.execute(
+            """
+            INSERT INTO bookings
+            (user_id, desk_id, day, start_min, end_min, status, checked_in)
+            VALUES (?, ?, ?, ?, ?, 'booked', 0)
+            """,
+            (user_id, desk_id, day, start_min, end_min),
+        )
+        booking_ids.append(cur.lastrowid)
+
+    if reason := quota_violation(conn, user_id, day):
+        raise BookingError(reason)
+
+    return booking_ids
+
+
+def _cancel_where(
+    conn, where: str, params, actor: str | None, reason: str | None = None,
+    notify_owners: bool = False, reallocate: bool = True,
+) -> list:
+    """
+    Cancel every booked row matching `where` with one UPDATE ... RETURNING,
+    then batch the audit events (and, when someone else cancelled them,
+    the owners' email notices) and offer the freed desks to the waitlist
+    unless `reallocate` is off. Returns the rows.
+    """
+    cancelled = conn.execute(
+        f"""
+        UPDATE bookings
+        SET status = 'cancelled'
+        WHERE status = 'booked' AND {where}
+        RETURNING id, user_id, desk_id, day, start_min, end_min
+        """,
+        params,
+    ).fetchall()
+    if not cancelled:
+        return []
+
+    extra = {"reason": reason} if reason else {}
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "BOOKING_CANCELLED",
+                f"booking_id={row['id']}, desk_id={row['desk_id']}",
+                "booking",
+                row["id"],
+                desk_id=row["desk_id"],
+                **extra,
+            )
+            for row in cancelled
+        ],
+        actor=actor,
+    )
+
+    if notify_owners:
+        enqueue(
+            conn,
+            [
+                outbox_entry(
+                    row["user_id"],
+                    EMAIL,
+                    "booking_cancelled",
+                    row["id"],
+                    desk_id=row["desk_id"],
+                    day=row["day"],
+                    start_min=row["start_min"],
+                    end_min=row["end_min"],
+                    **extra,
+                )
+                for row in cancelled
+            ],
+        )
+
+    if reallocate:
+        allocate_waitlist(
+            conn,
+            [(row["desk_id"], row["day"], row["start_min"], row["end_min"]) for row in cancelled],
+        )
+    return cancelled
+
+
+def cancel_user_bookings(conn, user_id: int, booking_ids: list[int], actor: str) -> int:
+    placeholders = ",".join("?" * len(booking_ids))
+    return len(_cancel_where(conn, f"user_id = ? AND id IN ({placeholders})", (user_id, *booking_ids), actor))
+
+
+def check_in_booking(conn, user_id: int, booking_id: int, actor: str) -> bool:
+    """Mark one of the user's live bookings as attended; False if it is not theirs or not booked."""
+    row = conn.execute(
+        """
+        UPDATE bookings
+        SET checked_in = 1
+        WHERE id = ? AND user_id = ? AND status = 'booked' AND checked_in = 0
+        RETURNING desk_id
+        """,
+        (booking_id, user_id),
+    ).fetchone()
+    if row is None:
+        return False
+
+    log_actions(
+        conn,
+        [audit_event("CHECKED_IN", f"booking_id={booking_id}, desk_id={row['desk_id']}", "booking", booking_id)],
+        actor=actor,
+    )
+    return True
+
+
+def range_filter(
+    day_from: int, day_to: int, desk_ids=None, user_id: int | None = None, now: datetime | None = None
+) -> tuple[str, list]:
+    """
+    WHERE clause for bookings in [day_from, day_to], optionally limited to
+    some desks or one user. Bookings that have already ended are left alone.
+    """
+    now = now or datetime.now()
+    today = day_number(now.date())
+    where = "day BETWEEN ? AND ? AND (day > ? OR (day = ? AND end_min > ?))"
+    params = [day_from, day_to, today, today, minute_of_day(now)]
+    if desk_ids:
+        where += f" AND desk_id IN ({','.join('?' * len(desk_ids))})"
+        params.extend(desk_ids)
+    if user_id is not None:
+        where += " AND user_id = ?"
+        params.append(user_id)
+    return where, params
+
+
+def count_bookings_in_range(conn, day_from: int, day_to: int, desk_ids=None, user_id: int | None = None) -> int:
+    """How many bookings a range cancellation would cancel (for a preview)."""
+    where, params = range_filter(day_from, day_to, desk_ids, user_id)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM bookings WHERE status = 'booked' AND {where}", params
+    ).fetchone()[0]
+
+
+def close_desks(conn, day_from: int, day_to: int, desk_ids, reason: str, actor: str) -> int:
+    """
+    Office closure: cancel every booking in the range (on `desk_ids`, or
+    all desks) and notify the owners. Nothing is reallocated, and waiting
+    requests the closure covers are cancelled too.
+    """
+    where, params = range_filter(day_from, day_to, desk_ids)
+    cancelled = _cancel_where(conn, where, params, actor, reason, notify_owners=True, reallocate=False)
+
+    # "Any desk" requests survive closing some desks, not the whole office
+    desk_filter = f"desk_id IN ({','.join('?' * len(desk_ids))})" if desk_ids else "1"
+    withdrawn = conn.execute(
+        f"""
+        UPDATE waitlist
+        SET status = 'cancelled'
+        WHERE status = 'waiting' AND day BETWEEN ? AND ? AND {desk_filter}
+        RETURNING id, user_id, day
+        """,
+        (day_from, day_to, *(desk_ids or ())),
+    ).fetchall()
+    enqueue(
+        conn,
+        [outbox_entry(row["user_id"], EMAIL, "waitlist_cancelled", day=row["day"], reason=reason) for row in withdrawn],
+    )
+
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "OFFICE_CLOSED",
+                f"days {day_from}-{day_to}, desks={'all' if not desk_ids else len(desk_ids)}, "
+                f"cancelled={len(cancelled)}: {reason}",
+                day_from=day_from,
+                day_to=day_to,
+                desk_ids=list(desk_ids or []),
+                cancelled=len(cancelled),
+                waitlist_cancelled=len(withdrawn),
+            )
+        ],
+        actor=actor,
+    )
+    return len(cancelled)
+
+
+def cancel_user_range(
+    conn, user_id: int, day_from: int, day_to: int, actor: str, reason: str | None = None, notify: bool = False
+) -> int:
+    """Cancel one user's bookings over a date range; freed desks go to the waitlist."""
+    where, params = range_filter(day_from, day_to, user_id=user_id)
+    return len(_cancel_where(conn, where, params, actor, reason, notify_owners=notify))
+
+
+# ---------------------------------------------------
+# WAITLIST (write jobs; run on the writer thread)
+# ---------------------------------------------------
+def _holds_booking(conn, user_id: int, day: int, start_min: int, end_min: int) -> bool:
+    return conn.execute(
+        """
+        SELECT 1 FROM bookings
+        WHERE user_id = ? AND day = ? AND status = 'booked'
+          AND start_min < ? AND end_min > ?
+        """,
+        (user_id, day, end_min, start_min),
+    ).fetchone() is not None
+
+
+def add_to_waitlist(
+    conn, user_id: int, day: int, start_min: int, end_min: int, desk_id: int | None, actor: str,
+    site_id: int = PRIMARY_SITE_ID,
+) -> int:
+    """
+    Queue a request for `desk_id` (None: any active desk at the site) over
+    [start_min, end_min). Refused while the request could be booked now,
+    since only a later release would ever serve it.
+    """
+    if end_min <= start_min:
+        raise BookingError("The waitlist end time must be after the start time.")
+
+    claim_users([user_id])
+    if desk_id is not None and conn.execute(
+        "SELECT 1 FROM desks WHERE id = ? AND site_id = ?", (desk_id, site_of_conn(conn))
+    ).fetchone() is None:
+        raise BookingError("That desk has moved to another site. Please reload the page.")
+
+    free = conn.execute(
+        """
+        SELECT d.id
+        FROM desks d
+        WHERE d.is_active = 1 AND d.site_id = ?
+          AND (? IS NULL OR d.id = ?)
+          AND NOT EXISTS (
+              SELECT 1 FROM bookings b
+              WHERE b.day = ? AND b.status = 'booked' AND b.desk_id = d.id
+                AND b.start_min < ? AND b.end_min > ?
+          )
+        LIMIT 1
+        """,
+        (site_id, desk_id, desk_id, day, end_min, start_min),
+    ).fetchone()
+    if free:
+        raise BookingError("A desk is free for that time. Book it from the grid instead.")
+
+    if _holds_booking(conn, user_id, day, start_min, end_min):
+        raise BookingError("You already have a desk booked for that time.")
+
+    # e.g. beyond the advance window: no release could ever serve it
+    if reason := quota_violation(conn, user_id, day):
+        raise BookingError(reason)
+
+    duplicate = conn.execute(
+        """
+        SELECT 1 FROM waitlist
+        WHERE user_id = ? AND day = ? AND start_min = ? AND end_min = ?
+          AND desk_id IS ? AND status = 'waiting'
+        """,
+        (user_id, day, start_min, end_min, desk_id),
+    ).fetchone()
+    if duplicate:
+        raise BookingError("You are already on the waitlist for that time.")
+
+    waitlist_id = conn.execute(
+        """
+        INSERT INTO waitlist (user_id, desk_id, day, start_min, end_min, status, created_at)
+        VALUES (?, ?, ?, ?, ?, 'waiting', ?)
+        RETURNING id
+        """,
+        (user_id, desk_id, day, start_min, end_min, datetime.utcnow().isoformat()),
+    ).fetchone()[0]
+
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "WAITLIST_JOINED",
+                f"waitlist_id={waitlist_id}, day={day}, {hhmm(start_min)}-{hhmm(end_min)}",
+                "waitlist",
+                waitlist_id,
+                desk_id=desk_id,
+            )
+        ],
+        actor=actor,
+    )
+    return waitlist_id
+
+
+def remove_from_waitlist(conn, user_id: int, waitlist_ids: list[int], actor: str) -> int:
+    placeholders = ",".join("?" * len(waitlist_ids))
+    removed = conn.execute(
+        f"""
+        UPDATE waitlist
+        SET status = 'cancelled'
+        WHERE id IN ({placeholders}) AND user_id = ? AND status = 'waiting'
+        RETURNING id
+        """,
+        (*waitlist_ids, user_id),
+    ).fetchall()
+
+    log_actions(
+        conn,
+        [
+            audit_event("WAITLIST_LEFT", f"waitlist_id={row['id']}", "waitlist", row["id"])
+            for row in removed
+        ],
+        actor=actor,
+    )
+    return len(removed)
+
+
+def allocate_waitlist(conn, freed, now: datetime | None = None) -> list[int]:
+    """
+    Offer freed intervals to waiting requests, oldest first. `freed` holds
+    (desk_id, day, start_min, end_min) rows that just stopped being booked.
+    Only requests overlapping a freed interval are read (idx_waitlist_waiting)
+    and only the freed desks are tried for "any desk" requests. Runs inside
+    the releasing job, so release and reallocation commit together.
+    Returns the ids of the bookings created.
+    """
+    now = now or datetime.now()
+    today, now_min = day_number(now.date()), minute_of_day(now)
+
+    candidates = {}
+    freed_desks = {}
+    for desk_id, day, start_min, end_min in freed:
+        if day < today:
+            continue
+        freed_desks.setdefault(day, {})[desk_id] = None
+        for row in conn.execute(
+            """
+            SELECT w.id, w.user_id, w.desk_id, w.day, w.start_min, w.end_min
+            FROM waitlist w
+            JOIN users u ON u.id = w.user_id
+            WHERE w.status = 'waiting'
+              AND w.day = ?
+              AND w.start_min < ?
+              AND w.end_min > ?
+              AND (w.desk_id IS NULL OR w.desk_id = ?)
+              AND (w.day > ? OR w.start_min >= ?)
+              AND u.is_active = 1
+              AND u.can_book = 1
+            """,
+            (day, end_min, start_min, desk_id, today, now_min),
+        ):
+            candidates[row["id"]] = row
+
+    if not candidates:
+        return []
+
+    desk_ids = sorted({desk_id for desks in freed_desks.values() for desk_id in desks})
+    active = {
+        row["id"]
+        for row in conn.execute(
+            f"SELECT id FROM desks WHERE is_active = 1 AND id IN ({','.join('?' * len(desk_ids))})",
+            desk_ids,
+        )
+    }
+
+    booking_ids = []
+    events = []
+    notices = []
+    for waitlist_id in sorted(candidates):
+        request = candidates[waitlist_id]
+        day, start_min, end_min = request["day"], request["start_min"], request["end_min"]
+
+        # Someone already holding a desk for that time does not get a second one
+        if _holds_booking(conn, request["user_id"], day, start_min, end_min):
+            continue
+
+        desks = [request["desk_id"]] if request["desk_id"] else list(freed_desks[day])
+        for desk_id in desks:
+            if desk_id not in active or taken_cells(conn, day, {desk_id: (start_min, end_min)}):
+                continue
+
+            # Free as of this version, so insert_bookings skips its own check.
+            # Over quota: undo just this offer and leave the request waiting.
+            conn.execute("SAVEPOINT waitlist_offer")
+            try:
+                booking_id = insert_bookings(
+                    conn, request["user_id"], day, {desk_id: (start_min, end_min)}, day_version(conn, day)
+                )[0]
+            except BookingError:
+                conn.execute("ROLLBACK TO waitlist_offer")
+                conn.execute("RELEASE waitlist_offer")
+                break
+            conn.execute("RELEASE waitlist_offer")
+            conn.execute(
+                "UPDATE waitlist SET status = 'allocated', booking_id = ? WHERE id = ?",
+                (booking_id, waitlist_id),
+            )
+            booking_ids.append(booking_id)
+            events.append(
+                audit_event(
+                    "WAITLIST_ALLOCATED",
+                    f"booking_id={booking_id}, desk_id={desk_id}, waitlist_id={waitlist_id}",
+                    "booking",
+                    booking_id,
+                    desk_id=desk_id,
+                    waitlist_id=waitlist_id,
+                    user_id=request["user_id"],
+                )
+            )
+            notices.append(
+                outbox_entry(
+                    request["user_id"],
+                    EMAIL,
+                    "waitlist_allocated",
+                    booking_id,
+                    desk_id=desk_id,
+                    day=day,
+                    start_min=start_min,
+                    end_min=end_min,
+                )
+            )
+            break
+
+    log_actions(conn, events, actor=None)
+    enqueue(conn, notices)
+    return booking_ids
+
+
+def waitlist_for_user(conn, user_id: int, day_from: int):
+    """The user's waiting and allocated requests from `day_from` on."""
+    return conn.execute(
+        """
+        SELECT w.id, w.day, w.start_min, w.end_min, w.status,
+               COALESCE(d.name, 'Any desk') AS desk_name,
+               ad.name AS allocated_desk
+        FROM waitlist w
+        LEFT JOIN desks d ON d.id = w.desk_id
+        LEFT JOIN bookings b ON b.id = w.booking_id
+        LEFT JOIN desks ad ON ad.id = b.desk_id
+        WHERE w.user_id = ?
+          AND w.day >= ?
+          AND w.status IN ('waiting', 'allocated')
+        ORDER BY w.day, w.start_min, w.id
+        """,
+        (user_id, day_from),
+    ).fetchall()
+
+
+# ---------------------------------------------------
+# ENTRY POINTS
+# Each write goes to the writer of the site that holds the bookings.
+# ---------------------------------------------------
+def booking_site(desk_ids) -> int:
+    """The site whose database takes bookings for `desk_ids`."""
+    conn = get_conn()
+    try:
+        return site_of_desks(conn, desk_ids)
+    except ValueError as exc:
+        raise BookingError("Book desks at one site at a time.") from exc
+    finally:
+        conn.close()
+
+
+def confirm_booking(
+    user_id: int, day: int, intervals: dict, seen_version: int | None = None
+) -> list[int]:
+    site_id = booking_site(intervals)
+    if not metrics.ENABLED:
+        return run_site_write(site_id, insert_bookings, user_id, day, intervals, seen_version)
+
+    started = perf_counter()
+    outcome = "error"
+    try:
+        booking_ids = run_site_write(site_id, insert_bookings, user_id, day, intervals, seen_version)
+        outcome = "confirmed"
+        metrics.BOOKINGS_CREATED.inc(amount=len(booking_ids))
+        return booking_ids
+    except BookingConflict:
+        outcome = "conflict"
+        raise
+    except BookingError:
+        outcome = "rejected"
+        raise
+    finally:
+        metrics.CONFIRM_SECONDS.observe(perf_counter() - started)
+        metrics.BOOKING_REQUESTS.inc(outcome)
+
+
+def book_selection(
+    user_id: int, selected_date: date, cells, view: dict | None = None, now: datetime | None = None
+) -> list[int]:
+    """
+    Book grid cells, as the Book a Desk confirm button does. `view` is the
+    grid the cells were picked from ({"version", "booked"}, see day_grid),
+    or None if it showed another day or site. Its version lets
+    insert_bookings skip the conflict query, so cells it already showed as
+    booked, which can only come from a stale component value, are
+    conflicts straight away.
+    """
+    if view is not None:
+        stale = sorted(set(cells) & view["booked"])
+        if stale:
+            raise BookingConflict(stale)
+
+    intervals = selection_to_intervals(cells, selected_date, now)
+    return confirm_booking(user_id, day_number(selected_date), intervals, view["version"] if view else None)
+
+
+def _counted(cancelled: int) -> int:
+    if metrics.ENABLED:
+        metrics.BOOKINGS_CANCELLED.inc(amount=cancelled)
+    return cancelled
+
+
+def cancel_bookings_for_user(
+    user_id: int, booking_ids: list[int], actor: str, site_id: int = PRIMARY_SITE_ID
+) -> int:
+    return _counted(run_site_write(site_id, cancel_user_bookings, user_id, booking_ids, actor))
+
+
+def cancel_bookings_between(
+    user_id: int, first: date, last: date, actor: str, reason: str | None = None, notify: bool = False
+) -> int:
+    """Cancel the user's bookings in the range at every site."""
+    return _counted(
+        sum(
+            run_site_write(
+                site_id, cancel_user_range, user_id, day_number(first), day_number(last), actor, reason, notify
+            )
+            for site_id in all_site_ids()
+        )
+    )
+
+
+def check_in(user_id: int, booking_id: int, actor: str, site_id: int = PRIMARY_SITE_ID) -> bool:
+    return run_site_write(site_id, check_in_booking, user_id, booking_id, actor)
+
+
+def close_office(
+    first: date, last: date, desk_ids, reason: str, actor: str, site_id: int = PRIMARY_SITE_ID
+) -> int:
+    """Close `desk_ids`, or the whole of `site_id` when none are given."""
+    desk_ids = list(desk_ids or [])
+    if desk_ids:
+        site_id = booking_site(desk_ids)
+    return _counted(run_site_write(site_id, close_desks, day_number(first), day_number(last), desk_ids, reason, actor))
+
+
+def join_waitlist(
+    user_id: int, day: int, start_min: int, end_min: int, desk_id: int | None, actor: str,
+    site_id: int = PRIMARY_SITE_ID,
+) -> int:
+    if desk_id is not None:
+        site_id = booking_site([desk_id])
+    return run_site_write(site_id, add_to_waitlist, user_id, day, start_min, end_min, desk_id, actor, site_id)
+
+
+def leave_waitlist(user_id: int, waitlist_ids: list[int], actor: str, site_id: int = PRIMARY_SITE_ID) -> int:
+    return run_site_write(site_id, remove_from_waitlist, user_id, waitlist_ids, actor)
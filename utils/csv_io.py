@@ -0,0 +1,316 @@
+import csv
+import heapq
+import io
+import sqlite3
+import tempfile
+from functools import partial
+
+from utils.archive import bookings_source
+from utils.db import get_conn, get_site_conn, list_sites
+from utils.writer import is_lock_error, run_write
+
+IMPORT_BATCH_SIZE = 1000
+EXPORT_FETCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+VALID_ROLES = {"user", "admin"}
+
+
+# ---------------------------------------------------
+# FIELD PARSING
+# ---------------------------------------------------
+def _flag(value, field):
+    """Parse an optional 0/1 style column. Blank means "leave unchanged"."""
+    value = (value or "").strip().lower()
+    if not value:
+        return None
+    if value in {"1", "yes", "y", "true"}:
+        return 1
+    if value in {"0", "no", "n", "false"}:
+        return 0
+    raise ValueError(f"{field} must be yes/no or 1/0, got '{value}'")
+
+
+def _integer(value, field):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{field} must be a whole number, got '{value}'") from None
+    if number < 0:
+        raise ValueError(f"{field} cannot be negative")
+    return number
+
+
+def _text(value):
+    value = (value or "").strip()
+    return value or None
+
+
+def _parse_user(row):
+    email = (row.get("email") or "").strip().lower()
+    if not email or "@" not in email:
+        raise ValueError("email is missing or invalid")
+
+    role = _text(row.get("role"))
+    if role is not None:
+        role = role.lower()
+        if role not in VALID_ROLES:
+            raise ValueError(f"role must be one of {', '.join(sorted(VALID_ROLES))}")
+
+    return (
+        _text(row.get("name")),
+        email,
+        role,
+        _flag(row.get("can_book"), "can_book"),
+        _flag(row.get("is_active"), "is_active"),
+    )
+
+
+def _parse_desk(row):
+    name = _text(row.get("name"))
+    if not name:
+        raise ValueError("name is missing")
+
+    return (
+        name,
+        _text(row.get("location")),
+        _flag(row.get("is_active"), "is_active"),
+        _flag(row.get("admin_only"), "admin_only"),
+        _integer(row.get("floor"), "floor"),
+        _text(row.get("zone")),
+        _integer(row.get("pos_x"), "pos_x"),
+        _integer(row.get("pos_y"), "pos_y"),
+    )
+
+
+# ---------------------------------------------------
+# UPSERT STATEMENTS
+# Blank optional columns keep the existing value on update and fall back
+# to the table default on insert.
+# ---------------------------------------------------
+USER_UPSERT = """
+    INSERT INTO users (name, email, role, can_book, is_active)
+    VALUES (COALESCE(?1, ?2), ?2, COALESCE(?3, 'user'), COALESCE(?4, 1), COALESCE(?5, 1))
+    ON CONFLICT (email) DO UPDATE SET
+        name = COALESCE(?1, users.name),
+        role = COALESCE(?3, users.role),
+        can_book = COALESCE(?4, users.can_book),
+        is_active = COALESCE(?5, users.is_active)
+"""
+
+DESK_UPSERT = """
+    INSERT INTO desks (name, location, is_active, admin_only, floor, zone, pos_x, pos_y)
+    VALUES (?1, ?2, COALESCE(?3, 1), COALESCE(?4, 0), COALESCE(?5, 1), ?6, ?7, ?8)
+    ON CONFLICT (name) DO UPDATE SET
+        location = COALESCE(?2, desks.location),
+        is_active = COALESCE(?3, desks.is_active),
+        admin_only = COALESCE(?4, desks.admin_only),
+        floor = COALESCE(?5, desks.floor),
+        zone = COALESCE(?6, desks.zone),
+        pos_x = COALESCE(?7, desks.pos_x),
+        pos_y = COALESCE(?8, desks.pos_y)
+"""
+
+
+# ---------------------------------------------------
+# STREAMING IMPORT
+# ---------------------------------------------------
+def upsert_rows(conn, upsert_sql: str, batch: list) -> list[tuple[int, str]]:
+    """
+    Write job: upsert a batch of (line, params) in one statement, or row
+    by row if that fails so one bad row does not sink the batch. Returns
+    (line, message) for each row that was rejected.
+    """
+    conn.execute("SAVEPOINT batch")
+    try:
+        conn.executemany(upsert_sql, [params for _, params in batch])
+    except sqlite3.DatabaseError as exc:
+        conn.execute("ROLLBACK TO batch")
+        conn.execute("RELEASE batch")
+        if is_lock_error(exc):
+            raise
+    else:
+        conn.execute("RELEASE batch")
+        return []
+
+    errors = []
+    for line, params in batch:
+        try:
+            conn.execute(upsert_sql, params)
+        except sqlite3.DatabaseError as exc:
+            if is_lock_error(exc):
+                raise
+            errors.append((line, str(exc)))
+    return errors
+
+
+def _import_csv(binary_file, required_column, parse_row, upsert_sql):
+    """
+    Stream a CSV upload through `parse_row` and upsert valid rows in
+    batches on the writer, one transaction each. Memory use is bounded by
+    the batch size.
+
+    Returns {"imported": int, "failed": int, "errors": [(line, message)]}.
+    """
+    result = {"imported": 0, "failed": 0, "errors": []}
+
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+
+    if not reader.fieldnames or required_column not in reader.fieldnames:
+        result["errors"].append((1, f"header must include a '{required_column}' column"))
+        result["failed"] = 1
+        text.detach()
+        return result
+
+    def record_error(line, message):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append((line, message))
+
+    batch = []
+
+    def flush():
+        errors = run_write(upsert_rows, upsert_sql, list(batch))
+        result["imported"] += len(batch) - len(errors)
+        for line, message in errors:
+            record_error(line, message)
+        batch.clear()
+
+    try:
+        for row in reader:
+            line = reader.line_num
+            try:
+                batch.append((line, parse_row(row)))
+            except ValueError as exc:
+                record_error(line, str(exc))
+                continue
+
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except (UnicodeDecodeError, csv.Error) as exc:
+        record_error(reader.line_num, f"could not read file: {exc}")
+    finally:
+        text.detach()
+
+    return result
+
+
+def import_users_csv(binary_file) -> dict:
+    """Columns: email (required), name, role, can_book, is_active."""
+    return _import_csv(binary_file, "email", _parse_user, USER_UPSERT)
+
+
+def import_desks_csv(binary_file) -> dict:
+    """Columns: name (required), location, is_active, admin_only, floor, zone, pos_x, pos_y."""
+    return _import_csv(binary_file, "name", _parse_desk, DESK_UPSERT)
+
+
+# ---------------------------------------------------
+# STREAMING EXPORT
+# ---------------------------------------------------
+def _csv_chunks(rows, header):
+    """CSV text for `header` and then `rows`, one chunk per EXPORT_FETCH_SIZE rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_FETCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _fetch_rows(query: str, params=(), connect=get_conn):
+    """Rows of `query`, fetched EXPORT_FETCH_SIZE at a time."""
+    conn = connect()
+    try:
+        cursor = conn.execute(query, params)
+        while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_csv(query: str, params=(), header=None, connect=get_conn, write_header=True):
+    """
+    Yield a query result as CSV text chunks, one fetchmany batch at a time,
+    without materialising the whole result.
+    """
+    conn = connect()
+    try:
+        cursor = conn.execute(query, params)
+        header = (header or [col[0] for col in cursor.description]) if write_header else None
+
+        def rows():
+            while batch := cursor.fetchmany(EXPORT_FETCH_SIZE):
+                yield from batch
+
+        yield from _csv_chunks(rows(), header)
+    finally:
+        conn.close()
+
+
+def iter_bookings_csv():
+    """Every site's bookings, archived ones included, one site after another (ids are per site)."""
+    for position, site in enumerate(list_sites()):
+        conn = get_site_conn(site["id"])
+        source = bookings_source(conn, None)
+        conn.close()
+        yield from iter_csv(
+            f"""
+            SELECT b.id, u.email, d.name, b.date, b.start_time, b.end_time,
+                   b.status, b.checked_in, ?
+            FROM {source} b
+            JOIN users u ON u.id = b.user_id
+            JOIN desks d ON d.id = b.desk_id
+            ORDER BY b.id
+            """,
+            (site["name"],),
+            header=["id", "email", "desk", "date", "start_time", "end_time", "status", "checked_in", "site"],
+            connect=partial(get_site_conn, site["id"]),
+            write_header=position == 0,
+        )
+
+
+def iter_audit_csv():
+    """
+    Every audit log, merged by timestamp: admin actions are logged in the
+    catalogue (blank site), booking events at the site that holds the
+    booking (ids are per site).
+    """
+    query = """
+        SELECT id, timestamp, email, actor_id, action, entity_type, entity_id, details, payload, ?
+        FROM audit_log
+        ORDER BY timestamp, id
+    """
+    sites = [_fetch_rows(query, ("",))] + [
+        _fetch_rows(query, (site["name"],), connect=partial(get_site_conn, site["id"]))
+        for site in list_sites()
+    ]
+    return _csv_chunks(
+        heapq.merge(*sites, key=lambda row: row[1] or ""),
+        ["id", "timestamp", "email", "actor_id", "action", "entity_type", "entity_id", "details", "payload", "site"],
+    )
+
+
+def spool_csv(chunks):
+    """
+    Write CSV chunks to a temporary file (kept in memory while small,
+    spilled to disk once large) and return it rewound for download.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    for chunk in chunks:
+        spool.write(chunk.encode("utf-8"))
+    spool.seek(0)
+    return spool
@@ -0,0 +1,130 @@
+import json
+from datetime import datetime
+
+from utils import metrics
+from utils.dates import minute_of_day
+from utils.db import fan_out, get_conn, get_version
+
+ATTENDANCE_WINDOW_DAYS = 30
+OCCUPANCY_TTL_SECONDS = 60
+
+
+# ---------------------------------------------------
+# CACHE KEYS
+# ---------------------------------------------------
+def _version(conn, scope: str) -> int:
+    row = conn.execute("SELECT version FROM data_versions WHERE scope = ?", (scope,)).fetchone()
+    return row[0] if row else 0
+
+
+def dashboard_versions(user_id: int) -> tuple[tuple, int]:
+    """
+    The user's bookings counter at each site plus the catalogue's desks
+    counter: one primary key lookup per database.
+    """
+    return tuple(fan_out(_version, f"bookings_user:{user_id}").values()), get_version("desks")
+
+
+# ---------------------------------------------------
+# PER-USER SUMMARY
+# ---------------------------------------------------
+def _site_summary(conn, user_id: int, today: int) -> dict:
+    row = conn.execute(
+        """
+        SELECT
+            COALESCE(SUM(b.day > :today AND b.status = 'booked'), 0) AS later,
+            COALESCE(SUM(b.day < :today AND b.status IN ('booked', 'no_show')), 0) AS past,
+            COALESCE(SUM(b.day < :today AND b.status IN ('booked', 'no_show') AND b.checked_in = 1), 0)
+                AS attended,
+            (
+                SELECT json_group_array(json_array(t.start_min, t.end_min, t.name))
+                FROM (
+                    SELECT b2.start_min, b2.end_min, d.name
+                    FROM bookings b2 JOIN desks d ON d.id = b2.desk_id
+                    WHERE b2.user_id = :user_id AND b2.day = :today AND b2.status = 'booked'
+                    ORDER BY b2.start_min
+                ) t
+            ) AS today_json,
+            (
+                SELECT json_array(b3.day, b3.start_min, b3.end_min, d.name)
+                FROM bookings b3 JOIN desks d ON d.id = b3.desk_id
+                WHERE b3.user_id = :user_id AND b3.day > :today AND b3.status = 'booked'
+                ORDER BY b3.day, b3.start_min
+                LIMIT 1
+            ) AS next_json
+        FROM bookings b
+        WHERE b.user_id = :user_id AND b.day >= :since
+        """,
+        {"user_id": user_id, "today": today, "since": today - ATTENDANCE_WINDOW_DAYS},
+    ).fetchone()
+
+    return {
+        "later": row["later"],
+        "past": row["past"],
+        "attended": row["attended"],
+        "today": [tuple(booking) for booking in json.loads(row["today_json"])],
+        "next": tuple(json.loads(row["next_json"])) if row["next_json"] else None,
+    }
+
+
+@metrics.cache_data("user_summary", show_spinner=False, max_entries=2000)
+def user_summary(user_id: int, today: int, bookings_versions: tuple, desks_version: int) -> dict:
+    """
+    Counts, today's bookings and the next later booking for one user: a
+    single query over idx_bookings_user_day at each site, merged. The
+    version arguments are cache keys only; the caller filters out today's
+    bookings that have already ended, so the entry stays valid all day.
+    """
+    sites = list(fan_out(_site_summary, user_id, today).values())
+    following = [site["next"] for site in sites if site["next"]]
+    return {
+        "later": sum(site["later"] for site in sites),
+        "past": sum(site["past"] for site in sites),
+        "attended": sum(site["attended"] for site in sites),
+        "today": sorted(booking for site in sites for booking in site["today"]),
+        "next": min(following) if following else None,
+    }
+
+
+def upcoming(summary: dict, today: int, now_min: int) -> tuple[int, tuple | None]:
+    """(upcoming count, next booking as (day, start, end, desk)) at `now_min`."""
+    remaining = [(today, *booking) for booking in summary["today"] if booking[1] > now_min]
+    following = remaining[0] if remaining else summary["next"]
+    return len(remaining) + summary["later"], following
+
+
+# ---------------------------------------------------
+# SHARED OCCUPANCY (one aggregate for everyone)
+# ---------------------------------------------------
+@metrics.cache_data("today_occupancy", ttl=OCCUPANCY_TTL_SECONDS, show_spinner=False, max_entries=2)
+def today_occupancy(today: int) -> dict:
+    """
+    Figures for `today` across every site, shared by every dashboard in
+    the process and refreshed at most once a minute. Each site runs one
+    aggregate over idx_bookings_day_status; people booked in at two
+    sites count once per site.
+    """
+    now_min = minute_of_day(datetime.now())
+    sites = fan_out(_site_occupancy, today, now_min).values()
+
+    conn = get_conn()
+    desks = conn.execute("SELECT COUNT(*) FROM desks WHERE is_active = 1").fetchone()[0]
+    conn.close()
+
+    return {"desks": desks, **{key: sum(site[key] for site in sites) for key in ("booked", "in_use", "people")}}
+
+
+def _site_occupancy(conn, today: int, now_min: int) -> dict:
+    return dict(
+        conn.execute(
+            """
+            SELECT
+                COUNT(DISTINCT desk_id) AS booked,
+                COUNT(DISTINCT CASE WHEN start_min <= :now AND end_min > :now THEN desk_id END) AS in_use,
+                COUNT(DISTINCT user_id) AS people
+            FROM bookings
+            WHERE day = :today AND status = 'booked'
+            """,
+            {"today": today, "now": now_min},
+        ).fetchone()
+    )
@@ -15,3 +15,29 @@ def uk_date(value) -> str:
         return datetime.strptime(str(value), "%Y-%m-%d").strftime("%d/%m/%Y")
     except Exception:
         return str(value)
+
+
+# ---------------------------------------------------
+# INTEGER ENCODING (bookings.day / start_min / end_min)
+# ---------------------------------------------------
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_number(d: date) -> int:
+    """Days since 1970-01-01, as stored in bookings.day."""
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def from_day_number(n: int) -> date:
+    return date.fromordinal(n + _EPOCH_ORDINAL)
+
+
+def minute_of_day(t) -> int:
+    """Minutes since midnight for a time or an 'HH:MM[:SS]' string."""
+    if isinstance(t, str):
+        return int(t[:2]) * 60 + int(t[3:5])
+    return t.hour * 60 + t.minute
+
+
+def hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
@@ -1,13 +1,20 @@
+import functools
 import json
 import os
+import re
 import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import streamlit as st
 
+from utils import metrics
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_DB_PATH = BASE_DIR / "data" / "data.db"
 PERSISTENT_DATA_DIR = Path("/data")
+BUSY_TIMEOUT_MS = 5000
 
 
 # ---------------------------------------------------
@@ -46,36 +53,184 @@ def _resolve_db_path() -> Path:
     return Path.home() / ".desk-booking" / "data.db"
 
 
-DB_PATH = _resolve_db_path().expanduser()
-DESK_BACKUP_PATH = Path(
-    os.getenv(
-        "DESK_BOOKING_DESK_BACKUP_PATH",
-        DB_PATH.parent / "desks.json",
-    )
-).expanduser()
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-DESK_BACKUP_PATH.parent.mkdir(parents=True, exist_ok=True)
+@functools.cache
+def get_db_path() -> Path:
+    """Database location, resolved (and its directory created) on first use."""
+    path = _resolve_db_path().expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@functools.cache
+def get_desk_backup_path() -> Path:
+    path = Path(
+        os.getenv(
+            "DESK_BOOKING_DESK_BACKUP_PATH",
+            get_db_path().parent / "desks.json",
+        )
+    ).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def __getattr__(name: str):
+    # DB_PATH / DESK_BACKUP_PATH stay available as attributes, resolved lazily
+    if name == "DB_PATH":
+        return get_db_path()
+    if name == "DESK_BACKUP_PATH":
+        return get_desk_backup_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ---------------------------------------------------
 # CONNECTION HANDLING
 # ---------------------------------------------------
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, uri=True)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    if metrics.ENABLED:
+        metrics.DB_CONNECTIONS.inc()
     return conn
 
 
+def get_conn() -> sqlite3.Connection:
+    """Connection to the catalogue database (users, desks, sites, quotas)."""
+    return _connect(get_db_path())
+
+
+def catalogue_uri() -> str:
+    """The catalogue as a read-only URI, for attaching to a site's connections."""
+    return f"{get_db_path().resolve().as_uri()}?mode=ro"
+
+
+# ---------------------------------------------------
+# SITE ROUTER (one bookings database per site)
+# ---------------------------------------------------
+# The original office
+PRIMARY_SITE_ID = 1
+FAN_OUT_WORKERS = 8
+
+
+def site_file_name(site_id: int) -> str:
+    return f"site_{site_id}.db"
+
+
+@functools.cache
+def site_db_path(site_id: int) -> Path:
+    """
+    File holding a site's bookings. A site's file never changes once the
+    site exists, so the lookup is cached for the life of the process.
+    """
+    conn = get_conn()
+    row = conn.execute("SELECT db_file FROM sites WHERE id = ?", (site_id,)).fetchone()
+    conn.close()
+    if row is None:
+        raise ValueError(f"Unknown site {site_id}")
+    return get_db_path().with_name(row["db_file"])
+
+
+def get_site_conn(site_id: int | None = None) -> sqlite3.Connection:
+    """
+    Connection for one site's bookings: the site's own file as `main`,
+    with the catalogue attached read-only as `catalogue`. Unqualified
+    users, desks and role_quotas resolve there, so booking queries and
+    write jobs run unchanged against any site, and a site's transactions
+    never take the catalogue's write lock.
+    """
+    conn = _connect(site_db_path(site_id or PRIMARY_SITE_ID))
+    conn.execute("ATTACH DATABASE ? AS catalogue", (catalogue_uri(),))
+    return conn
+
+
+def list_sites(conn: sqlite3.Connection | None = None) -> list[sqlite3.Row]:
+    own_conn = conn is None
+    if own_conn:
+        conn = get_conn()
+    sites = conn.execute("SELECT id, name, db_file FROM sites ORDER BY id").fetchall()
+    if own_conn:
+        conn.close()
+    return sites
+
+
+@functools.cache
+def all_site_ids() -> tuple[int, ...]:
+    """
+    Ids of every site, cached for the process: sites are only ever added,
+    and utils.sites clears this when it adds one.
+    """
+    return tuple(site["id"] for site in list_sites())
+
+
+def site_of_desks(conn: sqlite3.Connection, desk_ids) -> int:
+    """The one site all of `desk_ids` belong to (ValueError if they span several)."""
+    desk_ids = list(desk_ids)
+    sites = {
+        row["site_id"]
+        for row in conn.execute(
+            f"SELECT DISTINCT site_id FROM desks WHERE id IN ({','.join('?' * len(desk_ids))})",
+            desk_ids,
+        )
+    }
+    if len(sites) != 1:
+        raise ValueError("Desks must all belong to one site.")
+    return sites.pop()
+
+
+def fan_out(fn, *args, site_ids=None, connect=get_site_conn, with_site_id=False) -> dict:
+    """
+    Run `fn(conn, *args)` against every site (or just `site_ids`) on
+    parallel threads, one connection each, and return {site_id: result}.
+    With `with_site_id`, fn is called as fn(conn, site_id, *args).
+    SQLite releases the GIL while a query runs, so the sites are read
+    concurrently; merging the results is up to the caller.
+    """
+    site_ids = list(site_ids or all_site_ids())
+
+    def run(site_id):
+        conn = connect(site_id)
+        try:
+            return fn(conn, site_id, *args) if with_site_id else fn(conn, *args)
+        finally:
+            conn.close()
+
+    if len(site_ids) == 1:
+        return {site_ids[0]: run(site_ids[0])}
+    with ThreadPoolExecutor(max_workers=min(len(site_ids), FAN_OUT_WORKERS)) as pool:
+        return dict(zip(site_ids, pool.map(run, site_ids)))
+
+
+@functools.cache
+def _site_of_file(path: str) -> int:
+    resolved = Path(path).resolve()
+    for site_id in all_site_ids():
+        if site_db_path(site_id).resolve() == resolved:
+            return site_id
+    raise ValueError(f"{path} is not a site database")
+
+
+def site_of_conn(conn: sqlite3.Connection) -> int:
+    """The site whose bookings `conn` holds (its main database)."""
+    return _site_of_file(next(row["file"] for row in conn.execute("PRAGMA database_list") if row["name"] == "main"))
+
+
+def other_site_ids(conn: sqlite3.Connection) -> list[int]:
+    """Every site except the one whose bookings `conn` holds."""
+    here = site_of_conn(conn)
+    return [site_id for site_id in all_site_ids() if site_id != here]
+
+
 # ---------------------------------------------------
 # BACKUP HANDLING
 # ---------------------------------------------------
 def _load_desks_backup() -> list[dict]:
-    if not DESK_BACKUP_PATH.exists():
+    backup_path = get_desk_backup_path()
+    if not backup_path.exists():
         return []
 
     try:
-        return json.loads(DESK_BACKUP_PATH.read_text(encoding="utf-8"))
+        return json.loads(backup_path.read_text(encoding="utf-8"))
     except json.JSONDecodeError:
         return []
 
@@ -84,7 +239,7 @@ def write_desks_backup() -> None:
     conn = get_conn()
     desks = conn.execute(
         """
-        SELECT name, location, is_active, admin_only
+        SELECT name, location, is_active, admin_only, floor, zone, pos_x, pos_y
         FROM desks
         ORDER BY id
         """
@@ -97,23 +252,192 @@ def write_desks_backup() -> None:
             "location": row["location"],
             "is_active": row["is_active"],
             "admin_only": row["admin_only"],
+            "floor": row["floor"],
+            "zone": row["zone"],
+            "pos_x": row["pos_x"],
+            "pos_y": row["pos_y"],
         }
         for row in desks
     ]
 
-    DESK_BACKUP_PATH.write_text(
+    get_desk_backup_path().write_text(
         json.dumps(backup_data, indent=2),
         encoding="utf-8",
     )
 
 
+# ---------------------------------------------------
+# DATA VERSIONS
+# ---------------------------------------------------
+def get_version(scope: str, conn: sqlite3.Connection | None = None) -> int:
+    """
+    Return the change counter for a data scope (e.g. "desks").
+    Counters are bumped by triggers, so they are safe cache keys.
+    Pass `conn` to read the counter from another database (e.g. a snapshot).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_conn()
+
+    row = conn.execute(
+        "SELECT version FROM data_versions WHERE scope = ?",
+        (scope,),
+    ).fetchone()
+
+    if own_conn:
+        conn.close()
+    return row["version"] if row else 0
+
+
 # ---------------------------------------------------
 # DATABASE INITIALISATION
 # ---------------------------------------------------
+def _ensure_column(c: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """Add a column if missing; returns True when it was added."""
+    columns = {row["name"] for row in c.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
+
+def _bookings_table_sql(table: str, live: bool, foreign_keys: bool = True) -> str:
+    """
+    bookings and bookings_archive share a layout: `day` is days since
+    1970-01-01 and start/end are minutes since midnight. The old TEXT
+    columns survive as generated columns for display and exports.
+    Site databases skip the foreign keys: users and desks live in the
+    catalogue, and SQLite cannot reference another database.
+    """
+    id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT" if live else "id INTEGER PRIMARY KEY"
+    foreign_keys = (
+        """,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (desk_id) REFERENCES desks(id)"""
+        if live and foreign_keys
+        else ""
+    )
+
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {id_column},
+            user_id INTEGER NOT NULL,
+            desk_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            start_min INTEGER NOT NULL,
+            end_min INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            checked_in INTEGER DEFAULT 0,
+            date TEXT GENERATED ALWAYS AS (date(day * 86400, 'unixepoch')) VIRTUAL,
+            start_time TEXT GENERATED ALWAYS AS (printf('%02d:%02d', start_min / 60, start_min % 60)) VIRTUAL,
+            end_time TEXT GENERATED ALWAYS AS (printf('%02d:%02d', end_min / 60, end_min % 60)) VIRTUAL{foreign_keys}
+        )
+    """
+
+
+def _migrate_booking_times(conn: sqlite3.Connection, table: str, live: bool, foreign_keys: bool = True) -> None:
+    """Rebuild a TEXT date/time bookings table into the integer layout."""
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+    if "day" in columns:
+        return
+
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN")
+        conn.execute(_bookings_table_sql(f"{table}_migrating", live, foreign_keys))
+        conn.execute(
+            f"""
+            INSERT INTO {table}_migrating
+            (id, user_id, desk_id, day, start_min, end_min, status, checked_in)
+            SELECT
+                id, user_id, desk_id,
+                CAST(julianday(date) - 2440587.5 AS INTEGER),
+                CAST(substr(start_time, 1, 2) AS INTEGER) * 60
+                    + CAST(substr(start_time, 4, 2) AS INTEGER),
+                CAST(substr(end_time, 1, 2) AS INTEGER) * 60
+                    + CAST(substr(end_time, 4, 2) AS INTEGER),
+                status, checked_in
+            FROM {table}
+            """
+        )
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_migrating RENAME TO {table}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+
+# Free-text audit details written before events were structured
+_AUDIT_BOOKING_RE = re.compile(r"\bbooking(?:_id)?=(\d+)")
+_AUDIT_DESK_RE = re.compile(r"\bdesk '([^']*)'")
+_AUDIT_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_AUDIT_PAIR_RE = re.compile(r"\b(\w+)=(\d+)\b")
+
+
+def _backfill_audit_entities(conn: sqlite3.Connection) -> None:
+    """
+    Derive actor_id, entity_type, entity_id and payload for audit rows
+    written as free text ("booking_id=12, desk_id=3", "Promoted x@y to
+    admin", "Disabled desk 'Desk 4'"). Rows that match nothing keep NULLs.
+    """
+    users = {row["email"]: row["id"] for row in conn.execute("SELECT id, email FROM users")}
+    desks = {row["name"]: row["id"] for row in conn.execute("SELECT id, name FROM desks")}
+
+    updates = []
+    for row in conn.execute("SELECT id, details FROM audit_log WHERE entity_type IS NULL"):
+        details = row["details"] or ""
+        payload = {key: int(value) for key, value in _AUDIT_PAIR_RE.findall(details)}
+
+        if match := _AUDIT_BOOKING_RE.search(details):
+            payload.pop("booking", None)
+            payload.pop("booking_id", None)
+            entity = ("booking", int(match.group(1)))
+        elif match := _AUDIT_DESK_RE.search(details):
+            payload["name"] = match.group(1)
+            entity = ("desk", desks.get(match.group(1)))
+        elif match := _AUDIT_EMAIL_RE.search(details):
+            payload["email"] = match.group(0).lower()
+            entity = ("user", users.get(payload["email"]))
+        elif payload:
+            entity = (None, None)
+        else:
+            continue
+
+        updates.append((*entity, json.dumps(payload) if payload else None, row["id"]))
+
+    conn.executemany(
+        "UPDATE audit_log SET entity_type = ?, entity_id = ?, payload = ? WHERE id = ?",
+        updates,
+    )
+    conn.execute(
+        """
+        UPDATE audit_log
+        SET actor_id = (SELECT id FROM users WHERE users.email = audit_log.email)
+        WHERE actor_id IS NULL AND email IS NOT NULL
+        """
+    )
+
+
+def _references(foreign_keys: bool, **columns) -> str:
+    """Trailing FOREIGN KEY clauses for a CREATE TABLE, or nothing for a site database."""
+    if not foreign_keys:
+        return ""
+    return "".join(
+        f",\n            FOREIGN KEY ({column}) REFERENCES {table}(id)" for column, table in columns.items()
+    )
+
+
 def init_db() -> None:
     conn = get_conn()
     c = conn.cursor()
 
+    # WAL lets report snapshots and other readers run alongside writers
+    c.execute("PRAGMA journal_mode = WAL")
+
     # USERS
     c.execute(
         """
@@ -128,6 +452,20 @@ def init_db() -> None:
         """
     )
 
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_name
+        ON users (lower(name))
+        """
+    )
+    # Case-insensitive email search and paging (the UNIQUE index is BINARY)
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_users_email
+        ON users (email COLLATE NOCASE, id)
+        """
+    )
+
     # DESKS
     c.execute(
         """
@@ -141,25 +479,291 @@ def init_db() -> None:
         """
     )
 
+    # Desk names are the natural key for backups and CSV upserts.
+    # Older databases may hold duplicates; those keep working without it.
+    try:
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_desks_name ON desks (name)")
+    except sqlite3.IntegrityError:
+        pass
+
+    # DESK LAYOUT (floor plan grid coordinates)
+    _ensure_column(c, "desks", "floor", "INTEGER DEFAULT 1")
+    _ensure_column(c, "desks", "zone", "TEXT")
+    _ensure_column(c, "desks", "pos_x", "INTEGER")
+    _ensure_column(c, "desks", "pos_y", "INTEGER")
+
+    # SITES (each site's bookings live in their own database file)
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sites (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            db_file TEXT
+        )
+        """
+    )
+    c.execute("INSERT OR IGNORE INTO sites (id, name) VALUES (?, 'Main office')", (PRIMARY_SITE_ID,))
+    if _ensure_column(c, "desks", "site_id", f"INTEGER NOT NULL DEFAULT {PRIMARY_SITE_ID}"):
+        # Recreated below so that moving a desk bumps the desks version
+        c.execute("DROP TRIGGER IF EXISTS desks_version_update")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_desks_site ON desks (site_id, is_active)")
+
+    # NULL limits are unlimited; admins set them from the Admin Panel
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS role_quotas (
+            role TEXT PRIMARY KEY,
+            days_per_week INTEGER,
+            minutes_per_day INTEGER,
+            advance_days INTEGER
+        )
+        """
+    )
+    c.execute("INSERT OR IGNORE INTO role_quotas (role) VALUES ('user'), ('admin')")
+
+    # Admin actions are audited here; bookings and their counters live in
+    # each site's file
+    _init_audit_log(conn)
+    _init_data_versions(conn)
+    _split_primary_site(conn)
+
+    c.execute("INSERT OR IGNORE INTO data_versions (scope, version) VALUES ('desks', 0)")
+
+    for event, condition in (
+        ("INSERT", ""),
+        ("DELETE", ""),
+        (
+            "UPDATE",
+            """
+            WHEN OLD.name IS NOT NEW.name
+              OR OLD.location IS NOT NEW.location
+              OR OLD.is_active IS NOT NEW.is_active
+              OR OLD.admin_only IS NOT NEW.admin_only
+              OR OLD.floor IS NOT NEW.floor
+              OR OLD.zone IS NOT NEW.zone
+              OR OLD.pos_x IS NOT NEW.pos_x
+              OR OLD.pos_y IS NOT NEW.pos_y
+              OR OLD.site_id IS NOT NEW.site_id
+            """,
+        ),
+    ):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS desks_version_{event.lower()}
+            AFTER {event} ON desks
+            {condition}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE scope = 'desks';
+            END
+            """
+        )
+
+    conn.commit()
+    conn.close()
+
+
+def _init_booking_store(conn: sqlite3.Connection, foreign_keys: bool = True) -> None:
+    """
+    Tables for one site's bookings: the bookings themselves, their
+    archive, waitlist, outbox, audit log, data versions and usage
+    counters, with the triggers that maintain them, in the site's own
+    file.
+    """
+    c = conn.cursor()
+
     # BOOKINGS (CRITICAL)
+    # Stored as day number / minute of day; text columns are generated
+    c.execute(_bookings_table_sql("bookings", live=True, foreign_keys=foreign_keys))
+    _migrate_booking_times(conn, "bookings", live=True, foreign_keys=foreign_keys)
+
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_bookings_day_status
+        ON bookings (day, status, desk_id, start_min, end_min)
+        """
+    )
     c.execute(
         """
-        CREATE TABLE IF NOT EXISTS bookings (
+        CREATE INDEX IF NOT EXISTS idx_bookings_user_day
+        ON bookings (user_id, day, start_min)
+        """
+    )
+
+    # BOOKINGS ARCHIVE (history moved out of the live table)
+    c.execute(_bookings_table_sql("bookings_archive", live=False))
+    _migrate_booking_times(conn, "bookings_archive", live=False)
+
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_bookings_archive_day
+        ON bookings_archive (day)
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_bookings_archive_user_day
+        ON bookings_archive (user_id, day)
+        """
+    )
+
+    # WAITLIST (queued requests for a day and time range; desk_id NULL = any desk)
+    c.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS waitlist (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
-            desk_id INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            start_time TEXT NOT NULL,
-            end_time TEXT NOT NULL,
-            status TEXT NOT NULL,
-            checked_in INTEGER DEFAULT 0,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (desk_id) REFERENCES desks(id)
+            desk_id INTEGER,
+            day INTEGER NOT NULL,
+            start_min INTEGER NOT NULL,
+            end_min INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'waiting',
+            booking_id INTEGER,
+            created_at TEXT NOT NULL{_references(foreign_keys, user_id="users", desk_id="desks")}
         )
         """
     )
 
-    # AUDIT LOG
+    # The allocator looks up waiting requests overlapping a freed interval;
+    # only waiting rows are indexed, so served requests cost nothing.
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_waitlist_waiting
+        ON waitlist (day, start_min, end_min, desk_id)
+        WHERE status = 'waiting'
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_waitlist_user_day
+        ON waitlist (user_id, day)
+        """
+    )
+
+    # NOTIFICATION OUTBOX (written in the same transaction as the change it
+    # reports; delivered later, off the request path)
+    c.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            booking_id INTEGER,
+            payload TEXT,
+            created_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            sent_at TEXT{_references(foreign_keys, user_id="users")}
+        )
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_pending
+        ON notification_outbox (channel, user_id, id)
+        WHERE status = 'pending'
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_booking
+        ON notification_outbox (booking_id, kind)
+        """
+    )
+    # Calendar updates used to be queued with nothing to deliver them
+    c.execute("DELETE FROM notification_outbox WHERE channel = 'calendar' AND status = 'pending'")
+
+    _init_audit_log(conn)
+    _init_data_versions(conn)
+    c.execute("INSERT OR IGNORE INTO data_versions (scope, version) VALUES ('bookings', 0)")
+
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS bookings_version_{event.lower()}
+            AFTER {event} ON bookings
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE scope = 'bookings';
+            END
+            """
+        )
+
+    # Per-day counters ('bookings_day:<day>') let the booking grid detect a
+    # stale view without re-querying the day's bookings.
+    bump_day = """
+        INSERT INTO data_versions (scope, version)
+        VALUES ('bookings_day:' || {row}.day, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1;
+    """
+    for event, condition, body in (
+        ("INSERT", "", bump_day.format(row="NEW")),
+        ("DELETE", "", bump_day.format(row="OLD")),
+        (
+            "UPDATE",
+            """
+            WHEN OLD.status IS NOT NEW.status
+              OR OLD.desk_id IS NOT NEW.desk_id
+              OR OLD.day IS NOT NEW.day
+              OR OLD.start_min IS NOT NEW.start_min
+              OR OLD.end_min IS NOT NEW.end_min
+            """,
+            bump_day.format(row="OLD") + bump_day.format(row="NEW"),
+        ),
+    ):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS bookings_day_version_{event.lower()}
+            AFTER {event} ON bookings
+            {condition}
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+    # Per-user counters ('bookings_user:<user_id>') key each user's cached
+    # dashboard summary, so one person's booking leaves the others' cached.
+    bump_user = """
+        INSERT INTO data_versions (scope, version)
+        VALUES ('bookings_user:' || {row}.user_id, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1;
+    """
+    for event, condition, body in (
+        ("INSERT", "", bump_user.format(row="NEW")),
+        ("DELETE", "", bump_user.format(row="OLD")),
+        (
+            "UPDATE",
+            """
+            WHEN OLD.status IS NOT NEW.status
+              OR OLD.user_id IS NOT NEW.user_id
+              OR OLD.desk_id IS NOT NEW.desk_id
+              OR OLD.day IS NOT NEW.day
+              OR OLD.start_min IS NOT NEW.start_min
+              OR OLD.end_min IS NOT NEW.end_min
+              OR OLD.checked_in IS NOT NEW.checked_in
+            """,
+            bump_user.format(row="OLD") + bump_user.format(row="NEW"),
+        ),
+    ):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS bookings_user_version_{event.lower()}
+            AFTER {event} ON bookings
+            {condition}
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+    _init_quota_tables(conn)
+
+
+def _init_audit_log(conn: sqlite3.Connection) -> None:
+    """The audit log: the catalogue's for admin actions, each site's for its bookings."""
+    c = conn.cursor()
+
     c.execute(
         """
         CREATE TABLE IF NOT EXISTS audit_log (
@@ -171,11 +775,175 @@ def init_db() -> None:
         )
         """
     )
+    _ensure_column(c, "audit_log", "actor_id", "INTEGER")
+    _ensure_column(c, "audit_log", "payload", "TEXT")
+    _ensure_column(c, "audit_log", "entity_id", "INTEGER")
+    if _ensure_column(c, "audit_log", "entity_type", "TEXT"):
+        _backfill_audit_entities(conn)
 
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_audit_entity
+        ON audit_log (entity_type, entity_id, timestamp)
+        """
+    )
+    c.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_audit_actor
+        ON audit_log (actor_id, timestamp)
+        """
+    )
+
+
+def _init_data_versions(conn: sqlite3.Connection) -> None:
+    c = conn.cursor()
+
+    # DATA VERSIONS (cache invalidation counters)
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            scope TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+
+# What the catalogue held for the primary site before it had its own file
+_PRIMARY_SITE_TABLES = ("bookings", "bookings_archive", "waitlist", "notification_outbox", "user_day_usage")
+
+
+def _split_primary_site(conn: sqlite3.Connection) -> None:
+    """
+    Give the primary site its own bookings file, like every other site.
+    Catalogues from before then hold its bookings themselves: those rows
+    are copied over with INSERT OR IGNORE, so a copy cut short is simply
+    redone, and the catalogue only drops its tables and points the site
+    at the new file once the copy has committed. The new file's triggers
+    rebuild the usage counters and day versions as the rows go in; the
+    old audit entries stay in the catalogue's log.
+    """
+    if conn.execute("SELECT db_file FROM sites WHERE id = ?", (PRIMARY_SITE_ID,)).fetchone()["db_file"]:
+        return
+
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings'"
+    ).fetchone() is not None
+    if legacy:
+        # Bring the old tables to the current layout before copying them
+        _init_booking_store(conn)
+    conn.commit()
+
+    site = _connect(get_db_path().with_name(site_file_name(PRIMARY_SITE_ID)))
+    try:
+        site.execute("PRAGMA journal_mode = WAL")
+        site.execute("ATTACH DATABASE ? AS catalogue", (catalogue_uri(),))
+        _init_booking_store(site, foreign_keys=False)
+        if legacy:
+            for table in _PRIMARY_SITE_TABLES[:-1]:
+                columns = ", ".join(row["name"] for row in site.execute(f"PRAGMA main.table_info({table})"))
+                site.execute(
+                    f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM catalogue.{table}"
+                )
+        site.commit()
+    finally:
+        site.close()
+
+    for table in _PRIMARY_SITE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute("DELETE FROM data_versions WHERE scope LIKE 'bookings%'")
+    conn.execute(
+        "UPDATE sites SET db_file = ? WHERE id = ?", (site_file_name(PRIMARY_SITE_ID), PRIMARY_SITE_ID)
+    )
+    conn.commit()
+    site_db_path.cache_clear()
+    _site_of_file.cache_clear()
+
+
+def init_site_store(site_id: int) -> None:
+    """Create or migrate a site's own bookings database."""
+    conn = get_site_conn(site_id)
+    conn.execute("PRAGMA journal_mode = WAL")
+    _init_booking_store(conn, foreign_keys=False)
     conn.commit()
     conn.close()
 
 
+def _init_quota_tables(conn: sqlite3.Connection) -> None:
+    """
+    Booked minutes per user and day, kept by triggers, so a booking reads
+    at most a week of rows per site instead of counting the user's
+    bookings (the per-role limits are in role_quotas, in the catalogue).
+    """
+    c = conn.cursor()
+
+    new_counters = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_day_usage'"
+    ).fetchone() is None
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_day_usage (
+            user_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Booked minutes per user and day, from the bookings that hold a desk
+    add_minutes = """
+        INSERT INTO user_day_usage (user_id, day, minutes)
+        SELECT {row}.user_id, {row}.day, {sign}({row}.end_min - {row}.start_min)
+        WHERE {row}.status = 'booked'
+        ON CONFLICT (user_id, day) DO UPDATE SET minutes = minutes + excluded.minutes;
+    """
+    for event, condition, body in (
+        ("INSERT", "", add_minutes.format(row="NEW", sign="")),
+        ("DELETE", "", add_minutes.format(row="OLD", sign="-")),
+        (
+            "UPDATE",
+            """
+            WHEN OLD.status IS NOT NEW.status
+              OR OLD.user_id IS NOT NEW.user_id
+              OR OLD.day IS NOT NEW.day
+              OR OLD.start_min IS NOT NEW.start_min
+              OR OLD.end_min IS NOT NEW.end_min
+            """,
+            add_minutes.format(row="OLD", sign="-") + add_minutes.format(row="NEW", sign=""),
+        ),
+    ):
+        c.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS bookings_usage_{event.lower()}
+            AFTER {event} ON bookings
+            {condition}
+            BEGIN
+                {body}
+            END
+            """
+        )
+
+    # Days per week are counted from the day rows at every site (a day
+    # booked at two sites is one day), which per-site week counters cannot
+    # do; older databases drop them
+    c.execute("DROP TRIGGER IF EXISTS user_day_usage_insert")
+    c.execute("DROP TRIGGER IF EXISTS user_day_usage_update")
+    c.execute("DROP TABLE IF EXISTS user_week_usage")
+
+    if new_counters:
+        c.execute(
+            """
+            INSERT INTO user_day_usage (user_id, day, minutes)
+            SELECT user_id, day, SUM(end_min - start_min)
+            FROM bookings
+            WHERE status = 'booked'
+            GROUP BY user_id, day
+            """
+        )
+
+
 # ---------------------------------------------------
 # SEED DEFAULT DESKS
 # ---------------------------------------------------
@@ -192,6 +960,13 @@ def seed_desks() -> None:
         for i in range(13, 16)
     ]
 
+    # Default layout: 3 rows of 5 desks on the ground floor
+    for i, desk in enumerate(default_desks):
+        desk["floor"] = 1
+        desk["zone"] = desk["location"]
+        desk["pos_x"] = i % 5
+        desk["pos_y"] = i // 5
+
     conn = get_conn()
     c = conn.cursor()
 
@@ -214,24 +989,33 @@ def seed_desks() -> None:
             location = desk.get("location")
             is_active = desk.get("is_active", 1)
             admin_only = desk.get("admin_only", 0)
+            layout = (
+                desk.get("floor", 1),
+                desk.get("zone"),
+                desk.get("pos_x"),
+                desk.get("pos_y"),
+            )
             existing_id = existing_by_name.get(name)
 
             if existing_id is None:
                 c.execute(
                     """
-                    INSERT INTO desks (name, location, is_active, admin_only)
-                    VALUES (?, ?, ?, ?)
+                    INSERT INTO desks
+                    (name, location, is_active, admin_only, floor, zone, pos_x, pos_y)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (name, location, is_active, admin_only),
+                    (name, location, is_active, admin_only, *layout),
                 )
+                existing_by_name[name] = c.lastrowid
             else:
                 c.execute(
                     """
                     UPDATE desks
-                    SET location = ?, is_active = ?, admin_only = ?
+                    SET location = ?, is_active = ?, admin_only = ?,
+                        floor = ?, zone = ?, pos_x = ?, pos_y = ?
                     WHERE id = ?
                     """,
-                    (location, is_active, admin_only, existing_id),
+                    (location, is_active, admin_only, *layout, existing_id),
                 )
 
         conn.commit()
@@ -241,26 +1025,33 @@ def seed_desks() -> None:
         location = desk["location"]
         admin_only = desk["admin_only"]
         is_active = 1
+        layout = (desk["floor"], desk["zone"], desk["pos_x"], desk["pos_y"])
         existing_id = existing_by_name.get(name)
 
         if existing_id is None:
             c.execute(
                 """
-                INSERT INTO desks (name, location, is_active, admin_only)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO desks
+                (name, location, is_active, admin_only, floor, zone, pos_x, pos_y)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (name, location, is_active, admin_only),
+                (name, location, is_active, admin_only, *layout),
             )
             existing_by_name[name] = c.lastrowid
             changed = True
         else:
+            # Keep any layout set by an admin; only fill in missing positions
             c.execute(
                 """
                 UPDATE desks
-                SET location = ?, is_active = ?, admin_only = ?
+                SET location = ?, is_active = ?, admin_only = ?,
+                    floor = COALESCE(floor, ?),
+                    zone = COALESCE(zone, ?),
+                    pos_x = COALESCE(pos_x, ?),
+                    pos_y = COALESCE(pos_y, ?)
                 WHERE id = ?
                 """,
-                (location, is_active, admin_only, existing_id),
+                (location, is_active, admin_only, *layout, existing_id),
             )
             changed = True
 
@@ -276,6 +1067,26 @@ def seed_desks() -> None:
     conn.close()
 
 
+_db_ready = False
+
+
 def ensure_db() -> None:
+    """Create/migrate the schema and seed desks once per process."""
+    global _db_ready
+    if _db_ready:
+        return
+
+    started = time.perf_counter()
     init_db()
     seed_desks()
+    for site in list_sites():
+        init_site_store(site["id"])
+    _db_ready = True
+
+    if metrics.ENABLED:
+        metrics.ENSURE_DB_SECONDS.set(time.perf_counter() - started)
+        metrics.start_metrics_server()
+
+    from utils.notifications import start_notification_worker
+
+    start_notification_worker()
@@ -0,0 +1,153 @@
+from html import escape
+
+import streamlit as st
+
+from utils import metrics
+from utils.db import PRIMARY_SITE_ID, get_conn, get_site_conn
+
+# Grid cell size in SVG units; desk coordinates are grid positions
+CELL_W = 110
+CELL_H = 70
+DESK_W = 96
+DESK_H = 54
+MARGIN = 20
+AUTO_COLUMNS = 10
+
+FREE_COLOUR = "#ffffff"
+BOOKED_COLOUR = "#c0392b"
+ADMIN_ONLY_COLOUR = "#fdf2d0"
+INACTIVE_COLOUR = "#d5d5d5"
+
+
+# ---------------------------------------------------
+# DESK CATALOGUE
+# ---------------------------------------------------
+def _load_layout(site_id: int) -> list[dict]:
+    conn = get_conn()
+    rows = conn.execute(
+        """
+        SELECT id, name, floor, zone, pos_x, pos_y, is_active, admin_only
+        FROM desks
+        WHERE site_id = ?
+        ORDER BY floor, id
+        """,
+        (site_id,),
+    ).fetchall()
+    conn.close()
+
+    return place_desks([dict(row) for row in rows])
+
+
+def place_desks(desks: list[dict]) -> list[dict]:
+    """
+    Fill in floor and grid position for desks an admin has not laid out:
+    they go in rows of AUTO_COLUMNS after the laid-out ones on their floor.
+    Updates and returns the given desk dicts.
+    """
+    by_floor: dict[int, list[dict]] = {}
+    for desk in desks:
+        desk["floor"] = desk["floor"] or 1
+        by_floor.setdefault(desk["floor"], []).append(desk)
+
+    for floor_desks in by_floor.values():
+        placed = [d for d in floor_desks if d["pos_x"] is not None and d["pos_y"] is not None]
+        next_row = max((d["pos_y"] for d in placed), default=-1) + 1
+        unplaced = [d for d in floor_desks if d["pos_x"] is None or d["pos_y"] is None]
+        for i, desk in enumerate(unplaced):
+            desk["pos_x"] = i % AUTO_COLUMNS
+            desk["pos_y"] = next_row + i // AUTO_COLUMNS
+
+    return desks
+
+
+def _render_floor(desks: list[dict]) -> str:
+    width = (max(d["pos_x"] for d in desks) + 1) * CELL_W + 2 * MARGIN
+    height = (max(d["pos_y"] for d in desks) + 1) * CELL_H + 2 * MARGIN
+
+    parts = [
+        f'<svg class="floorplan" viewBox="0 0 {width} {height}" '
+        f'width="100%" style="max-width:{width}px" '
+        'xmlns="http://www.w3.org/2000/svg" font-family="Lato, sans-serif">'
+    ]
+
+    for desk in desks:
+        x = MARGIN + desk["pos_x"] * CELL_W
+        y = MARGIN + desk["pos_y"] * CELL_H
+        name = escape(desk["name"])
+        zone = escape(desk["zone"] or "")
+
+        if not desk["is_active"]:
+            fill = INACTIVE_COLOUR
+        elif desk["admin_only"]:
+            fill = ADMIN_ONLY_COLOUR
+        else:
+            fill = FREE_COLOUR
+
+        rect = (
+            f'<rect x="{x}" y="{y}" width="{DESK_W}" height="{DESK_H}" rx="8" '
+            f'fill="{fill}" stroke="#666"/>'
+            f'<text x="{x + DESK_W / 2}" y="{y + 24}" text-anchor="middle" '
+            f'font-size="13" font-weight="600">{name}</text>'
+            f'<text x="{x + DESK_W / 2}" y="{y + 42}" text-anchor="middle" '
+            f'font-size="11" fill="#555">{zone}</text>'
+        )
+
+        title = name if desk["is_active"] else f"{name} (inactive)"
+        parts.append(f'<g id="fp-desk-{desk["id"]}"><title>{title}</title>{rect}</g>')
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+@metrics.cache_data("floor_plans", show_spinner=False, max_entries=4)
+def load_floor_plans(desks_version: int, site_id: int = PRIMARY_SITE_ID) -> dict[int, dict]:
+    """
+    Build the static SVG for every floor of a site.
+    Keyed on the desks data version so edits invalidate it.
+    """
+    desks = _load_layout(site_id)
+
+    floors: dict[int, list[dict]] = {}
+    for desk in desks:
+        floors.setdefault(desk["floor"], []).append(desk)
+
+    return {
+        floor: {
+            "svg": _render_floor(floor_desks),
+            "desk_ids": [d["id"] for d in floor_desks if d["is_active"]],
+            "desk_names": {d["id"]: d["name"] for d in floor_desks if d["is_active"]},
+        }
+        for floor, floor_desks in sorted(floors.items())
+    }
+
+
+# ---------------------------------------------------
+# OCCUPANCY OVERLAY
+# ---------------------------------------------------
+def load_occupancy(day: int, minute: int, site_id: int = PRIMARY_SITE_ID) -> set[int]:
+    """Desk ids at a site with a live booking covering the given moment, in one query."""
+    conn = get_site_conn(site_id)
+    rows = conn.execute(
+        """
+        SELECT desk_id
+        FROM bookings
+        WHERE day = ?
+          AND status = 'booked'
+          AND start_min <= ?
+          AND end_min > ?
+        GROUP BY desk_id
+        """,
+        (day, minute, minute),
+    ).fetchall()
+    conn.close()
+    return {row["desk_id"] for row in rows}
+
+
+def overlay_css(occupied: set[int]) -> str:
+    rules = []
+
+    if occupied:
+        selectors = ",".join(f"#fp-desk-{desk_id} rect" for desk_id in sorted(occupied))
+        rules.append(f"{selectors}{{fill:{BOOKED_COLOUR};}}")
+
+    return "<style>" + "".join(rules) + "</style>"
@@ -0,0 +1,275 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+# Opt-in: set DESK_BOOKING_METRICS_PORT to expose /metrics from each process
+METRICS_PORT = os.getenv("DESK_BOOKING_METRICS_PORT")
+METRICS_ADDR = os.getenv("DESK_BOOKING_METRICS_ADDR", "127.0.0.1")
+ENABLED = bool(METRICS_PORT)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------
+# METRIC TYPES
+# ---------------------------------------------------
+def _format_labels(labelnames, labelvalues, extra=()) -> str:
+    pairs = [*zip(labelnames, labelvalues), *extra]
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in values
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labelvalues) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class CallbackMetric(_Metric):
+    """Value read at scrape time, e.g. file sizes or counters kept elsewhere."""
+
+    def __init__(self, name: str, help_text: str, kind: str, fn):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.fn = fn
+
+    def collect(self) -> list[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            logger.exception("metric callback %s failed", self.name)
+            return []
+        return self._header() + [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+
+        lines = self._header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, [("le", bound)])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {total}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+# ---------------------------------------------------
+# REGISTRY
+# ---------------------------------------------------
+_registry: list[_Metric] = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+DB_CONNECTIONS = _register(
+    Counter("desk_booking_db_connections_total", "SQLite connections opened by get_conn.")
+)
+ENSURE_DB_SECONDS = _register(
+    Gauge("desk_booking_ensure_db_seconds", "Time spent creating/migrating the schema at start-up.")
+)
+BOOKING_REQUESTS = _register(
+    Counter("desk_booking_booking_requests_total", "Booking confirmations by outcome.", ["outcome"])
+)
+BOOKINGS_CREATED = _register(
+    Counter("desk_booking_bookings_created_total", "Bookings inserted (one per desk interval).")
+)
+BOOKINGS_CANCELLED = _register(
+    Counter("desk_booking_bookings_cancelled_total", "Bookings cancelled, by their owner or in bulk.")
+)
+CONFIRM_SECONDS = _register(
+    Histogram("desk_booking_confirm_seconds", "Booking confirmation latency, including the writer queue.")
+)
+AUDIT_EVENTS = _register(
+    Counter("desk_booking_audit_events_total", "Audit log entries written.", ["action"])
+)
+NOTIFICATIONS_SENT = _register(
+    Counter("desk_booking_notifications_total", "Email digests by delivery outcome.", ["outcome"])
+)
+CACHE_REQUESTS = _register(
+    Counter("desk_booking_cache_requests_total", "Calls to a cached loader.", ["cache"])
+)
+CACHE_MISSES = _register(
+    Counter("desk_booking_cache_misses_total", "Cached loader calls that ran the loader.", ["cache"])
+)
+
+
+def _db_size_bytes() -> int:
+    from utils.db import get_db_path
+
+    db_path = get_db_path()
+    return sum(
+        path.stat().st_size
+        for path in (db_path, db_path.with_name(db_path.name + "-wal"))
+        if path.exists()
+    )
+
+
+def _writer_stat(key: str):
+    def read():
+        from utils import writer
+
+        return sum(coordinator.stats[key] for coordinator in list(writer._writers.values()))
+
+    return read
+
+
+_register(CallbackMetric("desk_booking_db_size_bytes", "Database plus WAL file size.", "gauge", _db_size_bytes))
+_register(CallbackMetric("desk_booking_writer_jobs_total", "Jobs committed by the writer threads (all sites).", "counter", _writer_stat("jobs")))
+_register(CallbackMetric("desk_booking_writer_groups_total", "Group commits by the writer threads (all sites).", "counter", _writer_stat("groups")))
+_register(CallbackMetric("desk_booking_writer_lock_retries_total", "Writer groups retried after a lock error.", "counter", _writer_stat("lock_retries")))
+_register(CallbackMetric("desk_booking_writer_lock_failures_total", "Writer groups that gave up on a lock error.", "counter", _writer_stat("lock_failures")))
+
+
+# ---------------------------------------------------
+# INSTRUMENTATION HELPERS
+# ---------------------------------------------------
+def cache_data(name: str, **cache_kwargs):
+    """
+    `st.cache_data` that also counts requests and misses, so the hit rate
+    is 1 - misses / requests. Plain `st.cache_data` when metrics are off.
+    """
+
+    def decorator(fn):
+        if not ENABLED:
+            return st.cache_data(**cache_kwargs)(fn)
+
+        @functools.wraps(fn)
+        def load(*args, **kwargs):
+            CACHE_MISSES.inc(name)
+            return fn(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(load)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            CACHE_REQUESTS.inc(name)
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+
+    return decorator
+
+
+# ---------------------------------------------------
+# SIDECAR HTTP SERVER
+# ---------------------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server() -> None:
+    """Serve /metrics on a daemon thread, once per process, when enabled."""
+    global _server
+    if not ENABLED or _server is not None:
+        return
+
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer((METRICS_ADDR, int(METRICS_PORT)), _MetricsHandler)
+        except OSError as exc:
+            logger.warning("metrics server not started on %s:%s: %s", METRICS_ADDR, METRICS_PORT, exc)
+            return
+
+        _server.daemon_threads = True
+        threading.Thread(
+            target=_server.serve_forever,
+            name="desk-booking-metrics",
+            daemon=True,
+        ).start()
@@ -0,0 +1,431 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from itertools import chain, groupby
+
+from utils import metrics
+from utils.dates import day_number, from_day_number, hhmm, uk_date
+from utils.db import all_site_ids, fan_out
+from utils.outbox import EMAIL
+from utils.writer import run_site_write
+
+# Opt-in: set DESK_BOOKING_SMTP_HOST to deliver email digests
+SMTP_HOST = os.getenv("DESK_BOOKING_SMTP_HOST")
+SMTP_PORT = int(os.getenv("DESK_BOOKING_SMTP_PORT", "25"))
+SMTP_USER = os.getenv("DESK_BOOKING_SMTP_USER")
+SMTP_PASSWORD = os.getenv("DESK_BOOKING_SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("DESK_BOOKING_SMTP_STARTTLS") == "1"
+MAIL_FROM = os.getenv("DESK_BOOKING_MAIL_FROM", "desk-booking@localhost")
+ENABLED = bool(SMTP_HOST)
+
+SEND_RATE_PER_SECOND = float(os.getenv("DESK_BOOKING_SMTP_RATE", "5"))
+SEND_RETRIES = 3
+RETRY_BASE_DELAY_SECONDS = 0.5
+MAX_ATTEMPTS = 5
+DIGEST_USERS_PER_RUN = 500
+DELIVERY_FLUSH_EVERY = 50
+WORKER_INTERVAL_SECONDS = int(os.getenv("DESK_BOOKING_NOTIFY_INTERVAL", "60"))
+REMINDER_HOUR = int(os.getenv("DESK_BOOKING_REMINDER_HOUR", "16"))
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------
+# QUEUEING (write jobs; run on the writer thread)
+# ---------------------------------------------------
+def queue_reminders(conn, day: int) -> int:
+    """
+    One "your desk tomorrow" outbox row per booking on `day`, with a single
+    INSERT ... SELECT. Bookings already queued are skipped, so this can run
+    on every worker tick once the reminder hour has passed.
+    """
+    return conn.execute(
+        """
+        INSERT INTO notification_outbox (user_id, channel, kind, booking_id, created_at)
+        SELECT b.user_id, ?, 'reminder', b.id, ?
+        FROM bookings b
+        WHERE b.day = ? AND b.status = 'booked'
+          AND NOT EXISTS (
+              SELECT 1 FROM notification_outbox o
+              WHERE o.booking_id = b.id AND o.kind = 'reminder'
+          )
+        """,
+        (EMAIL, datetime.utcnow().isoformat(), day),
+    ).rowcount
+
+
+def record_delivery(conn, sent: list[int], failed: dict, skipped: list[int], rejected: dict | None = None) -> None:
+    """
+    Store a batch of delivery outcomes. `failed` and `rejected` map an
+    error message to outbox ids: failed ones stay pending until they reach
+    MAX_ATTEMPTS, rejected ones (refused for good) fail at once.
+    """
+    sent_at = datetime.utcnow().isoformat()
+    if sent:
+        conn.execute(
+            f"""
+            UPDATE notification_outbox
+            SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL
+            WHERE id IN ({','.join('?' * len(sent))})
+            """,
+            (sent_at, *sent),
+        )
+    if skipped:
+        conn.execute(
+            f"UPDATE notification_outbox SET status = 'skipped' WHERE id IN ({','.join('?' * len(skipped))})",
+            skipped,
+        )
+    for max_attempts, outcomes in ((MAX_ATTEMPTS, failed), (1, rejected or {})):
+        for error, ids in outcomes.items():
+            conn.execute(
+                f"""
+                UPDATE notification_outbox
+                SET attempts = attempts + 1,
+                    last_error = ?,
+                    status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END
+                WHERE id IN ({','.join('?' * len(ids))})
+                """,
+                (error, max_attempts, *ids),
+            )
+
+
+# ---------------------------------------------------
+# DIGESTS (one query per run, rendered in bulk)
+# ---------------------------------------------------
+def pending_email_rows(conn, max_users: int = DIGEST_USERS_PER_RUN):
+    """
+    Every pending email notification for the first `max_users` recipients,
+    with the booking, desk and recipient details joined in, ordered by user.
+    """
+    return conn.execute(
+        """
+        SELECT o.id, o.user_id, o.kind, o.booking_id,
+               u.name AS user_name, u.email, u.is_active,
+               b.status AS booking_status,
+               COALESCE(b.day, json_extract(o.payload, '$.day')) AS day,
+               COALESCE(b.start_min, json_extract(o.payload, '$.start_min')) AS start_min,
+               COALESCE(b.end_min, json_extract(o.payload, '$.end_min')) AS end_min,
+               d.name AS desk_name, d.location,
+               json_extract(o.payload, '$.reason') AS reason
+        FROM notification_outbox o
+        JOIN users u ON u.id = o.user_id
+        LEFT JOIN bookings b ON b.id = o.booking_id
+        LEFT JOIN desks d ON d.id = COALESCE(b.desk_id, json_extract(o.payload, '$.desk_id'))
+        WHERE o.channel = ? AND o.status = 'pending'
+          AND o.user_id IN (
+              SELECT DISTINCT user_id FROM notification_outbox
+              WHERE channel = ? AND status = 'pending'
+              ORDER BY user_id
+              LIMIT ?
+          )
+        ORDER BY o.user_id, o.id
+        """,
+        (EMAIL, EMAIL, max_users),
+    ).fetchall()
+
+
+# Digest sections, in the order they appear in the email
+SECTIONS = {
+    "reminder": "Your desks tomorrow",
+    "waitlist_allocated": "Waitlist: a desk was booked for you",
+    "booking_cancelled": "Cancelled bookings",
+    "waitlist_cancelled": "Withdrawn waitlist requests",
+    "no_show": "Marked as no-show (not checked in)",
+}
+
+
+def _line(row) -> str:
+    when = uk_date(from_day_number(row["day"])) if row["day"] is not None else ""
+    if row["start_min"] is not None:
+        when += f" {hhmm(row['start_min'])}-{hhmm(row['end_min'])}"
+    where = f", {row['desk_name']} ({row['location']})" if row["desk_name"] else ""
+    reason = f": {row['reason']}" if row["reason"] else ""
+    return f"  - {when}{where}{reason}"
+
+
+def _is_stale(row) -> bool:
+    # A reminder or allocation notice for a booking that is no longer booked
+    return row["kind"] in ("reminder", "waitlist_allocated") and row["booking_status"] != "booked"
+
+
+def render_digests(rows, sender: str = MAIL_FROM):
+    """
+    Group pending rows by recipient and build one message each. Returns
+    (digests, skipped_ids); each digest is (message, outbox_ids).
+    Inactive users and stale notices are skipped rather than sent.
+    """
+    digests, skipped = [], []
+    for _, group in groupby(rows, key=lambda row: row["user_id"]):
+        group = list(group)
+        first = group[0]
+        live = [row for row in group if not _is_stale(row)]
+        if not first["is_active"] or not first["email"] or not live:
+            skipped.extend(row["id"] for row in group)
+            continue
+        skipped.extend(row["id"] for row in group if _is_stale(row))
+
+        body = [f"Hi {first['user_name'] or first['email']},", ""]
+        for kind, title in SECTIONS.items():
+            lines = [_line(row) for row in live if row["kind"] == kind]
+            if lines:
+                body += [f"{title}:", *lines, ""]
+        body.append("Manage your bookings in the desk booking app.")
+
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = first["email"]
+        message["Subject"] = (
+            "Your desks tomorrow" if all(row["kind"] == "reminder" for row in live) else "Desk booking updates"
+        )
+        message.set_content("\n".join(body))
+        digests.append((message, [row["id"] for row in live]))
+    return digests, skipped
+
+
+# ---------------------------------------------------
+# SMTP DELIVERY
+# ---------------------------------------------------
+class PermanentMailError(Exception):
+    """The server refused a message for good (5xx); retrying will not help."""
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class Mailer:
+    """
+    One SMTP connection reused for a whole run, opened lazily and reopened
+    after a disconnect. Sends are spaced to `rate` messages per second, and
+    transient failures (4xx, dropped connections) retry with backoff.
+    """
+
+    def __init__(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        username: str | None = SMTP_USER,
+        password: str | None = SMTP_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        rate: float = SEND_RATE_PER_SECOND,
+        retries: int = SEND_RETRIES,
+        retry_delay: float = RETRY_BASE_DELAY_SECONDS,
+        timeout: float = 10,
+    ):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.interval = 1 / rate if rate else 0
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.stats = {"connections": 0, "sent": 0, "retries": 0}
+        self._smtp = None
+        self._last_send = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            self._smtp = smtp
+            self.stats["connections"] += 1
+        return self._smtp
+
+    def _drop(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            finally:
+                self._smtp = None
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._drop()
+
+    def _throttle(self) -> None:
+        wait = self._last_send + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def send(self, message: EmailMessage) -> None:
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            try:
+                self._connect().send_message(message)
+                self.stats["sent"] += 1
+                return
+            except Exception as exc:
+                if not _is_transient(exc):
+                    if isinstance(exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        raise PermanentMailError(str(exc)) from exc
+                    raise
+                if attempt == self.retries:
+                    raise
+                # The session state is unknown after an error; start clean
+                self._drop()
+                self.stats["retries"] += 1
+                time.sleep(self.retry_delay * (2 ** attempt))
+
+
+# ---------------------------------------------------
+# DISPATCH
+# ---------------------------------------------------
+_dispatch_lock = threading.Lock()
+
+
+def _record_by_site(sent: list, failed: dict, skipped: list, rejected: dict) -> None:
+    """record_delivery for (site_id, outbox_id) references, one write per site."""
+    sites = {site_id for site_id, _ in [*sent, *skipped, *chain(*failed.values(), *rejected.values())]}
+    for site_id in sorted(sites):
+        def pick(refs):
+            return [outbox_id for ref_site, outbox_id in refs if ref_site == site_id]
+
+        run_site_write(
+            site_id,
+            record_delivery,
+            pick(sent),
+            {error: ids for error, refs in failed.items() if (ids := pick(refs))},
+            pick(skipped),
+            {error: ids for error, refs in rejected.items() if (ids := pick(refs))},
+        )
+
+
+def send_pending_digests(mailer: Mailer | None = None, max_users: int = DIGEST_USERS_PER_RUN) -> dict:
+    """
+    Deliver pending email notifications as one digest per user over a
+    single connection. Every site's outbox is read in parallel and merged
+    by recipient, so someone with bookings at two sites gets one email.
+    Outcomes are recorded through each site's writer every
+    DELIVERY_FLUSH_EVERY messages. Runs off the request path; an
+    overlapping call in the same process returns without sending.
+    """
+    if not _dispatch_lock.acquire(blocking=False):
+        return {"busy": True}
+    try:
+        rows = sorted(
+            (
+                {**dict(row), "id": (site_id, row["id"])}
+                for site_id, site_rows in fan_out(pending_email_rows, max_users).items()
+                for row in site_rows
+            ),
+            key=lambda row: row["user_id"],
+        )
+
+        digests, skipped = render_digests(rows)
+        summary = {"digests": len(digests), "sent": 0, "failed": 0, "skipped": len(skipped)}
+        sent, failed, rejected = [], {}, {}
+
+        def flush():
+            if sent or failed or skipped or rejected:
+                _record_by_site(sent, failed, skipped, rejected)
+            for outcome in (sent, failed, skipped, rejected):
+                outcome.clear()
+
+        with mailer or Mailer() as smtp:
+            for index, (message, outbox_ids) in enumerate(digests, start=1):
+                try:
+                    smtp.send(message)
+                except (PermanentMailError, smtplib.SMTPException, OSError) as exc:
+                    error = f"{type(exc).__name__}: {exc}"[:500]
+                    outcome = failed if _is_transient(exc) else rejected
+                    outcome.setdefault(error, []).extend(outbox_ids)
+                    summary["failed"] += 1
+                    logger.warning("digest to %s failed: %s", message["To"], error)
+                    if _is_transient(exc):
+                        # Retries are exhausted; the rest wait for the next run
+                        break
+                else:
+                    sent.extend(outbox_ids)
+                    summary["sent"] += 1
+                if index % DELIVERY_FLUSH_EVERY == 0:
+                    flush()
+        flush()
+
+        if metrics.ENABLED:
+            metrics.NOTIFICATIONS_SENT.inc("sent", amount=summary["sent"])
+            metrics.NOTIFICATIONS_SENT.inc("failed", amount=summary["failed"])
+        return summary
+    finally:
+        _dispatch_lock.release()
+
+
+def run_notifications(now: datetime | None = None, mailer: Mailer | None = None) -> dict:
+    """
+    One notification pass: queue tomorrow's reminders once the reminder
+    hour has passed, then send the digests. No-show notices are only sent
+    for bookings enforce_no_shows (utils.rules) has already marked.
+    """
+    now = now or datetime.now()
+    reminders = 0
+    if now.hour >= REMINDER_HOUR:
+        tomorrow = day_number(now.date() + timedelta(days=1))
+        reminders = sum(run_site_write(site_id, queue_reminders, tomorrow) for site_id in all_site_ids())
+    return {"reminders_queued": reminders, **send_pending_digests(mailer)}
+
+
+def outbox_summary(conn) -> list:
+    return conn.execute(
+        """
+        SELECT channel, kind, status, COUNT(*) AS n, MAX(last_error) AS last_error
+        FROM notification_outbox
+        GROUP BY channel, kind, status
+        ORDER BY channel, kind, status
+        """
+    ).fetchall()
+
+
+# ---------------------------------------------------
+# BACKGROUND WORKER
+# ---------------------------------------------------
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+
+
+def _worker_loop() -> None:
+    while True:
+        try:
+            run_notifications()
+        except Exception:
+            logger.exception("notification run failed")
+        time.sleep(WORKER_INTERVAL_SECONDS)
+
+
+def start_notification_worker() -> None:
+    """Run notification passes on a daemon thread, once per process, when enabled."""
+    global _worker
+    if not ENABLED or _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_worker_loop, name="desk-booking-notifications", daemon=True)
+            _worker.start()
+
+
+if __name__ == "__main__":
+    if not ENABLED:
+        raise SystemExit("Set DESK_BOOKING_SMTP_HOST to send notifications.")
+    print(run_notifications())
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+
+# Channels: "email" is delivered as user digests. Only queue a channel
+# something delivers; rows nothing consumes stay pending forever.
+EMAIL = "email"
+
+
+def outbox_entry(user_id: int, channel: str, kind: str, booking_id: int | None = None, **payload):
+    """One notification_outbox row for enqueue(); extra fields go into the JSON payload."""
+    return (user_id, channel, kind, booking_id, json.dumps(payload) if payload else None)
+
+
+def enqueue(conn, entries) -> int:
+    """
+    Queue notifications with one executemany, inside the caller's
+    transaction: they exist only if the change they describe commits.
+    """
+    created_at = datetime.utcnow().isoformat()
+    entries = list(entries)
+    conn.executemany(
+        """
+        INSERT INTO notification_outbox
+        (user_id, channel, kind, booking_id, payload, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [(*entry, created_at) for entry in entries],
+    )
+    return len(entries)
@@ -0,0 +1,48 @@
+import functools
+import time
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+TIMINGS_KEY = "render_timings"
+SHOW_TIMINGS_KEY = "show_render_timings"
+
+
+def timing_toggle() -> None:
+    """Sidebar switch that shows per-section render times."""
+    st.sidebar.toggle("Show render timings", key=SHOW_TIMINGS_KEY)
+
+
+def timed_fragment(name: str):
+    """
+    Decorator: run the function as an `st.fragment` so interactions inside
+    it rerun only that section, and record how long each run took.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            st.session_state.setdefault(TIMINGS_KEY, {})[name] = elapsed_ms
+            if st.session_state.get(SHOW_TIMINGS_KEY):
+                st.caption(f"⏱ {name}: {elapsed_ms:.1f} ms")
+            return result
+
+        return st.fragment(timed)
+
+    return decorator
+
+
+def rerun_fragment() -> None:
+    """
+    Rerun only the calling fragment. Falls back to a full rerun when the
+    fragment is running as part of the whole page, where Streamlit does
+    not allow a fragment-scoped rerun.
+    """
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
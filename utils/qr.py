@@ -1,8 +1,14 @@
-import qrcode
-from io import BytesIO
-from PIL import Image
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
 
 def generate_qr(url: str) -> Image.Image:
+    import qrcode
+
     qr = qrcode.QRCode(box_size=8, border=2)
     qr.add_data(url)
     qr.make()
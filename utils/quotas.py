@@ -0,0 +1,168 @@
+from datetime import date
+
+from utils.audit import audit_event, log_actions
+from utils.dates import day_number
+from utils.db import fan_out, get_conn, other_site_ids
+from utils.writer import run_write
+
+QUOTA_FIELDS = ("days_per_week", "minutes_per_day", "advance_days")
+
+
+def week_of(day: int) -> int:
+    """Monday-based week number (day 0 is a Thursday)."""
+    return (day + 3) // 7
+
+
+# ---------------------------------------------------
+# USAGE (summed over every site)
+# ---------------------------------------------------
+def _limits(conn, user_id: int):
+    return conn.execute(
+        f"""
+        SELECT {', '.join(f'q.{field}' for field in QUOTA_FIELDS)}
+        FROM users u
+        JOIN role_quotas q ON q.role = u.role
+        WHERE u.id = ?
+        """,
+        (user_id,),
+    ).fetchone()
+
+
+def weeks_spanning(day_from: int, day_to: int) -> tuple[int, int]:
+    """First and last day of the Monday-based weeks covering [day_from, day_to]."""
+    return week_of(day_from) * 7 - 3, week_of(day_to) * 7 + 3
+
+
+def day_minutes(conn, user_ids, day_from: int, day_to: int) -> dict:
+    """{user_id: {day: booked minutes}} for `user_ids` over [day_from, day_to] at one site."""
+    user_ids = list(user_ids)
+    minutes = {}
+    for row in conn.execute(
+        f"""
+        SELECT user_id, day, minutes
+        FROM user_day_usage
+        WHERE user_id IN ({','.join('?' * len(user_ids))})
+          AND day BETWEEN ? AND ? AND minutes > 0
+        """,
+        (*user_ids, day_from, day_to),
+    ):
+        minutes.setdefault(row["user_id"], {})[row["day"]] = row["minutes"]
+    return minutes
+
+
+def add_minutes(total: dict, site: dict) -> dict:
+    """Add one site's day_minutes() into `total`."""
+    for user_id, days in site.items():
+        user_total = total.setdefault(user_id, {})
+        for day, minutes in days.items():
+            user_total[day] = user_total.get(day, 0) + minutes
+    return total
+
+
+def minutes_elsewhere(conn, user_ids, day_from: int, day_to: int) -> dict:
+    """
+    day_minutes() summed over every site but `conn`'s, for the whole weeks
+    around [day_from, day_to], in one read of each site.
+    """
+    total = {}
+    if others := other_site_ids(conn):
+        for site in fan_out(day_minutes, user_ids, *weeks_spanning(day_from, day_to), site_ids=others).values():
+            add_minutes(total, site)
+    return total
+
+
+def _usage(limits, by_site, day: int) -> dict:
+    """Limits plus minutes on `day` and days booked in its week; a day booked at two sites is one day."""
+    first = week_of(day) * 7 - 3
+    minutes = {}
+    for site in by_site:
+        for booked_day, booked in site.items():
+            if first <= booked_day <= first + 6:
+                minutes[booked_day] = minutes.get(booked_day, 0) + booked
+    return {**dict(limits), "minutes": minutes.get(day, 0), "days": len(minutes)}
+
+
+# ---------------------------------------------------
+# ENFORCEMENT (inside the booking transaction)
+# ---------------------------------------------------
+def quota_violation(
+    conn, user_id: int, day: int, today: int | None = None, elsewhere: dict | None = None
+) -> str | None:
+    """
+    Check a user's usage for `day` after their new bookings were inserted
+    (the triggers have already counted them at this site). `elsewhere` is
+    minutes_elsewhere() for the user's week, for a caller checking many
+    person-days off one read; without it the other sites are read here.
+    Callers that book claim the user first (utils.writer.claim_users),
+    so no other site can commit a booking for them until this one does.
+    Returns a user-facing reason, or None when every quota holds.
+    """
+    limits = _limits(conn, user_id)
+    if limits is None or all(limits[field] is None for field in QUOTA_FIELDS):
+        return None
+
+    if elsewhere is None:
+        elsewhere = minutes_elsewhere(conn, [user_id], day, day)
+    here = day_minutes(conn, [user_id], *weeks_spanning(day, day)).get(user_id, {})
+    usage = _usage(limits, [here, elsewhere.get(user_id, {})], day)
+
+    today = day_number(date.today()) if today is None else today
+    if usage["advance_days"] is not None and day - today > usage["advance_days"]:
+        return f"Desks can be booked at most {usage['advance_days']} days ahead."
+    if usage["minutes_per_day"] is not None and usage["minutes"] > usage["minutes_per_day"]:
+        return f"You can book at most {usage['minutes_per_day'] / 60:g} hours per day."
+    if usage["days_per_week"] is not None and usage["days"] > usage["days_per_week"]:
+        return f"You can book at most {usage['days_per_week']} days per week."
+    return None
+
+
+# ---------------------------------------------------
+# READS
+# ---------------------------------------------------
+def role_quotas(conn) -> dict:
+    return {
+        row["role"]: {field: row[field] for field in QUOTA_FIELDS}
+        for row in conn.execute(f"SELECT role, {', '.join(QUOTA_FIELDS)} FROM role_quotas ORDER BY role")
+    }
+
+
+def quota_usage(user_id: int, day: int) -> dict | None:
+    """Quotas and usage at every site for the day and week of `day` (None: no quota row)."""
+    conn = get_conn()
+    limits = _limits(conn, user_id)
+    conn.close()
+    if limits is None:
+        return None
+    by_site = fan_out(day_minutes, [user_id], *weeks_spanning(day, day)).values()
+    return _usage(limits, [site.get(user_id, {}) for site in by_site], day)
+
+
+# ---------------------------------------------------
+# ADMIN (write job + entry point)
+# ---------------------------------------------------
+def update_role_quota(conn, role: str, limits: dict, actor: str) -> None:
+    conn.execute(
+        f"""
+        INSERT INTO role_quotas (role, {', '.join(QUOTA_FIELDS)})
+        VALUES (?, {', '.join('?' * len(QUOTA_FIELDS))})
+        ON CONFLICT (role) DO UPDATE SET
+        {', '.join(f'{field} = excluded.{field}' for field in QUOTA_FIELDS)}
+        """,
+        (role, *(limits.get(field) for field in QUOTA_FIELDS)),
+    )
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "QUOTA_UPDATED",
+                f"role={role}, " + ", ".join(f"{field}={limits.get(field)}" for field in QUOTA_FIELDS),
+                role=role,
+                **{field: limits.get(field) for field in QUOTA_FIELDS},
+            )
+        ],
+        actor=actor,
+    )
+
+
+def set_role_quota(role: str, limits: dict, actor: str) -> None:
+    run_write(update_role_quota, role, limits, actor)
@@ -1,31 +1,52 @@
-from datetime import datetime, timedelta
-from utils.db import get_conn
-from utils.audit import audit_log
+import os
+from datetime import datetime
+
+from utils.audit import audit_event, log_actions
+from utils.dates import day_number, minute_of_day
+from utils.outbox import EMAIL, enqueue, outbox_entry
+from utils.db import all_site_ids
+from utils.writer import run_site_write
+
+# Opt-in: nothing in the app checks people in yet, so until it does every
+# ended booking would be marked a no-show and its owner emailed
+ENFORCE_NO_SHOWS = os.getenv("DESK_BOOKING_ENFORCE_NO_SHOWS") == "1"
+
+
+def _mark_no_shows(conn, day, now_min):
+    no_shows = conn.execute("""
+        UPDATE bookings
+        SET status='no_show'
+        WHERE day=? AND end_min < ? AND checked_in=0 AND status='booked'
+        RETURNING id, user_id
+    """, (day, now_min)).fetchall()
+
+    log_actions(
+        conn,
+        [
+            audit_event(
+                "AUTO_NO_SHOW",
+                f"booking={row['id']}, user_id={row['user_id']}",
+                "booking",
+                row["id"],
+                user_id=row["user_id"],
+            )
+            for row in no_shows
+        ],
+        actor=None,
+    )
+    enqueue(conn, [outbox_entry(row["user_id"], EMAIL, "no_show", row["id"]) for row in no_shows])
+    return len(no_shows)
+
 
 def enforce_no_shows(now):
-    """Mark bookings as no-show if they were never checked in."""
-    conn = get_conn()
-    c = conn.cursor()
-
-    today = now.strftime("%Y-%m-%d")
-    now_hhmm = now.strftime("%H:%M")
-
-    no_shows = c.execute("""
-        SELECT id, user_id
-        FROM bookings
-        WHERE date=? AND end_time < ? AND checked_in=0 AND status='booked'
-    """, (today, now_hhmm)).fetchall()
-
-    for booking_id, user_id in no_shows:
-        c.execute(
-            "UPDATE bookings SET status='no_show' WHERE id=?",
-            (booking_id,),
-        )
-        audit_log(
-            None,
-            "AUTO_NO_SHOW",
-            f"booking={booking_id}, user_id={user_id}",
-        )
-
-    conn.commit()
-    conn.close()
+    """Mark bookings as no-show if they were never checked in, at every site."""
+    return sum(
+        run_site_write(site_id, _mark_no_shows, day_number(now.date()), minute_of_day(now))
+        for site_id in all_site_ids()
+    )
+
+
+if __name__ == "__main__":
+    if not ENFORCE_NO_SHOWS:
+        raise SystemExit("Set DESK_BOOKING_ENFORCE_NO_SHOWS=1 to mark no-shows.")
+    print(enforce_no_shows(datetime.now()))
@@ -0,0 +1,133 @@
+from datetime import date
+
+import streamlit as st
+
+from utils.audit import audit_event, log_actions
+from utils.dates import day_number
+from utils.db import (
+    PRIMARY_SITE_ID,
+    all_site_ids,
+    fan_out,
+    get_conn,
+    init_site_store,
+    list_sites,
+    site_file_name,
+    site_of_desks,
+)
+from utils.writer import run_site_write, run_write
+
+
+# ---------------------------------------------------
+# SITE PICKER
+# ---------------------------------------------------
+def site_picker(container=st, key: str = "site", default: int | None = None) -> int:
+    """
+    Site selectbox for pages that show one site at a time. Shown only
+    once there is more than one site; otherwise the primary site.
+    """
+    if len(all_site_ids()) == 1:
+        return PRIMARY_SITE_ID
+
+    names = {site["id"]: site["name"] for site in list_sites()}
+    ids = list(names)
+    return container.selectbox(
+        "Site",
+        ids,
+        index=ids.index(default) if default in names else 0,
+        format_func=names.get,
+        key=key,
+    )
+
+
+def site_of_desk(desk_id: int) -> int | None:
+    conn = get_conn()
+    row = conn.execute("SELECT site_id FROM desks WHERE id = ?", (desk_id,)).fetchone()
+    conn.close()
+    return row["site_id"] if row else None
+
+
+# ---------------------------------------------------
+# CREATE A SITE
+# ---------------------------------------------------
+def _add_site(conn, name: str, actor: str) -> int:
+    site_id = conn.execute("INSERT INTO sites (name) VALUES (?) RETURNING id", (name,)).fetchone()[0]
+    conn.execute("UPDATE sites SET db_file = ? WHERE id = ?", (site_file_name(site_id), site_id))
+    log_actions(conn, [audit_event("CREATE_SITE", f"Created site '{name}'", "site", site_id, name=name)], actor=actor)
+    return site_id
+
+
+def create_site(name: str, actor: str) -> int:
+    """
+    Register a site and create its bookings database next to the
+    catalogue. Raises sqlite3.IntegrityError if the name is taken.
+    """
+    site_id = run_write(_add_site, name.strip(), actor)
+    init_site_store(site_id)
+    all_site_ids.cache_clear()
+    return site_id
+
+
+# ---------------------------------------------------
+# MOVE DESKS BETWEEN SITES
+# ---------------------------------------------------
+IN_USE = "Cancel the upcoming bookings and waitlist entries for these desks first."
+
+
+def _pending_for_desks(conn, desk_ids: list[int], today: int) -> int:
+    """Upcoming bookings and waiting requests for `desk_ids` at one site."""
+    marks = ",".join("?" * len(desk_ids))
+    return conn.execute(
+        f"""
+        SELECT
+            (SELECT COUNT(*) FROM bookings
+             WHERE desk_id IN ({marks}) AND day >= ? AND status = 'booked')
+          + (SELECT COUNT(*) FROM waitlist
+             WHERE desk_id IN ({marks}) AND day >= ? AND status = 'waiting')
+        """,
+        (*desk_ids, today, *desk_ids, today),
+    ).fetchone()[0]
+
+
+def _assign_desks(conn, desk_ids: list[int], site_id: int, actor: str) -> None:
+    conn.execute(
+        f"UPDATE desks SET site_id = ? WHERE id IN ({','.join('?' * len(desk_ids))})", (site_id, *desk_ids)
+    )
+    log_actions(
+        conn,
+        [audit_event("MOVE_DESK", f"Moved desk {desk_id} to site {site_id}", "desk", desk_id, site_id=site_id)
+         for desk_id in desk_ids],
+        actor=actor,
+    )
+
+
+def move_desks(desk_ids, site_id: int, actor: str) -> int:
+    """
+    Assign desks, all currently at one site, to `site_id`. Past bookings
+    stay where they were made. Raises ValueError if the desks are still
+    in use.
+
+    The desks move in the catalogue first; from then on their old site
+    refuses bookings for them (insert_bookings checks each desk's site).
+    The old site is then checked again on its own writer, after anything
+    already queued there, and the move is undone if a booking or waitlist
+    entry got in meanwhile.
+    """
+    desk_ids = list(desk_ids)
+    if not desk_ids:
+        return 0
+
+    conn = get_conn()
+    current = site_of_desks(conn, desk_ids)
+    conn.close()
+    if current == site_id:
+        return 0
+
+    today = day_number(date.today())
+    if fan_out(_pending_for_desks, desk_ids, today, site_ids=[current])[current]:
+        raise ValueError(IN_USE)
+
+    run_write(_assign_desks, desk_ids, site_id, actor)
+    if run_site_write(current, _pending_for_desks, desk_ids, today):
+        run_write(_assign_desks, desk_ids, current, actor)
+        raise ValueError(IN_USE)
+    return len(desk_ids)
@@ -0,0 +1,162 @@
+import functools
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import streamlit as st
+
+from utils.db import all_site_ids, get_conn, get_db_path, get_site_conn, site_db_path
+
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("DESK_BOOKING_SNAPSHOT_MAX_AGE", "300"))
+
+_refresh_lock = threading.Lock()
+_background: threading.Thread | None = None
+_background_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------
+# SNAPSHOT BUILD
+# ---------------------------------------------------
+def _report_path(db_path: Path) -> Path:
+    return db_path.with_name(f"{db_path.stem}-report{db_path.suffix}")
+
+
+@functools.cache
+def get_snapshot_path() -> Path:
+    """The catalogue's snapshot."""
+    return _report_path(get_db_path())
+
+
+def site_snapshot_path(site_id: int) -> Path:
+    return _report_path(site_db_path(site_id))
+
+
+def _backup(source: sqlite3.Connection, snapshot_path: Path, taken_at: datetime) -> None:
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target, name="main")
+        target.execute("PRAGMA journal_mode = DELETE")
+        target.execute("CREATE TABLE snapshot_meta (taken_at TEXT NOT NULL)")
+        target.execute(
+            "INSERT INTO snapshot_meta (taken_at) VALUES (?)",
+            (taken_at.isoformat(),),
+        )
+        target.commit()
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(tmp_path, snapshot_path)
+
+
+def refresh_snapshot() -> datetime:
+    """
+    Copy the catalogue and every site's database into their reporting
+    snapshots with the SQLite backup API. Each copy is a single read
+    transaction (WAL readers do not block writers) into a temporary file
+    that atomically replaces the old snapshot, so open report connections
+    are never disturbed. The sites are copied last: a booking in a site
+    snapshot always finds its user and desk in the catalogue's.
+    """
+    with _refresh_lock:
+        taken_at = datetime.now(timezone.utc)
+        _backup(get_conn(), get_snapshot_path(), taken_at)
+        for site_id in all_site_ids():
+            _backup(get_site_conn(site_id), site_snapshot_path(site_id), taken_at)
+        return taken_at
+
+
+def _refresh_quietly() -> None:
+    try:
+        refresh_snapshot()
+    except Exception:
+        logger.exception("snapshot refresh failed")
+
+
+def refresh_in_background() -> None:
+    """Start a refresh on a daemon thread unless one is already running."""
+    global _background
+    with _background_lock:
+        if _background is not None and _background.is_alive():
+            return
+        _background = threading.Thread(target=_refresh_quietly, name="desk-booking-snapshot", daemon=True)
+        _background.start()
+
+
+def _snapshot_age_seconds() -> float | None:
+    """Age of the oldest snapshot; None while any is missing (e.g. a new site)."""
+    paths = [get_snapshot_path(), *(site_snapshot_path(site_id) for site_id in all_site_ids())]
+    try:
+        mtime = min(path.stat().st_mtime for path in paths)
+    except FileNotFoundError:
+        return None
+    return datetime.now().timestamp() - mtime
+
+
+def _ensure_snapshot(max_age_seconds: int) -> None:
+    """
+    Build the snapshots on the request only while one is missing. A stale
+    set is still served, and refreshed on a background thread for the
+    next reader.
+    """
+    age = _snapshot_age_seconds()
+    if age is None:
+        refresh_snapshot()
+    elif age > max_age_seconds:
+        refresh_in_background()
+
+
+# ---------------------------------------------------
+# REPORT CONNECTIONS
+# ---------------------------------------------------
+def _read_only(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_report_conn(max_age_seconds: int = SNAPSHOT_MAX_AGE_SECONDS) -> sqlite3.Connection:
+    """
+    Read-only connection to the catalogue's snapshot. One older than
+    `max_age_seconds` is refreshed in the background.
+    """
+    _ensure_snapshot(max_age_seconds)
+    return _read_only(get_snapshot_path())
+
+
+def get_site_report_conn(site_id: int, max_age_seconds: int = SNAPSHOT_MAX_AGE_SECONDS) -> sqlite3.Connection:
+    """
+    Report connection for one site, for fan_out(connect=...): the site's
+    snapshot with the catalogue's attached for users and desks, so every
+    site in a report is read from the same refresh.
+    """
+    _ensure_snapshot(max_age_seconds)
+    conn = _read_only(site_snapshot_path(site_id))
+    conn.execute("ATTACH DATABASE ? AS catalogue", (f"file:{get_snapshot_path()}?mode=ro",))
+    return conn
+
+
+def snapshot_taken_at(conn: sqlite3.Connection) -> datetime:
+    row = conn.execute("SELECT taken_at FROM snapshot_meta").fetchone()
+    return datetime.fromisoformat(row["taken_at"])
+
+
+def show_snapshot_status(conn: sqlite3.Connection, key: str = "refresh_snapshot") -> None:
+    """Caption with the snapshot's freshness plus a manual refresh button."""
+    taken_at = snapshot_taken_at(conn).astimezone()
+    col1, col2 = st.columns([5, 1])
+    col1.caption(
+        f"Report data as of {taken_at.strftime('%d/%m/%Y %H:%M:%S')} "
+        f"(snapshot refreshed every {SNAPSHOT_MAX_AGE_SECONDS // 60} minutes)."
+    )
+    if col2.button("Refresh data", key=key):
+        refresh_snapshot()
+        st.rerun()
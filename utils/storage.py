@@ -0,0 +1,296 @@
+import itertools
+import json
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Protocol
+
+from utils.audit import audit_event, entity_history, log_actions
+from utils.bookings import (
+    SLOT_MINUTES,
+    BookingConflict,
+    cancel_user_bookings,
+    check_in_booking,
+    insert_bookings,
+)
+from utils.dates import hhmm
+from utils.db import PRIMARY_SITE_ID, get_site_conn
+from utils.writer import run_site_write, run_write
+
+BOOKING_FIELDS = ("id", "desk_id", "day", "start_min", "end_min", "status", "checked_in")
+
+
+class Storage(Protocol):
+    """
+    Repository over users, desks, bookings and the audit log, so scripts
+    can run the booking rules against either engine and compare them
+    (see benchmarks/storage_conformance.py).
+    """
+
+    def add_user(self, name: str, email: str, role: str = "user", can_book: bool = True) -> int: ...
+
+    def user(self, user_id: int) -> dict | None: ...
+
+    def add_desk(self, name: str, location: str | None = None, admin_only: bool = False) -> int: ...
+
+    def desks(self, active_only: bool = True) -> list[dict]: ...
+
+    def book(self, user_id: int, day: int, intervals: dict) -> list[int]:
+        """One booking per {desk_id: (start_min, end_min)}; BookingConflict if any is taken."""
+
+    def cancel(self, user_id: int, booking_ids: list[int], actor: str | None) -> int: ...
+
+    def check_in(self, user_id: int, booking_id: int, actor: str | None) -> bool: ...
+
+    def day_bookings(self, day: int) -> list[tuple[int, int, int]]:
+        """Booked (desk_id, start_min, end_min) on `day`, sorted."""
+
+    def user_bookings(self, user_id: int, day_from: int = 0) -> list[dict]:
+        """The user's bookings (BOOKING_FIELDS) from `day_from`, by day, start and id."""
+
+    def log(self, action: str, details: str, actor: str | None = None, entity_type=None, entity_id=None, **payload): ...
+
+    def audit(self, entity_type: str, entity_id: int) -> list[dict]:
+        """Audit events (email, action, details, payload) about one entity, newest first."""
+
+
+# ---------------------------------------------------
+# SQLITE (the application's storage)
+# ---------------------------------------------------
+class SqliteStorage:
+    """The application's storage: the same write jobs, writers and queries the pages use."""
+
+    def __init__(self, site_id: int = PRIMARY_SITE_ID):
+        self.site_id = site_id
+
+    def _read(self, query: str, params=()) -> list:
+        conn = get_site_conn(self.site_id)
+        rows = conn.execute(query, params).fetchall()
+        conn.close()
+        return rows
+
+    def add_user(self, name, email, role="user", can_book=True):
+        return run_write(
+            lambda conn: conn.execute(
+                "INSERT INTO users (name, email, role, can_book, is_active) VALUES (?, ?, ?, ?, 1) RETURNING id",
+                (name, email, role, int(can_book)),
+            ).fetchone()[0]
+        )
+
+    def user(self, user_id):
+        rows = self._read(
+            "SELECT id, name, email, role, can_book, is_active FROM users WHERE id = ?", (user_id,)
+        )
+        return dict(rows[0]) if rows else None
+
+    def add_desk(self, name, location=None, admin_only=False):
+        return run_write(
+            lambda conn: conn.execute(
+                "INSERT INTO desks (name, location, admin_only, site_id) VALUES (?, ?, ?, ?) RETURNING id",
+                (name, location, int(admin_only), self.site_id),
+            ).fetchone()[0]
+        )
+
+    def desks(self, active_only=True):
+        return [
+            dict(row)
+            for row in self._read(
+                "SELECT id, name, location, is_active, admin_only FROM desks "
+                "WHERE site_id = ? AND (is_active = 1 OR ? = 0) ORDER BY id",
+                (self.site_id, int(active_only)),
+            )
+        ]
+
+    def book(self, user_id, day, intervals):
+        return run_site_write(self.site_id, insert_bookings, user_id, day, intervals)
+
+    def cancel(self, user_id, booking_ids, actor):
+        return run_site_write(self.site_id, cancel_user_bookings, user_id, list(booking_ids), actor)
+
+    def check_in(self, user_id, booking_id, actor):
+        return run_site_write(self.site_id, check_in_booking, user_id, booking_id, actor)
+
+    def day_bookings(self, day):
+        return [
+            tuple(row)
+            for row in self._read(
+                "SELECT desk_id, start_min, end_min FROM bookings "
+                "WHERE day = ? AND status = 'booked' ORDER BY desk_id, start_min",
+                (day,),
+            )
+        ]
+
+    def user_bookings(self, user_id, day_from=0):
+        return [
+            dict(row)
+            for row in self._read(
+                f"SELECT {', '.join(BOOKING_FIELDS)} FROM bookings "
+                "WHERE user_id = ? AND day >= ? ORDER BY day, start_min, id",
+                (user_id, day_from),
+            )
+        ]
+
+    def log(self, action, details, actor=None, entity_type=None, entity_id=None, **payload):
+        run_site_write(
+            self.site_id, log_actions, [audit_event(action, details, entity_type, entity_id, **payload)], actor=actor
+        )
+
+    def audit(self, entity_type, entity_id):
+        conn = get_site_conn(self.site_id)
+        rows = entity_history(conn, entity_type, entity_id)
+        conn.close()
+        return [
+            {"email": row["email"], "action": row["action"], "details": row["details"], "payload": row["payload"]}
+            for row in rows
+        ]
+
+
+# ---------------------------------------------------
+# IN MEMORY
+# ---------------------------------------------------
+class MemoryStorage:
+    """
+    The same data in dicts, with each desk's booked intervals for a day in
+    a sorted list. Models only what the interface covers: no quotas,
+    waitlist, outbox or sites, so cancelling just frees the desk.
+    """
+
+    def __init__(self):
+        self.users: dict[int, dict] = {}
+        self.desks_by_id: dict[int, dict] = {}
+        self.bookings: dict[int, dict] = {}
+        self.audit_log: list[dict] = []
+        # (desk_id, day) -> booked (start_min, end_min, booking_id), sorted.
+        # A desk's booked intervals never overlap, so ends are sorted too.
+        self._intervals: dict[tuple[int, int], list[tuple[int, int, int]]] = {}
+        self._ids = {table: itertools.count(1) for table in ("users", "desks", "bookings")}
+        # Writes are serialised, as they are by the SQLite writer
+        self._lock = threading.Lock()
+
+    def add_user(self, name, email, role="user", can_book=True):
+        with self._lock:
+            # The same error as the UNIQUE constraint, which callers already catch
+            if any(user["email"] == email for user in self.users.values()):
+                raise sqlite3.IntegrityError("UNIQUE constraint failed: users.email")
+            user_id = next(self._ids["users"])
+            self.users[user_id] = {
+                "id": user_id, "name": name, "email": email, "role": role,
+                "can_book": int(can_book), "is_active": 1,
+            }
+            return user_id
+
+    def user(self, user_id):
+        user = self.users.get(user_id)
+        return dict(user) if user else None
+
+    def add_desk(self, name, location=None, admin_only=False):
+        with self._lock:
+            if any(desk["name"] == name for desk in self.desks_by_id.values()):
+                raise sqlite3.IntegrityError("UNIQUE constraint failed: desks.name")
+            desk_id = next(self._ids["desks"])
+            self.desks_by_id[desk_id] = {
+                "id": desk_id, "name": name, "location": location, "is_active": 1, "admin_only": int(admin_only),
+            }
+            return desk_id
+
+    def desks(self, active_only=True):
+        return [dict(desk) for desk in self.desks_by_id.values() if desk["is_active"] or not active_only]
+
+    def _overlapping(self, desk_id: int, day: int, start_min: int, end_min: int) -> list[tuple[int, int, int]]:
+        intervals = self._intervals.get((desk_id, day), [])
+        i = bisect_left(intervals, (end_min,))
+        found = []
+        while i > 0 and intervals[i - 1][1] > start_min:
+            i -= 1
+            found.append(intervals[i])
+        return found
+
+    def book(self, user_id, day, intervals):
+        with self._lock:
+            taken = set()
+            for desk_id, (want_start, want_end) in intervals.items():
+                for start_min, end_min, _ in self._overlapping(desk_id, day, want_start, want_end):
+                    for minute in range(want_start, want_end, SLOT_MINUTES):
+                        if start_min < minute + SLOT_MINUTES and end_min > minute:
+                            taken.add(f"{desk_id}_{hhmm(minute)}")
+            if taken:
+                raise BookingConflict(sorted(taken))
+
+            booking_ids = []
+            for desk_id, (start_min, end_min) in intervals.items():
+                booking_id = next(self._ids["bookings"])
+                self.bookings[booking_id] = {
+                    "id": booking_id, "user_id": user_id, "desk_id": desk_id, "day": day,
+                    "start_min": start_min, "end_min": end_min, "status": "booked", "checked_in": 0,
+                }
+                insort(self._intervals.setdefault((desk_id, day), []), (start_min, end_min, booking_id))
+                booking_ids.append(booking_id)
+            return booking_ids
+
+    def cancel(self, user_id, booking_ids, actor):
+        with self._lock:
+            cancelled = 0
+            for booking_id in booking_ids:
+                booking = self.bookings.get(booking_id)
+                if booking is None or booking["user_id"] != user_id or booking["status"] != "booked":
+                    continue
+                booking["status"] = "cancelled"
+                key = (booking["desk_id"], booking["day"])
+                self._intervals[key].remove((booking["start_min"], booking["end_min"], booking_id))
+                self._audit(
+                    actor, "BOOKING_CANCELLED", f"booking_id={booking_id}, desk_id={booking['desk_id']}",
+                    "booking", booking_id, desk_id=booking["desk_id"],
+                )
+                cancelled += 1
+            return cancelled
+
+    def check_in(self, user_id, booking_id, actor):
+        with self._lock:
+            booking = self.bookings.get(booking_id)
+            if (
+                booking is None or booking["user_id"] != user_id
+                or booking["status"] != "booked" or booking["checked_in"]
+            ):
+                return False
+            booking["checked_in"] = 1
+            self._audit(actor, "CHECKED_IN", f"booking_id={booking_id}, desk_id={booking['desk_id']}", "booking", booking_id)
+            return True
+
+    def day_bookings(self, day):
+        return sorted(
+            (desk_id, start_min, end_min)
+            for (desk_id, booked_day), intervals in self._intervals.items()
+            if booked_day == day
+            for start_min, end_min, _ in intervals
+        )
+
+    def user_bookings(self, user_id, day_from=0):
+        return [
+            {field: booking[field] for field in BOOKING_FIELDS}
+            for booking in sorted(
+                self.bookings.values(), key=lambda b: (b["day"], b["start_min"], b["id"])
+            )
+            if booking["user_id"] == user_id and booking["day"] >= day_from
+        ]
+
+    def _audit(self, actor, action, details, entity_type=None, entity_id=None, **payload):
+        self.audit_log.append(
+            {
+                "email": actor, "action": action, "details": details,
+                "entity_type": entity_type, "entity_id": entity_id,
+                "payload": json.dumps(payload) if payload else None,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+        )
+
+    def log(self, action, details, actor=None, entity_type=None, entity_id=None, **payload):
+        with self._lock:
+            self._audit(actor, action, details, entity_type, entity_id, **payload)
+
+    def audit(self, entity_type, entity_id):
+        return [
+            {key: entry[key] for key in ("email", "action", "details", "payload")}
+            for entry in reversed(self.audit_log)
+            if entry["entity_type"] == entity_type and entry["entity_id"] == entity_id
+        ][:200]
@@ -1,15 +1,31 @@
 import streamlit as st
 
+# Served from static/fonts (server.enableStaticServing in .streamlit/config.toml)
+FONT_URL = "app/static/fonts"
+
 
 def apply_lato_font() -> None:
     st.markdown(
-        """
+        f"""
         <style>
-        @import url('https://fonts.googleapis.com/css2?family=Lato:wght@300;400;600;700&display=swap');
+        @font-face {{
+          font-family: 'Lato';
+          font-weight: 300;
+          font-display: swap;
+          src: local('Lato Light'), local('Lato-Light'),
+               url('{FONT_URL}/Lato-Light.ttf') format('truetype');
+        }}
+        @font-face {{
+          font-family: 'Lato';
+          font-weight: 400;
+          font-display: swap;
+          src: local('Lato Regular'), local('Lato-Regular'),
+               url('{FONT_URL}/Lato-Regular.ttf') format('truetype');
+        }}
 
-        html, body, [class*="css"] {
+        html, body, [class*="css"] {{
           font-family: 'Lato', sans-serif;
-        }
+        }}
         </style>
         """,
         unsafe_allow_html=True,
@@ -0,0 +1,96 @@
+import streamlit as st
+
+from utils.audit import audit_event, log_actions
+from utils.db import get_conn
+from utils.writer import run_write
+
+USER_PAGE_SIZE = 50
+
+# operation -> (SET clause, audit action, audit wording)
+BULK_OPERATIONS = {
+    "deactivate": ("is_active = 0, can_book = 0", "TOGGLE_ACTIVE", "Deactivated user {email}"),
+    "activate": ("is_active = 1", "TOGGLE_ACTIVE", "Activated user {email}"),
+    "disable_booking": ("can_book = 0", "TOGGLE_CAN_BOOK", "Disabled booking for {email}"),
+    "enable_booking": ("can_book = 1", "TOGGLE_CAN_BOOK", "Enabled booking for {email}"),
+    "make_admin": ("role = 'admin'", "PROMOTE_TO_ADMIN", "Promoted {email} to admin"),
+    "remove_admin": ("role = 'user'", "REMOVE_ADMIN", "Removed admin role from {email}"),
+}
+
+
+# ---------------------------------------------------
+# SEARCH
+# ---------------------------------------------------
+def search_users(prefix: str = "", after: tuple[str, int] | None = None, page_size: int = USER_PAGE_SIZE):
+    """
+    Users whose email or name starts with `prefix`, ignoring case, ordered
+    by email. Prefix matches are range predicates so they use the
+    idx_users_email (NOCASE) and lower(name) indexes. Pages are keyset:
+    pass the previous page's cursor as `after`. Returns (rows, cursor for
+    the next page or None).
+    """
+    prefix = prefix.strip().lower()
+    conditions = []
+    params: list = []
+
+    if prefix:
+        upper = prefix + "\uffff"
+        conditions.append(
+            """
+            ((email COLLATE NOCASE >= ? AND email COLLATE NOCASE < ?)
+             OR (lower(name) >= ? AND lower(name) < ?))
+            """
+        )
+        params += [prefix, upper, prefix, upper]
+    if after is not None:
+        conditions.append("(email COLLATE NOCASE, id) > (?, ?)")
+        params += after
+
+    conn = get_conn()
+    rows = conn.execute(
+        f"""
+        SELECT id, name, email, role, can_book, is_active
+        FROM users
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY email COLLATE NOCASE, id
+        LIMIT ?
+        """,
+        (*params, page_size + 1),
+    ).fetchall()
+    conn.close()
+
+    if len(rows) <= page_size:
+        return rows, None
+    last = rows[page_size - 1]
+    return rows[:page_size], (last["email"], last["id"])
+
+
+# ---------------------------------------------------
+# BULK UPDATES
+# ---------------------------------------------------
+def _bulk_update(conn, users, operation: str, actor: str) -> int:
+    set_clause, action, wording = BULK_OPERATIONS[operation]
+
+    conn.executemany(
+        f"UPDATE users SET {set_clause} WHERE id = ?",
+        [(user_id,) for user_id, _ in users],
+    )
+    log_actions(
+        conn,
+        [
+            audit_event(action, wording.format(email=email), "user", user_id, email=email)
+            for user_id, email in users
+        ],
+        actor=actor,
+    )
+    return len(users)
+
+
+def bulk_update_users(users, operation: str) -> int:
+    """
+    Apply one operation to many users in a single transaction.
+    `users` is a list of (id, email) pairs; returns the number updated.
+    """
+    if not users:
+        return 0
+
+    return run_write(_bulk_update, users, operation, st.session_state.get("user_email"))
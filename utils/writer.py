@@ -0,0 +1,284 @@
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.db import BUSY_TIMEOUT_MS, PRIMARY_SITE_ID, catalogue_uri, get_db_path, site_db_path
+
+GROUP_COMMIT_WINDOW_SECONDS = 0.005
+MAX_GROUP_SIZE = 64
+MAX_LOCK_RETRIES = 8
+RETRY_BASE_DELAY_SECONDS = 0.01
+CLAIM_TIMEOUT_SECONDS = 0.5
+
+
+def is_lock_error(exc: Exception) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and (
+        "locked" in str(exc) or "busy" in str(exc)
+    )
+
+
+class ClaimBusy(sqlite3.OperationalError):
+    """A user this job needs is claimed by another site's writer; retried like a lock error."""
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class WriteCoordinator:
+    """
+    Serialises database mutations through one writer thread.
+
+    Callers submit `fn(conn, *args, **kwargs)` and get a Future. A job
+    that finds the queue empty commits on its own at once; jobs queued
+    behind it, and any arriving within a few milliseconds, are
+    group-committed in one transaction, each inside its own savepoint so
+    a failing job only rolls back itself. Transient lock errors retry the
+    whole group with jittered exponential backoff, so jobs must only
+    touch the database (no side effects outside `conn`) and must not
+    commit.
+    """
+
+    def __init__(
+        self,
+        db_path=None,
+        group_window: float = GROUP_COMMIT_WINDOW_SECONDS,
+        max_group_size: int = MAX_GROUP_SIZE,
+        max_retries: int = MAX_LOCK_RETRIES,
+        attach_catalogue: bool = False,
+    ):
+        self.db_path = db_path or get_db_path()
+        self.attach_catalogue = attach_catalogue
+        self.group_window = group_window
+        self.max_group_size = max_group_size
+        self.max_retries = max_retries
+        self.stats = {"jobs": 0, "groups": 0, "lock_retries": 0, "lock_failures": 0}
+        self._claimed: set = set()
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="desk-booking-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    # ---------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------
+    def submit(self, fn, *args, **kwargs) -> Future:
+        job = _Job(fn, args, kwargs)
+        self._queue.put(job)
+        return job.future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------------------------------------------------
+    # WRITER THREAD
+    # ---------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, uri=True)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        if self.attach_catalogue:
+            # Jobs read users and desks from the catalogue and only write
+            # the site's own file. Attached read-only, BEGIN IMMEDIATE takes
+            # just a read snapshot of it: sites never wait on each other's
+            # or the catalogue's write lock.
+            conn.execute("ATTACH DATABASE ? AS catalogue", (catalogue_uri(),))
+        return conn
+
+    def _next_group(self) -> list | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        group = [first]
+        deadline = time.monotonic() + self.group_window
+
+        while len(group) < self.max_group_size:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                # A lone job commits straight away; the window is only worth
+                # waiting out while other writers are still submitting
+                remaining = deadline - time.monotonic()
+                if len(group) == 1 or remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if job is None:
+                self._queue.put(None)
+                break
+            group.append(job)
+
+        return group
+
+    def _run(self) -> None:
+        _writer_thread.writer = self
+        conn = self._connect()
+        try:
+            while True:
+                group = self._next_group()
+                if group is None:
+                    return
+                self._commit_group(conn, group)
+        finally:
+            conn.close()
+
+    def _commit_group(self, conn: sqlite3.Connection, group: list) -> None:
+        for attempt in range(self.max_retries + 1):
+            outcomes = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+
+                for job in group:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        result = job.fn(conn, *job.args, **job.kwargs)
+                    except Exception as exc:
+                        if is_lock_error(exc):
+                            raise
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        outcomes.append((job, None, exc))
+                    else:
+                        conn.execute("RELEASE job")
+                        outcomes.append((job, result, None))
+
+                conn.execute("COMMIT")
+                _release_claims(self)
+                break
+
+            except sqlite3.OperationalError as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                _release_claims(self)
+
+                if not is_lock_error(exc) or attempt == self.max_retries:
+                    if is_lock_error(exc):
+                        self.stats["lock_failures"] += 1
+                    for job in group:
+                        job.future.set_exception(exc)
+                    return
+
+                self.stats["lock_retries"] += 1
+                delay = RETRY_BASE_DELAY_SECONDS * (2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+            except Exception as exc:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                _release_claims(self)
+                for job in group:
+                    job.future.set_exception(exc)
+                return
+
+        self.stats["jobs"] += len(group)
+        self.stats["groups"] += 1
+
+        for job, result, exc in outcomes:
+            if exc is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(exc)
+
+
+# ---------------------------------------------------
+# USER CLAIMS (cross-site checks without a shared lock)
+# ---------------------------------------------------
+_claims: dict = {}
+_claims_changed = threading.Condition()
+_writer_thread = threading.local()
+
+
+def claim_users(user_ids) -> None:
+    """
+    Claim people for the calling write job's group until it commits or
+    rolls back. A job that decides about someone from other sites'
+    bookings (quotas, team seats) claims them first; another site's
+    writer needing one of them waits for that commit, so neither decides
+    from the other's uncommitted state. Sites share no database lock:
+    only writes for the same people wait on each other. If the claim is
+    not free within CLAIM_TIMEOUT_SECONDS (two writers each waiting on
+    the other's people), ClaimBusy makes the group retry. Does nothing
+    outside a writer thread.
+    """
+    writer = getattr(_writer_thread, "writer", None)
+    if writer is None:
+        return
+    wanted = set(user_ids) - writer._claimed
+    if not wanted:
+        return
+
+    deadline = time.monotonic() + CLAIM_TIMEOUT_SECONDS
+    with _claims_changed:
+        while any(_claims.get(user_id, writer) is not writer for user_id in wanted):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ClaimBusy("database is busy: another site is booking for the same people")
+            _claims_changed.wait(remaining)
+        for user_id in wanted:
+            _claims[user_id] = writer
+    writer._claimed |= wanted
+
+
+def _release_claims(writer: WriteCoordinator) -> None:
+    if not writer._claimed:
+        return
+    with _claims_changed:
+        for user_id in writer._claimed:
+            del _claims[user_id]
+        _claims_changed.notify_all()
+    writer._claimed = set()
+
+
+# ---------------------------------------------------
+# PROCESS-WIDE WRITERS (one per database file)
+# ---------------------------------------------------
+_writers: dict = {}
+_writer_lock = threading.Lock()
+
+
+def _writer_for(path, attach_catalogue: bool) -> WriteCoordinator:
+    writer = _writers.get(path)
+    if writer is None:
+        with _writer_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = WriteCoordinator(path, attach_catalogue=attach_catalogue)
+    return writer
+
+
+def get_writer(site_id: int = PRIMARY_SITE_ID) -> WriteCoordinator:
+    """The writer for a site's bookings database."""
+    return _writer_for(site_db_path(site_id), attach_catalogue=True)
+
+
+def get_catalogue_writer() -> WriteCoordinator:
+    """The writer for the catalogue (users, desks, sites, quotas and admin audit entries)."""
+    return _writer_for(get_db_path(), attach_catalogue=False)
+
+
+def run_write(fn, *args, timeout: float = 30, **kwargs):
+    """Submit a write to the catalogue's writer and wait for its result."""
+    return get_catalogue_writer().submit(fn, *args, **kwargs).result(timeout=timeout)
+
+
+def run_site_write(site_id: int, fn, *args, timeout: float = 30, **kwargs):
+    """run_write against one site's bookings database."""
+    return get_writer(site_id).submit(fn, *args, **kwargs).result(timeout=timeout)